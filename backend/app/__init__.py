@@ -9,8 +9,24 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from extensions import db, jwt
 from app.config import Config
+from app import json_provider
 from app.models import initialize_database
 from app.routes import register_blueprints  # This already includes progress_bp
+from app.services.claim_index import claim_index
+from app.services.claim_cache import claim_result_cache
+from app.services.claim_retention import claim_retention
+from app.services.claim_codec import claim_codec
+from app.services.http_client import http_client
+from app.services.response_cache import news_cache
+from app.services.upstream_quota import upstream_quota
+from app.services.model_registry import model_registry
+from app.services.insight_jobs import insight_jobs
+from app.services import progress_forecast
+from app.services.goal_recommender import goal_recommender
+from app.services.progress_feed import progress_feed
+from app.services.metrics import metrics
+from app.services.password_hasher import password_hasher
+from app.services.user_cache import user_cache
 
 def create_app():
     app = Flask(__name__)
@@ -22,13 +38,34 @@ def create_app():
     app.config.from_object(Config)
 
     # Initialize extensions
+    json_provider.init_app(app)  # Before metrics, which wraps whichever encoder is installed
+    metrics.init_app(app)  # First, so its timers wrap every other before/after hook
     db.init_app(app)
     jwt.init_app(app)
+    user_cache.init_app(app)
+    http_client.init_app(app)
+    upstream_quota.init_app(app)
+    password_hasher.init_app(app)
+    news_cache.init_app(app)
 
     # Initialize database
     with app.app_context():
         initialize_database(app)
 
+    # Fit the claim similarity index once, lookups reuse it for the worker's lifetime
+    claim_index.init_app(app)
+    claim_result_cache.init_app(app)
+    claim_codec.init_app(app)
+    claim_retention.init_app(app)
+    insight_jobs.init_app(app)
+    progress_forecast.init_app(app)
+    goal_recommender.init_app(app)
+    progress_feed.init_app(app)
+
+    # NLP/ML models load on first use unless preloading (e.g. in the gunicorn master before fork)
+    if app.config["PRELOAD_MODELS"]:
+        model_registry.preload()
+
     # ✅ Register blueprints (No need to register them again manually)
     register_blueprints(app)
 
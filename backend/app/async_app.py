@@ -0,0 +1,354 @@
+import asyncio
+import io
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from aiohttp import web
+from flask_jwt_extended import decode_token, get_unverified_jwt_headers
+from flask_jwt_extended.exceptions import JWTExtendedException, RevokedTokenError, UserClaimsVerificationError
+from flask_jwt_extended.internal_utils import (
+    custom_verification_for_token,
+    verify_token_not_blocklisted,
+    verify_token_type,
+)
+from jwt import ExpiredSignatureError, InvalidTokenError
+
+from extensions import db
+from app.models import claim_digest
+from app.routes import find_cached_claim, save_goal, store_claim
+from app.services.async_http import async_http_client
+from app.services.claim_codec import response_body
+from app.services.fact_check_service import FactCheckError, FactCheckService
+from app.services.insight_jobs import insight_jobs, progress_fingerprint
+from app.services.metrics import metrics
+from app.services.news_service import NewsService
+from app.services.response_cache import news_cache
+from app.services.upstream_quota import UpstreamThrottled
+from app.services.user_cache import user_cache
+from app.services.wolfram_service import WolframError, WolframService
+
+CORS_ORIGINS = frozenset({"http://localhost:3000"})  # Same origins create_app allows
+HOP_BY_HOP = frozenset({"connection", "keep-alive", "transfer-encoding", "upgrade"})
+STREAM_WINDOW = 16  # Chunks a WSGI response may run ahead of the client
+
+
+class AsyncServer:
+    """
+    Serves the Flask app from an aiohttp event loop.
+
+    The I/O-bound routes have native async handlers: their upstream calls go
+    through the async HTTP client, so a worker holds thousands of upstream waits
+    without a thread each, and their database work runs on a bounded thread pool,
+    each call in its own app context and session. Every other route is passed
+    through to the unchanged Flask app on the same pool, so routes can move over
+    one at a time.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(
+            max_workers=flask_app.config.get("ASYNC_SYNC_WORKERS", 32), thread_name_prefix="async-sync"
+        )
+
+    async def run_sync(self, fn, *args):
+        """Runs blocking work (database, vectorising) on the thread pool inside an app context."""
+        def call():
+            with self.flask_app.app_context():
+                try:
+                    return fn(*args)
+                finally:
+                    db.session.remove()
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def close(self, application):
+        await async_http_client.close()
+        self.executor.shutdown(wait=False)
+
+    def route(self, handler):
+        """Wraps an async handler with an app context, CORS headers, error handling and metrics."""
+        async def wrapped(request):
+            started = time.perf_counter()
+            with self.flask_app.app_context():
+                try:
+                    response = await handler(request)
+                except AuthError as e:
+                    response = json_response(e.body, e.status_code)
+                except web.HTTPException as e:
+                    response = json_response({"error": e.reason}, e.status)
+                except Exception as e:
+                    logging.error(f"🔴 Unexpected server error: {str(e)}", exc_info=True)
+                    response = json_response({"error": f"Unexpected error: {str(e)}"}, 500)
+
+            origin = request.headers.get("Origin")
+            if origin in CORS_ORIGINS:
+                response.headers["Access-Control-Allow-Origin"] = origin
+                response.headers["Vary"] = "Origin"
+            route = request.match_info.route.resource.canonical
+            metrics.requests.observe(time.perf_counter() - started, request.method, route, response.status)
+            return response
+
+        return wrapped
+
+    def identity(self, request):
+        """
+        The JWT identity of an access token, verified and answered like
+        `jwt_required()` does when the token is missing, bad, a refresh token,
+        revoked or fails the app's claims check.
+        """
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            raise AuthError(401, {"msg": "Missing Authorization Header"})
+        encoded_token = header[len("Bearer "):]
+        try:
+            decoded = decode_token(encoded_token)
+            jwt_header = get_unverified_jwt_headers(encoded_token)
+            # The checks jwt_required() runs after decoding, the user lookup is left to the handlers' threads
+            verify_token_type(decoded, refresh=False)
+            verify_token_not_blocklisted(jwt_header, decoded)
+            custom_verification_for_token(jwt_header, decoded)
+        except ExpiredSignatureError:
+            raise AuthError(401, {"msg": "Token has expired"})
+        except RevokedTokenError:
+            raise AuthError(401, {"msg": "Token has been revoked"})
+        except UserClaimsVerificationError:
+            raise AuthError(400, {"msg": "User claims verification failed"})
+        except (InvalidTokenError, JWTExtendedException) as e:
+            raise AuthError(422, {"msg": str(e)})
+        return decoded[self.flask_app.config.get("JWT_IDENTITY_CLAIM", "sub")]
+
+    async def check_claim(self, request):
+        if request.method == "GET":
+            query = request.query.get("query", "").strip()
+            if not query:
+                return json_response({"error": "No query provided."}, 400)
+        else:
+            data = await read_json(request)
+            if not data or not data.get("claim"):
+                return json_response({"error": "Invalid JSON payload. Provide a 'claim' field."}, 400)
+            query = data["claim"].strip()
+
+        digest = claim_digest(query)
+        try:
+            payload = await self.run_sync(find_cached_claim, query, digest)
+        except ValueError as e:
+            logging.error(f"⚠️ JSON Decode Error in Cached Result: {str(e)}")
+            return json_response({"error": "Cached result contains invalid JSON."}, 500)
+        if payload is not None:
+            return web.Response(body=response_body(payload), content_type="application/json")
+
+        try:
+            results = await FactCheckService().search_async(query)
+        except FactCheckError as e:
+            return json_response({"error": str(e)}, e.status_code)
+        except UpstreamThrottled as e:
+            return retry_later(e)
+        except requests.RequestException as e:
+            logging.error(f"🔴 Request Exception: {str(e)}")
+            return json_response({"error": f"Error fetching data: {str(e)}"}, 500)
+
+        payload = await self.run_sync(store_claim, query, digest, results)
+        return web.Response(body=payload, content_type="application/json")
+
+    async def innovation_news(self, request):
+        query = request.query.get("query", "innovation")
+        language = request.query.get("language", "en")
+        try:
+            page_size = min(int(request.query.get("page_size", 5)), 100)  # NewsAPI caps pageSize at 100
+        except ValueError:
+            page_size = 5
+
+        service = NewsService()
+        try:
+            articles = await news_cache.get_or_fetch_async(
+                news_cache.make_key(query, language, page_size),
+                lambda: service.get_innovation_articles_async(query=query, language=language, page_size=page_size),
+                cacheable=lambda result: not (isinstance(result, dict) and "error" in result),
+            )
+        except UpstreamThrottled as e:
+            return retry_later(e)
+
+        if "error" in articles:
+            return json_response({"error": articles["error"]}, 500)
+        return json_response({"articles": articles}, 200)
+
+    async def wolfram_progress_insights(self, request):
+        prepared = await self.run_sync(self._insight_inputs, self.identity(request))
+        if prepared is None:
+            return json_response({"error": "User not found"}, 404)
+        cached_insights, inputs = prepared
+        if cached_insights is not None:
+            return json_response(cached_insights, 200)
+
+        try:
+            insights = await WolframService().progress_insights_async(*inputs)
+        except WolframError as e:
+            error = {"error": str(e)}
+            if e.raw_response is not None:
+                error["raw_response"] = e.raw_response
+            return json_response(error, e.status_code)
+        except UpstreamThrottled as e:
+            return retry_later(e)
+        except requests.RequestException as e:
+            logging.error(f"❌ Wolfram API Request Failed: {str(e)}")
+            return json_response({"error": f"Error fetching data: {str(e)}"}, 500)
+
+        return json_response(insights, 200)
+
+    @staticmethod
+    def _insight_inputs(user_id):
+        """None for an unknown user, else (reusable result, None) or (None, analysis inputs)."""
+        user = user_cache.get(user_id)
+        if not user:
+            return None
+        cached_insights = insight_jobs.cached_result(user.id, progress_fingerprint(user.id))
+        if cached_insights is not None:
+            return cached_insights, None
+        return None, WolframService.collect_progress_inputs(user.id)
+
+    async def create_goal(self, request):
+        user_id = self.identity(request)
+        data = await read_json(request)
+        defer = request.query.get("defer")
+        defer = int(defer) if defer and defer.lstrip("-").isdigit() else None
+        body, status = await self.run_sync(save_goal, user_id, data, defer)
+        return json_response(body, status)
+
+    async def wsgi(self, request):
+        """
+        Hands the request to the Flask app on the thread pool. The response is
+        produced on a single thread (streamed responses keep their context) and
+        forwarded chunk by chunk, so NDJSON and server-sent events still stream.
+        """
+        loop = asyncio.get_running_loop()
+        environ = wsgi_environ(request, await request.read())
+        head = loop.create_future()
+        chunks = asyncio.Queue()
+        window = threading.Semaphore(STREAM_WINDOW)
+        cancelled = threading.Event()
+
+        def resolve(value):
+            if not head.done():
+                head.set_result(value)
+
+        def start_response(status, headers, exc_info=None):
+            loop.call_soon_threadsafe(resolve, (status, headers))
+            return lambda data: None  # Flask never uses the legacy write() callable
+
+        def produce():
+            try:
+                iterable = self.flask_app(environ, start_response)
+                try:
+                    for chunk in iterable:
+                        window.acquire()
+                        if cancelled.is_set():
+                            break
+                        loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+                finally:
+                    if hasattr(iterable, "close"):
+                        iterable.close()
+            except Exception as e:
+                logging.error(f"🔴 WSGI passthrough failed: {str(e)}", exc_info=True)
+                loop.call_soon_threadsafe(resolve, ("500 INTERNAL SERVER ERROR", []))
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        loop.run_in_executor(self.executor, produce)
+        status, headers = await head
+
+        code, _, reason = status.partition(" ")
+        response = web.StreamResponse(status=int(code), reason=reason or None)
+        for name, value in headers:
+            if name.lower() not in HOP_BY_HOP:
+                response.headers.add(name, value)
+        try:
+            await response.prepare(request)
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                window.release()
+                if chunk:
+                    await response.write(chunk)
+            await response.write_eof()
+        finally:
+            # Client gone or done, let a producer blocked on the window see the flag and stop
+            cancelled.set()
+            window.release()
+        return response
+
+
+class AuthError(Exception):
+    """Raised by handlers for a missing or bad JWT, answered with `body` and `status_code`."""
+
+    def __init__(self, status_code, body):
+        super().__init__(body.get("msg"))
+        self.status_code = status_code
+        self.body = body
+
+
+def json_response(body, status):
+    return web.json_response(body, status=status)
+
+
+def retry_later(error):
+    return web.json_response({"error": str(error)}, status=503, headers={"Retry-After": str(error.retry_after)})
+
+
+async def read_json(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def wsgi_environ(request, body):
+    url = request.url
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": request.path.encode("utf-8").decode("latin-1"),  # WSGI strings are bytes-as-latin-1
+        "QUERY_STRING": request.query_string,
+        "SERVER_NAME": url.host or "localhost",
+        "SERVER_PORT": str(url.port or (443 if request.secure else 80)),
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if request.content_type and "Content-Type" in request.headers:
+        environ["CONTENT_TYPE"] = request.headers["Content-Type"]
+    for name, value in request.headers.items():
+        key = "HTTP_" + name.upper().replace("-", "_")
+        if key in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+            continue
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_async_app(flask_app):
+    """aiohttp application serving `flask_app`, async handlers first, the Flask routes for the rest."""
+    server = AsyncServer(flask_app)
+    async_http_client.init_app(flask_app)
+
+    application = web.Application(client_max_size=flask_app.config.get("ASYNC_CLIENT_MAX_SIZE", 16 * 1024 * 1024))
+    application.router.add_route("GET", "/check_claim", server.route(server.check_claim))
+    application.router.add_route("POST", "/check_claim", server.route(server.check_claim))
+    application.router.add_route("GET", "/innovation_news", server.route(server.innovation_news))
+    application.router.add_route("GET", "/wolfram/progress_insights", server.route(server.wolfram_progress_insights))
+    application.router.add_route("POST", "/goal", server.route(server.create_goal))
+    # Everything else, including CORS preflights for the routes above, is answered by Flask
+    application.router.add_route("*", "/{path:.*}", server.wsgi)
+    application.on_cleanup.append(server.close)
+    return application
@@ -11,19 +11,156 @@ class Config:
     # Flask Configurations
     SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key").strip()
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_secret_key_here").strip()
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))  # Seconds a JWT user lookup is reused per worker, 0 disables
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))  # Users kept per worker
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto").strip().lower()  # "auto" picks orjson when installed, else "stdlib"
 
     # Database Configurations
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'app', 'flow_innovation.db')}"
     ).strip()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # Connections kept open per process
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Extra connections allowed under bursts
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reopen connections older than this (seconds)
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").strip() == "1"  # Test connections on checkout
+    SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))  # Seconds a writer waits for the lock
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()  # NORMAL is durable enough with WAL
+    # Read-only routes use this when set; replicas can lag, so a write may not be visible there yet
+    DATABASE_READ_REPLICA_URL = os.getenv("DATABASE_READ_REPLICA_URL", "").strip()
+    SQLALCHEMY_BINDS = {"replica": DATABASE_READ_REPLICA_URL} if DATABASE_READ_REPLICA_URL else None
 
     # API Configurations
     FACT_CHECK_API_KEY = os.getenv("FACT_CHECK_API_KEY", "").strip()
+    FACT_CHECK_API_URL = os.getenv(
+        "FACT_CHECK_API_URL", "https://factchecktools.googleapis.com/v1alpha1/claims:search"
+    ).strip()
     NEWS_API_KEY = os.getenv("NEWS_API_KEY", "").strip()
+    NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything").strip()
     WOLFRAM_API_URL = os.getenv("WOLFRAM_API_URL", "").strip()
     WOLFRAM_APPID = os.getenv("WOLFRAM_APPID", "").strip()
 
+    # Outbound HTTP Client (shared by NewsAPI, Wolfram and Fact Check calls)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # Hosts with a cached pool
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))  # Keep-alive connections kept per host
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))  # Idempotent requests only
+    HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+    HTTP_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HTTP_CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures before opening
+    HTTP_CIRCUIT_RESET_TIMEOUT = float(os.getenv("HTTP_CIRCUIT_RESET_TIMEOUT", "30"))  # Seconds before a trial call
+
+    # Upstream Quotas (token buckets shared by every worker, "requests/seconds[:burst]", empty disables)
+    UPSTREAM_QUOTAS = {
+        "newsapi": os.getenv("UPSTREAM_QUOTA_NEWSAPI", "100/86400").strip(),  # NewsAPI developer plan
+        "wolfram": os.getenv("UPSTREAM_QUOTA_WOLFRAM", "2000/2592000").strip(),  # Wolfram|Alpha non-commercial
+        "factcheck": os.getenv("UPSTREAM_QUOTA_FACTCHECK", "60/60").strip(),
+    }
+    UPSTREAM_QUOTA_BACKEND = os.getenv("UPSTREAM_QUOTA_BACKEND", "auto").strip()  # "auto" (local if supported), "local", "redis" or "memory"
+    UPSTREAM_QUOTA_DIR = os.getenv("UPSTREAM_QUOTA_DIR", os.path.join(BASE_DIR, "instance", "upstream_quota")).strip()  # Local backend
+    UPSTREAM_QUOTA_REDIS_URL = os.getenv("UPSTREAM_QUOTA_REDIS_URL", "redis://localhost:6379/0").strip()
+    UPSTREAM_QUOTA_BACKGROUND_RESERVE = float(os.getenv("UPSTREAM_QUOTA_BACKGROUND_RESERVE", "0.2"))  # Share of each bucket only interactive calls use
+    UPSTREAM_QUOTA_MAX_WAIT = float(os.getenv("UPSTREAM_QUOTA_MAX_WAIT", "2"))  # Seconds a request waits for a token before a 503
+    UPSTREAM_QUOTA_BACKGROUND_MAX_WAIT = float(os.getenv("UPSTREAM_QUOTA_BACKGROUND_MAX_WAIT", "30"))
+    UPSTREAM_QUOTA_COOLDOWN = float(os.getenv("UPSTREAM_QUOTA_COOLDOWN", "60"))  # Pause after a 429 without Retry-After
+    UPSTREAM_ERROR_CACHE_TTL = float(os.getenv("UPSTREAM_ERROR_CACHE_TTL", "30"))  # Seconds an error response is replayed, 0 disables
+    UPSTREAM_ERROR_CACHE_SIZE = int(os.getenv("UPSTREAM_ERROR_CACHE_SIZE", "1024"))  # Error responses kept per worker
+
+    # Async Serving Mode (async_server.py)
+    ASYNC_SYNC_WORKERS = int(os.getenv("ASYNC_SYNC_WORKERS", "32"))  # Threads for DB work and passed-through Flask routes
+    ASYNC_CLIENT_MAX_SIZE = int(os.getenv("ASYNC_CLIENT_MAX_SIZE", str(16 * 1024 * 1024)))  # Max request body in bytes
+    HTTP_ASYNC_MAX_CONNECTIONS = int(os.getenv("HTTP_ASYNC_MAX_CONNECTIONS", "1000"))  # Concurrent upstream connections
+    HTTP_ASYNC_MAX_PER_HOST = int(os.getenv("HTTP_ASYNC_MAX_PER_HOST", "200"))
+
+    # Community Progress Pagination
+    COMMUNITY_PAGE_SIZE = int(os.getenv("COMMUNITY_PAGE_SIZE", "50"))
+    COMMUNITY_PAGE_SIZE_MAX = int(os.getenv("COMMUNITY_PAGE_SIZE_MAX", "500"))
+
+    # Community Progress Feed (server-sent events)
+    # Off by default: each open stream holds a request thread for as long as the page is open, so serve it
+    # only from threaded or async workers, and with more than one worker only with the redis backend
+    PROGRESS_FEED_ENABLED = os.getenv("PROGRESS_FEED_ENABLED", "0").strip() == "1"
+    PROGRESS_FEED_BACKEND = os.getenv("PROGRESS_FEED_BACKEND", "memory").strip()  # "memory" (single worker) or "redis"
+    PROGRESS_FEED_REDIS_URL = os.getenv("PROGRESS_FEED_REDIS_URL", "redis://localhost:6379/0").strip()
+    PROGRESS_FEED_QUEUE_SIZE = int(os.getenv("PROGRESS_FEED_QUEUE_SIZE", "1000"))  # Events buffered per client before it is dropped
+    PROGRESS_FEED_BACKFILL = int(os.getenv("PROGRESS_FEED_BACKFILL", "500"))  # Missed rows replayed per feed on resume
+    PROGRESS_FEED_KEEPALIVE = float(os.getenv("PROGRESS_FEED_KEEPALIVE", "15"))  # Seconds between keepalive comments
+
+    # Innovation News Response Cache
+    NEWS_CACHE_BACKEND = os.getenv("NEWS_CACHE_BACKEND", "memory").strip()  # "memory" or "redis"
+    NEWS_CACHE_REDIS_URL = os.getenv("NEWS_CACHE_REDIS_URL", "redis://localhost:6379/0").strip()
+    NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "300"))  # Seconds a response is served as fresh
+    NEWS_CACHE_STALE_TTL = float(os.getenv("NEWS_CACHE_STALE_TTL", "3600"))  # Extra seconds served stale while refreshing
+    NEWS_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "1024"))  # Memory backend only
+
+    # Bulk Progress Ingestion
+    PROGRESS_BULK_BATCH_SIZE = int(os.getenv("PROGRESS_BULK_BATCH_SIZE", "5000"))  # Rows per INSERT and transaction
+    PROGRESS_BULK_MAX_ROWS = int(os.getenv("PROGRESS_BULK_MAX_ROWS", "1000000"))  # Rows per request
+
+    # Progress Forecasts
+    FORECAST_BATCH_LIMIT = int(os.getenv("FORECAST_BATCH_LIMIT", "10000"))  # Users per /progress/forecasts request
+
+    # Goal Recommendations
+    GOAL_CLUSTERS = int(os.getenv("GOAL_CLUSTERS", "8"))
+    GOAL_SYNC_INTERVAL = float(os.getenv("GOAL_SYNC_INTERVAL", "30"))  # Seconds between catch-up scans for other workers' goals
+    GOAL_RECLUSTER_INTERVAL = float(os.getenv("GOAL_RECLUSTER_INTERVAL", "3600"))  # Seconds between full refits + Wolfram refresh, 0 disables
+    GOAL_WOLFRAM_SAMPLE = int(os.getenv("GOAL_WOLFRAM_SAMPLE", "5000"))  # Most common goals sent to Wolfram when re-clustering
+    GOAL_RECOMMENDATIONS_DEFERRED = os.getenv("GOAL_RECOMMENDATIONS_DEFERRED", "0").strip() == "1"  # Default for ?defer= on POST /goal
+
+    # Wolfram Insights Jobs
+    WOLFRAM_JOB_WORKERS = int(os.getenv("WOLFRAM_JOB_WORKERS", "4"))  # Concurrent Wolfram calls per process
+    WOLFRAM_JOB_TIMEOUT = float(os.getenv("WOLFRAM_JOB_TIMEOUT", "600"))  # Seconds before an unfinished job is abandoned
+
+    # Fact Check API Requests
+    FACT_CHECK_MAX_WORKERS = int(os.getenv("FACT_CHECK_MAX_WORKERS", "8"))  # Concurrent upstream calls per batch
+    FACT_CHECK_BATCH_LIMIT = int(os.getenv("FACT_CHECK_BATCH_LIMIT", "100"))  # Claims accepted by /check_claims
+
+    # Request Metrics and Profiling
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").strip() == "1"
+    METRICS_PATH = os.getenv("METRICS_PATH", "/metrics").strip()  # Prometheus text format, per worker process
+    PROFILE_SLOW_REQUESTS = os.getenv("PROFILE_SLOW_REQUESTS", "0").strip() == "1"  # Opt-in stack sampling
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))  # Fraction of requests sampled
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Seconds between stack samples
+    PROFILE_SLOW_THRESHOLD = float(os.getenv("PROFILE_SLOW_THRESHOLD", "1.0"))  # Sampled requests slower than this are dumped
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "").strip()  # Folded flamegraph stacks, defaults to instance/profiles
+
+    # Password Hashing
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # Hashing processes per worker, 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))  # Running plus queued hashes before /login answers 503
+    PASSWORD_HASH_QUEUE_WAIT = float(os.getenv("PASSWORD_HASH_QUEUE_WAIT", "0"))  # Seconds to wait for a queue slot
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))  # Seconds to wait for a queued hash
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000").strip()  # Changing it rehashes on next login
+    PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+
+    # Model Loading
+    PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0").strip() == "1"  # Load spaCy and the claim index at startup
+
+    # Claim Similarity Index
+    CLAIM_SIMILARITY_THRESHOLD = float(os.getenv("CLAIM_SIMILARITY_THRESHOLD", "0.7"))
+    CLAIM_INDEX_REFIT_RATIO = float(os.getenv("CLAIM_INDEX_REFIT_RATIO", "0.25"))  # Refit once appended rows exceed this share
+    CLAIM_INDEX_SYNC_INTERVAL = float(os.getenv("CLAIM_INDEX_SYNC_INTERVAL", "5"))  # Seconds between catch-up scans for other workers' claims
+    CLAIM_INDEX_SNAPSHOT_DIR = os.getenv(
+        "CLAIM_INDEX_SNAPSHOT_DIR", os.path.join(BASE_DIR, "instance", "claim_index")
+    ).strip() or None  # Set to an empty string to keep the index in memory only
+    CLAIM_INDEX_COMPACT_INTERVAL = float(os.getenv("CLAIM_INDEX_COMPACT_INTERVAL", "300"))  # Seconds between snapshot compactions, 0 disables
+    CLAIM_INDEX_SETTLE_TIME = float(os.getenv("CLAIM_INDEX_SETTLE_TIME", "60"))  # Seconds an insert may take to commit, later ids are rescanned until then
+    CLAIM_RESULT_CACHE_SIZE = int(os.getenv("CLAIM_RESULT_CACHE_SIZE", "4096"))  # Parsed results kept per worker for exact repeats
+
+    # Claim Result Storage
+    CLAIM_RESULT_CODEC = os.getenv("CLAIM_RESULT_CODEC", "auto").strip().lower()  # "auto" (zstd if installed, else zlib), "zstd", "zlib" or "none"
+    CLAIM_RESULT_COMPRESSION_LEVEL = int(os.getenv("CLAIM_RESULT_COMPRESSION_LEVEL", "3"))  # zstd or zlib level
+    CLAIM_RESULT_DICTIONARY = os.getenv("CLAIM_RESULT_DICTIONARY", "1").strip() == "1"  # Compress with the newest trained zstd dictionary
+
+    # Claim Cache Retention
+    CLAIM_CACHE_TTL = int(os.getenv("CLAIM_CACHE_TTL", str(30 * 86400)))  # Seconds a stored verdict is served, 0 keeps them forever
+    CLAIM_CACHE_MAX_ENTRIES = int(os.getenv("CLAIM_CACHE_MAX_ENTRIES", "100000"))  # Stored claims kept, 0 is unbounded
+    CLAIM_CACHE_EVICTION = os.getenv("CLAIM_CACHE_EVICTION", "lru").strip().lower()  # "lru" or "lfu", by recorded hits
+    CLAIM_CACHE_SWEEP_INTERVAL = float(os.getenv("CLAIM_CACHE_SWEEP_INTERVAL", "300"))  # Seconds between sweeps, 0 disables
+    ADMIN_USERNAMES = frozenset(
+        name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+    )  # Users allowed on the /admin endpoints
+
     # Debugging: Print environment variables to confirm they are loaded
     print(f"🔍 WOLFRAM_API_URL: {WOLFRAM_API_URL}")
     print(f"🔍 WOLFRAM_APPID: {WOLFRAM_APPID}")
@@ -0,0 +1,30 @@
+import hashlib
+
+from flask import current_app, jsonify, request
+from werkzeug.http import is_resource_modified
+
+
+def collection_etag(*parts):
+    """Weak validator for a row collection from its version markers, e.g. (max id, count, max created_at)."""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def conditional_json(etag, last_modified, build):
+    """
+    Answers 304 when the request's If-None-Match (or, without one,
+    If-Modified-Since) still matches, before `build` runs, so an unchanged
+    poll never loads or serialises the rows. Otherwise returns jsonify(build()).
+    Both carry the validators and ask clients to revalidate on every use.
+    """
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = jsonify(build())
+    else:
+        response = current_app.response_class(status=304)
+
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
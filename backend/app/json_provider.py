@@ -0,0 +1,55 @@
+import logging
+
+from flask.json import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional, the standard library encoder is used without it
+    orjson = None
+
+
+class OrjsonEncoder(JSONEncoder):
+    """
+    Flask's JSON encoder with orjson doing the encoding.
+
+    Values orjson can't handle natively (and datetimes, so they keep Flask's
+    HTTP-date format) go through the usual `default`. Anything orjson rejects
+    outright, such as integers past 64 bits or indents other than 2, falls
+    back to the standard library.
+    """
+
+    def encode(self, o):
+        if self.indent not in (None, 2):
+            return super().encode(o)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent == 2:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default, option=option).decode("utf-8")
+        except TypeError:
+            return super().encode(o)
+
+
+PROVIDERS = {"stdlib": JSONEncoder, "orjson": OrjsonEncoder}
+
+
+def init_app(app):
+    """
+    Installs the JSON encoder named by JSON_PROVIDER ("auto", "orjson" or
+    "stdlib") as `app.json_encoder`, so every `jsonify` uses it. Call before
+    anything that wraps `app.json_encoder`, such as the metrics timers.
+    """
+    name = app.config.get("JSON_PROVIDER", "auto")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name not in PROVIDERS:
+        raise RuntimeError(f"❌ Unknown JSON_PROVIDER '{name}', use one of auto, {', '.join(PROVIDERS)}")
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("❌ The 'orjson' package is required for JSON_PROVIDER=orjson")
+
+    app.json_encoder = PROVIDERS[name]
+    app.extensions["json_provider"] = name
+    logging.info(f"🧾 JSON responses encoded with {name}")
@@ -0,0 +1,55 @@
+"""Add normalized claim digest column with an index
+
+Revision ID: 3f9a1c7d2b64
+Revises: 
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import claim_digest
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7d2b64'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    # Tables created by `db.create_all()` may already have the column
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('claims')}
+    if 'claim_digest' not in columns:
+        with op.batch_alter_table('claims') as batch_op:
+            batch_op.add_column(sa.Column('claim_digest', sa.String(length=64), nullable=True))
+
+    indexes = {i['name'] for i in sa.inspect(op.get_bind()).get_indexes('claims')}
+    if 'ix_claims_claim_digest' not in indexes:
+        op.create_index('ix_claims_claim_digest', 'claims', ['claim_digest'], unique=False)
+
+    # Backfill digests for existing rows in batches
+    bind = op.get_bind()
+    claims = sa.table('claims', sa.column('id', sa.Integer), sa.column('claim_text', sa.String),
+                      sa.column('claim_digest', sa.String))
+    while True:
+        rows = bind.execute(
+            sa.select(claims.c.id, claims.c.claim_text)
+            .where(claims.c.claim_digest.is_(None))
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            claims.update().where(claims.c.id == sa.bindparam('row_id')).values(claim_digest=sa.bindparam('digest')),
+            [{'row_id': row.id, 'digest': claim_digest(row.claim_text)} for row in rows],
+        )
+
+
+def downgrade():
+    op.drop_index('ix_claims_claim_digest', table_name='claims')
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.drop_column('claim_digest')
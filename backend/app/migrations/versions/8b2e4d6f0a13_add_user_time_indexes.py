@@ -0,0 +1,37 @@
+"""Add (user_id, created_at) indexes and an index on claims.timestamp
+
+Revision ID: 8b2e4d6f0a13
+Revises: 3f9a1c7d2b64
+Create Date: 2026-10-18 11:47:05.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f0a13'
+down_revision = '3f9a1c7d2b64'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_progress_user_id_created_at', 'progress', ['user_id', 'created_at']),
+    ('ix_progress_created_at_id', 'progress', ['created_at', 'id']),
+    ('ix_goal_user_id_created_at', 'goal', ['user_id', 'created_at']),
+    ('ix_community_progress_user_id_created_at', 'community_progress', ['user_id', 'created_at']),
+    ('ix_claims_timestamp', 'claims', ['timestamp']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # Tables created by `db.create_all()` may already have the index
+        if name not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
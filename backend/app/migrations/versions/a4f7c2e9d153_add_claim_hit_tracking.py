@@ -0,0 +1,32 @@
+"""Add hit count and last hit columns to claims
+
+Revision ID: a4f7c2e9d153
+Revises: e9a3c6b1d472
+Create Date: 2026-10-18 18:05:27.640912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f7c2e9d153'
+down_revision = 'e9a3c6b1d472'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables created by `db.create_all()` may already have the columns
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('claims')}
+    with op.batch_alter_table('claims') as batch_op:
+        if 'hit_count' not in columns:
+            batch_op.add_column(sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'))
+        if 'last_hit_at' not in columns:
+            batch_op.add_column(sa.Column('last_hit_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.drop_column('last_hit_at')
+        batch_op.drop_column('hit_count')
@@ -0,0 +1,93 @@
+"""Store claim results trimmed, compressed and versioned in result_data
+
+Revision ID: b8d1e5f3a7c2
+Revises: a4f7c2e9d153
+Create Date: 2026-10-18 19:22:48.105377
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.claim_codec import CODEC_ZLIB, CODEC_ZSTD, compact, pack, unpack, zstandard
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d1e5f3a7c2'
+down_revision = 'a4f7c2e9d153'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+claims = sa.table('claims', sa.column('id', sa.Integer), sa.column('result', sa.Text),
+                  sa.column('result_data', sa.LargeBinary))
+
+
+def batches(bind, condition):
+    """Yields rows matching `condition` in primary key order, BATCH_SIZE at a time."""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(claims.c.id, claims.c.result, claims.c.result_data)
+            .where(condition, claims.c.id > last_id)
+            .order_by(claims.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Tables created by `db.create_all()` may already have these
+    if not sa.inspect(bind).has_table('claim_result_dictionaries'):
+        op.create_table(
+            'claim_result_dictionaries',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('claims')}
+    if 'result_data' not in columns:
+        with op.batch_alter_table('claims') as batch_op:
+            batch_op.add_column(sa.Column('result_data', sa.LargeBinary(), nullable=True))
+
+    # No dictionary exists yet, plain zstd (or zlib) it is; rows that aren't valid JSON stay as text
+    codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+    update = claims.update().where(claims.c.id == sa.bindparam('row_id')).values(
+        result_data=sa.bindparam('data'), result=None
+    )
+    for rows in batches(bind, sa.and_(claims.c.result_data.is_(None), claims.c.result.isnot(None))):
+        converted = []
+        for row in rows:
+            try:
+                payload = compact(json.loads(row.result))
+            except ValueError:
+                continue
+            converted.append({'row_id': row.id, 'data': pack(payload, codec, 3)})
+        if converted:
+            bind.execute(update, converted)
+
+
+def downgrade():
+    bind = op.get_bind()
+    dictionaries = {}
+    for dict_id, data in bind.execute(sa.text('SELECT id, data FROM claim_result_dictionaries')):
+        dictionaries[dict_id] = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(data))
+
+    # The fields trimmed on upgrade are gone, the text gets the served subset back
+    update = claims.update().where(claims.c.id == sa.bindparam('row_id')).values(result=sa.bindparam('text'))
+    for rows in batches(bind, claims.c.result_data.isnot(None)):
+        bind.execute(update, [
+            {'row_id': row.id, 'text': unpack(row.result_data, dictionaries.__getitem__).decode('utf-8')}
+            for row in rows
+        ])
+
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.drop_column('result_data')
+    op.drop_table('claim_result_dictionaries')
+
@@ -0,0 +1,41 @@
+"""Add insight_job table for queued Wolfram progress insights
+
+Revision ID: c47d9e1a5f28
+Revises: 8b2e4d6f0a13
+Create Date: 2026-10-18 14:03:22.574819
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d9e1a5f28'
+down_revision = '8b2e4d6f0a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables created by `db.create_all()` may already exist
+    if 'insight_job' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'insight_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_insight_job_user_id_fingerprint', 'insight_job', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_insight_job_user_id_fingerprint', table_name='insight_job')
+    op.drop_table('insight_job')
@@ -0,0 +1,38 @@
+"""Add progress_stats table with running regression sums per user
+
+Revision ID: d5e8f2b7c930
+Revises: c47d9e1a5f28
+Create Date: 2026-10-18 15:26:49.110374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e8f2b7c930'
+down_revision = 'c47d9e1a5f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables created by `db.create_all()` may already exist. Rows are filled lazily
+    # on first prediction, or all at once with `flask progress-stats-rebuild`.
+    if 'progress_stats' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'progress_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('sum_t', sa.Float(), nullable=False),
+        sa.Column('sum_tt', sa.Float(), nullable=False),
+        sa.Column('sum_y', sa.Float(), nullable=False),
+        sa.Column('sum_ty', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('progress_stats')
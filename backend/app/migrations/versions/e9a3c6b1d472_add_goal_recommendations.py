@@ -0,0 +1,29 @@
+"""Add memoized recommendations column to goal
+
+Revision ID: e9a3c6b1d472
+Revises: d5e8f2b7c930
+Create Date: 2026-10-18 16:40:13.287551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a3c6b1d472'
+down_revision = 'd5e8f2b7c930'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables created by `db.create_all()` may already have the column
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('goal')}
+    if 'recommendations' not in columns:
+        with op.batch_alter_table('goal') as batch_op:
+            batch_op.add_column(sa.Column('recommendations', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('goal') as batch_op:
+        batch_op.drop_column('recommendations')
@@ -1,18 +1,49 @@
+import hashlib
+import unicodedata
+from sqlalchemy.orm import validates
 from extensions import db
 from datetime import datetime
 from flask import current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.services.password_hasher import password_hasher
+
+def normalize_claim_text(text):
+    """Case-folds, drops punctuation and collapses whitespace so trivial variants compare equal."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(ch for ch in text if not unicodedata.category(ch).startswith("P"))
+    return " ".join(text.split())
+
+
+def claim_digest(text):
+    """SHA-256 hex digest of the normalized claim text, used for exact-match lookups."""
+    return hashlib.sha256(normalize_claim_text(text).encode("utf-8")).hexdigest()
+
 
 class Claim(db.Model):
     __tablename__ = 'claims'  # Explicitly name the table (optional but good practice)
     id = db.Column(db.Integer, primary_key=True)
     claim_text = db.Column(db.String(500), nullable=False)
-    result = db.Column(db.Text, nullable=True)  # Use Text for potentially larger JSON responses
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)  # Use datetime.utcnow instead of db.func.now()
+    claim_digest = db.Column(db.String(64), index=True)  # Filled from claim_text, see `_set_digest`
+    result = db.Column(db.Text, nullable=True)  # Legacy JSON text, only on rows written before result_data existed
+    result_data = db.Column(db.LargeBinary, nullable=True)  # Versioned, compressed compact result, see claim_codec
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Use datetime.utcnow instead of db.func.now()
+    hit_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # Written in batches, see ClaimRetention
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+
+    @validates('claim_text')
+    def _set_digest(self, key, claim_text):
+        self.claim_digest = claim_digest(claim_text)
+        return claim_text
 
     def __repr__(self):
         return f"<Claim(id={self.id}, claim_text='{self.claim_text}', timestamp={self.timestamp})>"
 
+class ClaimResultDictionary(db.Model):
+    """A trained zstd dictionary, rows compressed with it record its id in their header."""
+    __tablename__ = 'claim_result_dictionaries'
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # Enter models for "Progress"
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -23,13 +54,21 @@ class User(db.Model):
     community_progress = db.relationship('CommunityProgress', back_populates='user', cascade="all, delete-orphan")
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        # Hashed on the password pool, may raise PasswordHasherBusy
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password)
 
 
 class Progress(db.Model):
+    __table_args__ = (
+        db.Index('ix_progress_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_progress_created_at_id', 'created_at', 'id'),  # Community feed keyset pagination
+    )
     id = db.Column(db.Integer, primary_key=True)
     achievement = db.Column(db.String(500), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -37,16 +76,33 @@ class Progress(db.Model):
     user = db.relationship('User', back_populates="progress")
 
 
+class ProgressStats(db.Model):
+    """
+    Running least-squares sums over a user's progress, kept in step with each insert.
+    t is days since STATS_EPOCH and y is the 1-based index of the progress entry.
+    """
+    __tablename__ = 'progress_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    sum_t = db.Column(db.Float, nullable=False, default=0.0)
+    sum_tt = db.Column(db.Float, nullable=False, default=0.0)
+    sum_y = db.Column(db.Float, nullable=False, default=0.0)
+    sum_ty = db.Column(db.Float, nullable=False, default=0.0)
+
+
 class Goal(db.Model):
+    __table_args__ = (db.Index('ix_goal_user_id_created_at', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     goal = db.Column(db.String(500), nullable=False)
     target_date = db.Column(db.DateTime, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    recommendations = db.Column(db.Text, nullable=True)  # JSON list, memoized once computed
     user = db.relationship('User', back_populates="goals")
 
 
 class CommunityProgress(db.Model):
+    __table_args__ = (db.Index('ix_community_progress_user_id_created_at', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     progress_story = db.Column(db.String(500), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -54,6 +110,19 @@ class CommunityProgress(db.Model):
     user = db.relationship('User', back_populates="community_progress")
 
 
+class InsightJob(db.Model):
+    """A queued or finished Wolfram progress-insights run, keyed by the inputs it analysed."""
+    __table_args__ = (db.Index('ix_insight_job_user_id_fingerprint', 'user_id', 'fingerprint'),)
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, handed to the client for polling
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # Identifies the progress/goal rows analysed
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, done, failed
+    result = db.Column(db.Text, nullable=True)  # JSON of the served insights once done
+    error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
 # Initialize the database schema
 def initialize_database(app):
     with app.app_context():  # Ensure the app context is available
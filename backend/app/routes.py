@@ -1,16 +1,33 @@
 import os
 import json
 import logging
+import queue
 import requests
-import spacy
 from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from extensions import db
-from app.models import Claim, Goal, Progress, User
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import create_access_token, current_user, jwt_required, get_jwt_identity
+from extensions import db, read_replica
+from app.models import Claim, Goal, InsightJob, Progress, User, claim_digest
+from app.http_cache import collection_etag, conditional_json
+from app.pagination import InvalidCursor, keyset_page
 from app.services.news_service import NewsService
+from app.services.fact_check_service import FactCheckError, FactCheckService
+from app.services.claim_index import claim_index
+from app.services.claim_cache import claim_result_cache
+from app.services.claim_retention import claim_retention
+from app.services.claim_codec import claim_codec, response_body, trim_result
+from app.services.response_cache import news_cache
+from app.services.upstream_quota import UpstreamThrottled
+from app.services.model_registry import model_registry
+from app.services.wolfram_service import WolframError, WolframService
+from app.services.insight_jobs import insight_jobs, progress_fingerprint
+from app.services.progress_forecast import predict_goal_completion, predict_many, record_progress
+from app.services.goal_recommender import goal_recommender
+from app.services.progress_feed import decode_cursor, encode_cursor, progress_feed
+from app.services.progress_ingest import ingest_progress, parse_ndjson
+from app.services.metrics import phase
+from app.services.password_hasher import PasswordHasherBusy
+from app.services.user_cache import user_cache
 from flask_cors import cross_origin
 
 
@@ -20,9 +37,6 @@ auth_bp = Blueprint("auth", __name__)
 progress_bp = Blueprint("progress", __name__)
 wolfram_bp = Blueprint("wolfram", __name__)
 
-# ✅ Load NLP Model
-nlp = spacy.load("en_core_web_sm")
-
 # Define the Blueprint
 wolfram_bp = Blueprint("wolfram", __name__)
 
@@ -30,68 +44,59 @@ wolfram_bp = Blueprint("wolfram", __name__)
 @jwt_required()  # Ensure the user is authenticated
 def wolfram_progress_insights():
     """Sends user progress data to Wolfram for analysis."""
-    
-    user_id = get_jwt_identity()  # Extract user ID from JWT token
-    
-    # Retrieve user progress and goals from the database
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    # Collect progress timestamps and achievements
-    progress = Progress.query.filter_by(user_id=user_id).all()
-    timestamps = [p.created_at.isoformat() for p in progress]  # Ensure timestamps are formatted
-    achievements = [p.achievement for p in progress]
+    user = current_user  # Resolved from the JWT by the user loader, unknown users get a 404
 
-    # Collect user goals
-    goals = Goal.query.filter_by(user_id=user_id).all()
-    goal_texts = [g.goal for g in goals]
+    # ♻️ Same progress and goals as a finished analysis, reuse its result
+    cached_insights = insight_jobs.cached_result(user.id, progress_fingerprint(user.id))
+    if cached_insights is not None:
+        return jsonify(cached_insights), 200
 
-    # ✅ Get API URL and APPID
-    WOLFRAM_API_URL = current_app.config.get("WOLFRAM_API_URL", "").strip()
-    WOLFRAM_APPID = current_app.config.get("WOLFRAM_APPID", "").strip()
-
-    if not WOLFRAM_APPID:
-        return jsonify({"error": "Wolfram API AppID is missing"}), 500
-
-    # ✅ Convert user data into a query-friendly format
-    query_text = f"Analyze progress: timestamps={timestamps}, achievements={achievements}, goals={goal_texts}"
+    service = WolframService()
+    try:
+        insights = service.progress_insights(*service.collect_progress_inputs(user.id))
+    except WolframError as e:
+        error = {"error": str(e)}
+        if e.raw_response is not None:
+            error["raw_response"] = e.raw_response
+        return jsonify(error), e.status_code
+    except UpstreamThrottled as e:
+        return retry_later(e)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"❌ Wolfram API Request Failed: {str(e)}")
+        return jsonify({"error": f"Error fetching data: {str(e)}"}), 500
 
-    # ✅ Prepare the GET request with `input` parameter
-    url = f"{WOLFRAM_API_URL}?appid={WOLFRAM_APPID}&input={query_text}&output=json"
+    return jsonify(insights), 200
 
-    logging.info(f"🚀 Sending request to Wolfram API: {url}")
 
-    try:
-        response = requests.get(url)
+@wolfram_bp.route("/wolfram/progress_insights/jobs", methods=["POST"])
+@jwt_required()
+def queue_progress_insights():
+    """Queues a Wolfram analysis and returns right away, poll the job for the result."""
+    job = insight_jobs.submit(current_user.id)
+    status_code = 200 if job.status == "done" else 202
+    return jsonify(insight_jobs.serialize(job)), status_code
 
-        logging.info(f"🌍 Wolfram API Response Status: {response.status_code}")
 
-        if response.status_code != 200:
-            logging.error(f"❌ Wolfram API Error {response.status_code}: {response.text}")
-            return jsonify({"error": f"Wolfram API Error: {response.status_code}"}), response.status_code
+@wolfram_bp.route("/wolfram/progress_insights/jobs/latest", methods=["GET"])
+@jwt_required()
+def latest_progress_insights_job():
+    """Fetch the most recent insights job for the logged-in user."""
+    user_id = get_jwt_identity()
+    job = InsightJob.query.filter_by(user_id=user_id).order_by(InsightJob.created_at.desc()).first()
+    if not job:
+        return jsonify({"error": "No insights jobs found"}), 404
+    return jsonify(insight_jobs.serialize(job)), 200
 
-        # ✅ Ensure the response is JSON
-        try:
-            wolfram_result = response.json()
-        except requests.exceptions.JSONDecodeError:
-            logging.error(f"❌ Wolfram API Response was not JSON. Raw response: {response.text}")
-            return jsonify({"error": "Invalid response from Wolfram API", "raw_response": response.text}), 500
-
-        # ✅ Extract and return relevant results
-        return jsonify({
-            "message": "Wolfram Analysis Complete",
-            "next_milestone": wolfram_result.get("NextMilestoneDate", "N/A"),
-            "innovation_score": wolfram_result.get("InnovationScore", "N/A"),
-            "recommended_goals": wolfram_result.get("RecommendedGoals", []),
-            "progress_graph": wolfram_result.get("ProgressGraph", ""),
-            "future_insights": wolfram_result.get("FutureInsights", []),
-            "suggestions": wolfram_result.get("Suggestions", [])
-        }), 200
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❌ Wolfram API Request Failed: {str(e)}")
-        return jsonify({"error": f"Error fetching data: {str(e)}"}), 500
+@wolfram_bp.route("/wolfram/progress_insights/jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_progress_insights_job(job_id):
+    """Poll an insights job by id."""
+    user_id = get_jwt_identity()
+    job = InsightJob.query.get(job_id)
+    if not job or str(job.user_id) != str(user_id):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(insight_jobs.serialize(job)), 200
 
 
 
@@ -100,6 +105,7 @@ logging.basicConfig(level=logging.DEBUG)
 
 # Helper function to clean and preprocess text
 def preprocess_text(text):
+    nlp = model_registry.get("nlp")  # spaCy is only loaded the first time this runs
     doc = nlp(text.lower())  # Convert to lowercase and tokenize
     return " ".join([token.lemma_ for token in doc if not token.is_stop])  # Lemmatization & remove stopwords
 
@@ -109,10 +115,59 @@ def home():
     return jsonify({"message": "Welcome to the Fact-Checking API!"}), 200
 
 
+def find_cached_claim(query, digest):
+    """
+    Stored result for `query`: exact repeats (ignoring case and punctuation) from
+    memory, then the digest column, then the similarity index, as the compact
+    JSON bytes that are served. Expired verdicts are skipped. None on a miss,
+    raises ValueError if the stored result is corrupt.
+    """
+    payload, claim_id = claim_result_cache.get_with_id(digest)
+    if payload is not None:
+        claim_retention.record_hit(claim_id, "memory")
+        logging.info(f"✅ Returning in-memory cached result for query: {query}")
+        return payload
+
+    similar_claim = claim_retention.fresh(Claim.query.filter_by(claim_digest=digest)).first()
+    if similar_claim is None:
+        threshold = current_app.config.get("CLAIM_SIMILARITY_THRESHOLD", 0.7)
+        similar_claim_id = claim_index.lookup(query, threshold)
+        if similar_claim_id is not None:
+            similar_claim = Claim.query.get(similar_claim_id)
+            if similar_claim is None:
+                claim_index.remove([similar_claim_id])  # Evicted by another worker
+            elif not claim_retention.is_fresh(similar_claim):
+                similar_claim = None
+    if similar_claim is None:
+        claim_retention.record_miss()
+        return None
+
+    with phase("serialize"):
+        payload = claim_codec.payload(similar_claim)
+    claim_retention.record_hit(similar_claim.id, "database")
+    claim_result_cache.put(digest, payload, similar_claim.id, claim_retention.expires_at(similar_claim))
+    logging.info(f"✅ Returning cached result for query: {query}")
+    return payload
+
+
+def store_claim(query, digest, results):
+    """
+    Stores a fresh Google result and makes it visible to later lookups without
+    refitting. Returns the trimmed result as the compact JSON bytes to serve.
+    """
+    with phase("serialize"):
+        payload, stored = claim_codec.encode(results)
+    new_claim = Claim(claim_text=query, result_data=stored)
+    db.session.add(new_claim)
+    db.session.commit()
+
+    claim_index.add(new_claim.id, new_claim.claim_text)
+    claim_result_cache.put(digest, payload, new_claim.id, claim_retention.expires_at(new_claim))
+    return payload
+
+
 @fact_checker.route("/check_claim", methods=["GET", "POST"])
 def check_claim():
-    FACT_CHECK_API_KEY = current_app.config["FACT_CHECK_API_KEY"]
-    
     try:
         logging.debug("🟢 Received request to /check_claim")
 
@@ -131,58 +186,31 @@ def check_claim():
 
         logging.debug(f"🔍 Processing query: {query}")
 
-        # Check for cached claims
-        past_claims = Claim.query.all()
-        past_texts = [c.claim_text for c in past_claims]
-
-        if past_texts:
-            vectorizer = TfidfVectorizer()
-            tfidf_matrix = vectorizer.fit_transform(past_texts + [query])
-            similarities = cosine_similarity(tfidf_matrix[-1], tfidf_matrix[:-1])
-            max_similarity = max(similarities[0]) if similarities[0].size > 0 else 0
-
-            if max_similarity > 0.7:
-                similar_claim = past_claims[similarities[0].argmax()]
-                
-                # ✅ Ensure JSON is properly formatted
-                try:
-                    cached_result = json.loads(similar_claim.result)
-                except json.JSONDecodeError as e:
-                    logging.error(f"⚠️ JSON Decode Error in Cached Result: {str(e)}")
-                    return jsonify({"error": "Cached result contains invalid JSON."}), 500
-
-                
-                logging.info(f"✅ Returning cached result for query: {query}")
-                return jsonify({"cached_result": cached_result}), 200
+        digest = claim_digest(query)
+        try:
+            payload = find_cached_claim(query, digest)
+        except ValueError as e:
+            logging.error(f"⚠️ JSON Decode Error in Cached Result: {str(e)}")
+            return jsonify({"error": "Cached result contains invalid JSON."}), 500
+        if payload is not None:
+            # Stored bytes go out as they are, no decode and re-encode per hit
+            return Response(response_body(payload), mimetype="application/json")
 
         # Fetch new data from Google API
-        url = f"https://factchecktools.googleapis.com/v1alpha1/claims:search?query={query}&key={FACT_CHECK_API_KEY}"
-        logging.debug(f"🌍 Sending request to Google API: {url}")
-
-        response = requests.get(url)
-        
-        if response.status_code != 200:
-            logging.error(f"🔴 Google API Error {response.status_code}: {response.text}")
-            return jsonify({"error": f"Google API Error: {response.status_code}"}), response.status_code
-
-        results = response.json()
-        logging.debug(f"📝 Google API Response: {json.dumps(results, indent=2)}")
-
-        # ✅ Store result in database with valid JSON format
         try:
-            formatted_json = json.dumps(results, ensure_ascii=False)
-            json.loads(formatted_json)  # Validate JSON before storing
-            new_claim = Claim(claim_text=query, result=formatted_json)
-            db.session.add(new_claim)
-            db.session.commit()
-        except json.JSONDecodeError as e:
-            logging.error(f"🔴 JSON Encoding Error: {str(e)}")
-            return jsonify({"error": "Failed to store result due to JSON formatting issue."}), 500
+            results = FactCheckService().search(query)
+        except FactCheckError as e:
+            return jsonify({"error": str(e)}), e.status_code
+        logging.debug(f"📝 Google API returned {len(results.get('claims', []))} claims for query: {query}")
 
+        payload = store_claim(query, digest, results)
+        return Response(payload + b"\n", mimetype="application/json")
 
     except json.JSONDecodeError as e:
         logging.error(f"🔴 JSON Decode Error: {str(e)}")
         return jsonify({"error": f"JSON Decode Error: {str(e)}"}), 500
+    except UpstreamThrottled as e:
+        return retry_later(e)
     except requests.RequestException as e:
         logging.error(f"🔴 Request Exception: {str(e)}")
         return jsonify({"error": f"Error fetching data: {str(e)}"}), 500
@@ -192,12 +220,119 @@ def check_claim():
 
 
 
+@fact_checker.route("/check_claims", methods=["POST"])
+def check_claims():
+    """
+    Fact-checks a batch of claims. Cache lookups for the whole batch run as one
+    digest query and one similarity matrix product, misses are fetched from
+    Google concurrently and stored with a single commit.
+    """
+    data = request.get_json(silent=True)
+    claims = data.get("claims") if isinstance(data, dict) else None
+    if not isinstance(claims, list) or not claims:
+        return jsonify({"error": "Invalid JSON payload. Provide a non-empty 'claims' list."}), 400
+
+    batch_limit = current_app.config.get("FACT_CHECK_BATCH_LIMIT", 100)
+    if len(claims) > batch_limit:
+        return jsonify({"error": f"Too many claims, the limit is {batch_limit} per request."}), 400
+
+    queries = [c.strip() if isinstance(c, str) else "" for c in claims]
+    digests = [claim_digest(q) for q in queries]
+    results = [None] * len(queries)
+
+    # Group repeated claims by digest so each one is looked up and fetched once
+    pending = {}
+    for i, (query, digest) in enumerate(zip(queries, digests)):
+        if not query:
+            results[i] = {"claim": claims[i], "error": "Claim must be a non-empty string."}
+            continue
+        payload, claim_id = claim_result_cache.get_with_id(digest)
+        if payload is not None:
+            claim_retention.record_hit(claim_id, "memory")
+            results[i] = {"claim": query, "cached": True, "result": json.loads(payload)}
+        else:
+            pending.setdefault(digest, []).append(i)
+
+    try:
+        stored = {}
+        if pending:
+            for claim in claim_retention.fresh(Claim.query.filter(Claim.claim_digest.in_(list(pending)))):
+                stored.setdefault(claim.claim_digest, claim)
+
+        unmatched = [d for d in pending if d not in stored]
+        if unmatched:
+            threshold = current_app.config.get("CLAIM_SIMILARITY_THRESHOLD", 0.7)
+            similar_ids = claim_index.lookup_many([queries[pending[d][0]] for d in unmatched], threshold)
+            matched = {d: claim_id for d, claim_id in zip(unmatched, similar_ids) if claim_id is not None}
+            if matched:
+                by_id = {c.id: c for c in claim_retention.fresh(Claim.query.filter(Claim.id.in_(list(matched.values()))))}
+                stored.update({d: by_id[claim_id] for d, claim_id in matched.items() if claim_id in by_id})
+
+        for digest, claim in stored.items():
+            try:
+                payload = claim_codec.payload(claim)
+                cached_result = json.loads(payload)
+            except ValueError as e:
+                logging.error(f"⚠️ JSON Decode Error in Cached Result: {str(e)}")
+                continue
+            claim_retention.record_hit(claim.id, "database")
+            claim_result_cache.put(digest, payload, claim.id, claim_retention.expires_at(claim))
+            for i in pending.pop(digest):
+                results[i] = {"claim": queries[i], "cached": True, "result": cached_result}
+
+        # 🌍 Fan the remaining misses out to Google in parallel
+        misses = list(pending)
+        if misses:
+            claim_retention.record_miss(len(misses))
+        try:
+            fetched = FactCheckService().search_many([queries[pending[d][0]] for d in misses])
+        except UpstreamThrottled as e:
+            return retry_later(e)
+
+        new_claims, new_results = [], []
+        for digest, (result, error) in zip(misses, fetched):
+            for i in pending[digest]:
+                if error is not None:
+                    results[i] = {"claim": queries[i], "error": error}
+                else:
+                    results[i] = {"claim": queries[i], "cached": False, "result": trim_result(result)}
+            if error is None:
+                query = queries[pending[digest][0]]
+                payload, stored_result = claim_codec.encode(result)
+                new_claims.append(Claim(claim_text=query, result_data=stored_result))
+                new_results.append((digest, payload))
+
+        if new_claims:
+            db.session.add_all(new_claims)
+            db.session.commit()
+            for claim, (digest, payload) in zip(new_claims, new_results):
+                claim_index.add(claim.id, claim.claim_text)
+                claim_result_cache.put(digest, payload, claim.id, claim_retention.expires_at(claim))
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"🔴 Unexpected server error: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
+
+    return jsonify({"results": results}), 200
+
+
 # Route to get innovation news
 @fact_checker.route("/innovation_news", methods=["GET"])
 def innovation_news():
     query = request.args.get("query", "innovation")
-    news_service = NewsService()
-    articles = news_service.get_innovation_articles(query=query)
+    language = request.args.get("language", "en")
+    page_size = min(request.args.get("page_size", 5, type=int), 100)  # NewsAPI caps pageSize at 100
+
+    # Shared cache keeps the common default query from hitting NewsAPI on every page view
+    try:
+        articles = news_cache.get_or_fetch(
+            news_cache.make_key(query, language, page_size),
+            lambda: NewsService().get_innovation_articles(query=query, language=language, page_size=page_size),
+            cacheable=lambda result: not (isinstance(result, dict) and "error" in result),
+        )
+    except UpstreamThrottled as e:
+        return retry_later(e)
 
     if "error" in articles:
         return jsonify({"error": articles["error"]}), 500
@@ -210,14 +345,30 @@ def coming_soon():
     upcoming_features = [
         {"feature": "User Profile Management", "status": "In Development"},
         {"feature": "Achievements Leaderboard", "status": "Planned"},
-        {"feature": "Real-Time Notifications", "status": "In Planning"}
+        {"feature": "Real-Time Notifications", "status": "Available"}
     ]
     return jsonify({"coming_soon": upcoming_features}), 200
 
 
+@fact_checker.route("/admin/claim_cache", methods=["GET"])
+@jwt_required()
+def claim_cache_stats():
+    """Claim cache size, freshness, hit rate and evictions (users listed in ADMIN_USERNAMES only)."""
+    if current_user.username not in current_app.config.get("ADMIN_USERNAMES", ()):
+        return jsonify({"error": "Admin access required"}), 403
+    return jsonify(claim_retention.stats()), 200
+
+
 # Auth Blueprint for user authentication routes
 auth_bp = Blueprint('auth', __name__)
 
+def retry_later(error):
+    """503 with Retry-After for a busy password hasher or a throttled upstream."""
+    response = jsonify({"error": str(error)})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -231,7 +382,10 @@ def register():
         return jsonify({"error": "Username already exists"}), 400
 
     new_user = User(username=username)
-    new_user.set_password(password)
+    try:
+        new_user.set_password(password)
+    except PasswordHasherBusy as e:
+        return retry_later(e)
     db.session.add(new_user)
     db.session.commit()
 
@@ -245,8 +399,15 @@ def login():
     password = data.get('password')
 
     user = User.query.filter_by(username=username).first()
-    if not user or not user.check_password(password):
-        return jsonify({"error": "Invalid username or password"}), 401
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({"error": "Invalid username or password"}), 401
+        if user.password_needs_rehash():
+            # Hash settings changed since this password was stored, upgrade it while we have it
+            user.set_password(password)
+            db.session.commit()
+    except PasswordHasherBusy as e:
+        return retry_later(e)
 
     access_token = create_access_token(identity=str(user.id))  # 🔥 Ensure it's a string
 
@@ -256,66 +417,79 @@ def login():
 @auth_bp.route('/protected', methods=['GET'])
 @jwt_required()
 def protected():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    return jsonify({"message": f"Hello, {user.username}!"}), 200
+    return jsonify({"message": f"Hello, {current_user.username}!"}), 200
 
 
 # Route to create or update user progress
 @progress_bp.route('/progress', methods=['POST'])
 @jwt_required()
 def update_progress():
-    # Get the user_id from the JWT identity
-    user_id = get_jwt_identity()
     data = request.get_json()
     achievement = data.get('achievement')
 
     if not achievement:
         return jsonify({"error": "Achievement is required"}), 400
 
-    # Check if the user already has progress
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    new_progress = Progress(user_id=user_id, achievement=achievement)
+    new_progress = Progress(user_id=current_user.id, achievement=achievement, created_at=datetime.utcnow())
     db.session.add(new_progress)
+    record_progress(current_user.id, [new_progress.created_at])  # Keep the forecast sums in step
     db.session.commit()
 
     return jsonify({"message": "Progress updated successfully"}), 200
 
 
-def predict_goal_completion(user_id):
-    progress_entries = Progress.query.filter_by(user_id=user_id).all()
-    if len(progress_entries) < 3:
-        return "Not enough data for predictions"
-
-    # Convert progress timestamps to numerical format
-    dates = [p.created_at.timestamp() for p in progress_entries]
-    values = list(range(1, len(dates) + 1))  # Representing progress numerically
-
-    # Convert to numpy arrays for ML model
-    X = np.array(dates).reshape(-1, 1)
-    y = np.array(values)
-
-    # Train a simple Linear Regression model
-    model = LinearRegression()
-    model.fit(X, y)
-
-    # Predict future completion date
-    future_value = len(values) + 1  # Next expected progress step
-    predicted_time = model.predict(np.array([[max(dates) + (86400 * 7)]]))  # Predict 1 week ahead
+@progress_bp.route('/progress/bulk', methods=['POST'])
+@jwt_required()
+def bulk_progress():
+    """
+    Adds many achievements for the logged-in user in one request, either a JSON
+    array of {"achievement", "created_at"?} objects or an NDJSON upload
+    (Content-Type: application/x-ndjson) that is read line by line as it streams in.
+    """
+    user = current_user
+
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        rows = parse_ndjson(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get("progress") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            return jsonify({"error": "Provide a JSON array of progress rows, or NDJSON lines."}), 400
+
+    report = ingest_progress(
+        user.id, rows,
+        batch_size=current_app.config.get("PROGRESS_BULK_BATCH_SIZE", 5000),
+        max_rows=current_app.config.get("PROGRESS_BULK_MAX_ROWS", 1000000),
+    )
+    logging.info(f"📥 Bulk progress for user {user.id}: {report['inserted']} inserted, {report['failed']} rejected")
+    return jsonify(report), 200
+
+
+@progress_bp.route('/progress/forecasts', methods=['POST'])
+@jwt_required()
+def get_progress_forecasts():
+    """Next-milestone forecasts for many users at once (dashboard use case, other users for ADMIN_USERNAMES only)."""
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    limit = current_app.config.get("FORECAST_BATCH_LIMIT", 10000)
 
-    return f"At your current pace, you'll complete your next milestone by {pd.to_datetime(predicted_time[0], unit='s')}."
+    if not isinstance(user_ids, list) or not all(isinstance(u, int) for u in user_ids):
+        return jsonify({"error": "Provide 'user_ids' as a list of integers"}), 400
+    if len(user_ids) > limit:
+        return jsonify({"error": f"Too many users, the limit is {limit} per request."}), 400
+    is_admin = current_user.username in current_app.config.get("ADMIN_USERNAMES", ())
+    if not is_admin and set(user_ids) - {current_user.id}:
+        return jsonify({"error": "Admin access required for other users' forecasts"}), 403
 
+    forecasts = predict_many(user_ids)
+    return jsonify({"forecasts": {str(u): f for u, f in forecasts.items()}}), 200
 
 
 @progress_bp.route('/progress/user/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user_progress(user_id):
     """Fetch progress for a specific user (admin use case)."""
-    user = User.query.get(user_id)
-    if not user:
+    if not user_cache.get(user_id):
         return jsonify({"error": "User not found"}), 404
 
     progress = Progress.query.filter_by(user_id=user_id).all()
@@ -335,124 +509,228 @@ def get_user_progress(user_id):
 
 @progress_bp.route('/progress', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_progress():
-    """Fetch all progress for the logged-in user."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    """Fetch all progress for the logged-in user, 304 if unchanged since the client's ETag."""
+    user_id = current_user.id
+    latest_id, count, latest_at = user_versions(Progress, user_id)
 
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    def build():
+        progress = Progress.query.filter_by(user_id=user_id).all()
+        return {"progress": [
+            {"id": p.id, "achievement": p.achievement, "created_at": p.created_at.isoformat()}
+            for p in progress
+        ]}
 
-    progress = Progress.query.filter_by(user_id=user_id).all()
-    progress_data = [
-        {"id": p.id, "achievement": p.achievement, "created_at": p.created_at.isoformat()}
-        for p in progress
-    ]
-
-    return jsonify({"progress": progress_data}), 200
-
-
-def get_goal_recommendations(user_id):
-    """
-    Fetches goal recommendations for a user by leveraging the Wolfram API for clustering.
-    """
-    user = User.query.get(user_id)
-    if not user:
-        logging.warning(f"⚠️ User {user_id} not found.")
-        return []
+    return conditional_json(collection_etag("progress", user_id, latest_id, count, latest_at), latest_at, build)
 
-    all_goals = [g.goal for g in Goal.query.all()]
-
-    if len(all_goals) < 3:
-        logging.warning("⚠️ Not enough goals available for clustering. Need at least 3.")
-        return []
-
-    WOLFRAM_API_URL = current_app.config.get("WOLFRAM_API_URL")
-
-    try:
-        response = requests.post(WOLFRAM_API_URL, json={"goals": all_goals})
-        wolfram_result = response.json()
-
-        logging.debug(f"🔍 AI Goal Recommendations Response: {json.dumps(wolfram_result, indent=2)}")
-
-        return wolfram_result.get("recommended_goals", [])
-
-    except Exception as e:
-        logging.error(f"🔴 AI Recommendation Error: {str(e)}")
-        return []
 
+def user_versions(model, user_id):
+    """(max id, row count, max created_at) of a user's rows, an index-only query that versions the list."""
+    return db.session.query(
+        db.func.max(model.id), db.func.count(model.id), db.func.max(model.created_at)
+    ).filter(model.user_id == user_id).one()
 
 
 @progress_bp.route('/goal', methods=['POST'])
 @jwt_required()
 def create_goal():
     """Handles goal creation with AI recommendations."""
-    user_id = get_jwt_identity()
-    data = request.get_json()
+    body, status = save_goal(get_jwt_identity(), request.get_json(), request.args.get("defer", type=int))
+    return jsonify(body), status
+
 
+def save_goal(user_id, data, defer=None):
+    """
+    Creates a goal and returns (response body, status). With `defer` (or
+    GOAL_RECOMMENDATIONS_DEFERRED) recommendations are computed after the
+    response, otherwise they are included in it.
+    """
     logging.info(f"🚀 Received Goal Creation Request: {data}")
 
     # Validate data
-    goal = data.get('goal')
-    target_date = data.get('target_date')
+    goal = data.get('goal') if isinstance(data, dict) else None
+    target_date = data.get('target_date') if isinstance(data, dict) else None
 
     if not goal or not target_date:
-        return jsonify({"error": "Goal and target_date are required"}), 400
+        return {"error": "Goal and target_date are required"}, 400
 
     # Convert `target_date` from string to datetime
     try:
         target_date = datetime.strptime(target_date, "%Y-%m-%d")
     except ValueError:
-        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+        return {"error": "Invalid date format. Use YYYY-MM-DD."}, 400
 
     new_goal = Goal(user_id=user_id, goal=goal, target_date=target_date)
     db.session.add(new_goal)
     db.session.commit()
 
+    # ⏳ Deferred mode answers right after the commit, the goal is clustered (loading or
+    # reclustering on first use) and its recommendations computed on the recommender's pool
+    if defer if defer is not None else current_app.config.get("GOAL_RECOMMENDATIONS_DEFERRED", False):
+        goal_recommender.schedule(new_goal.id)
+        logging.info(f"✅ Goal Saved! Recommendations queued for goal {new_goal.id}")
+        return {
+            "message": "Goal created successfully!",
+            "goal_id": new_goal.id,
+            "recommendations_url": f"/goals/{new_goal.id}/recommendations"
+        }, 202
+
     # 🔥 Fetch AI-based goal recommendations
-    recommendations = get_goal_recommendations(user_id)
+    goal_recommender.add(new_goal.id, new_goal.goal)
+    recommendations = goal_recommender.recommend_for_goal(new_goal)
 
     logging.info(f"✅ Goal Saved! AI Recommendations: {recommendations}")
 
-    return jsonify({
+    return {
         "message": "Goal created successfully!",
+        "goal_id": new_goal.id,
         "recommended_goals": recommendations
-    }), 200
+    }, 200
 
 
-@progress_bp.route('/goals', methods=['GET'])
+@progress_bp.route('/goals/<int:goal_id>/recommendations', methods=['GET'])
 @jwt_required()
-def get_goals():
-    """Fetch all goals for the logged-in user."""
+def get_goal_recommendations(goal_id):
+    """Fetch the recommendations computed for one of the logged-in user's goals."""
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    goal = Goal.query.get(goal_id)
 
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    if not goal or str(goal.user_id) != str(user_id):
+        return jsonify({"error": "Goal not found"}), 404
 
-    goals = Goal.query.filter_by(user_id=user_id).all()
-    goals_data = [
-        {"id": goal.id, "goal": goal.goal, "target_date": goal.target_date.strftime("%Y-%m-%d"), "created_at": goal.created_at}
-        for goal in goals
-    ]
+    if goal.recommendations is None:
+        # Still computing, or the worker that had it went away, (re)queue it here
+        goal_recommender.schedule(goal.id)
+        return jsonify({"goal_id": goal.id, "status": "pending"}), 202
 
-    return jsonify({"goals": goals_data}), 200
+    return jsonify({
+        "goal_id": goal.id,
+        "status": "done",
+        "recommended_goals": json.loads(goal.recommendations)
+    }), 200
 
 
-@progress_bp.route("/progress/community", methods=["GET"])
-def get_community_progress():
-    """Fetch progress for all users to display in the community progress tracker."""
-    all_progress = Progress.query.all()
+@progress_bp.route('/goals', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_goals():
+    """Fetch all goals for the logged-in user, 304 if unchanged since the client's ETag."""
+    user_id = current_user.id
+    latest_id, count, latest_at = user_versions(Goal, user_id)
 
-    if not all_progress:
-        return jsonify({"message": "No community progress found"}), 200
+    def build():
+        goals = Goal.query.filter_by(user_id=user_id).all()
+        return {"goals": [
+            {
+                "id": goal.id,
+                "goal": goal.goal,
+                "target_date": goal.target_date.strftime("%Y-%m-%d"),
+                "created_at": goal.created_at.isoformat() if goal.created_at else None,
+            }
+            for goal in goals
+        ]}
+
+    return conditional_json(collection_etag("goals", user_id, latest_id, count, latest_at), latest_at, build)
 
-    progress_data = [
-        {"id": p.id, "achievement": p.achievement, "user_id": p.user_id, "created_at": p.created_at.isoformat()}
-        for p in all_progress
-    ]
 
-    return jsonify({"progress": progress_data}), 200
+@progress_bp.route("/progress/community", methods=["GET"])
+@read_replica
+def get_community_progress():
+    """
+    Fetch progress for all users to display in the community progress tracker.
+    Pages are keyset-paginated on (created_at, id), pass `cursor` from the previous
+    page to continue. `format=ndjson` streams every row instead of paging.
+    Pages carry an ETag from the newest row, polls with it get a 304.
+    """
+    columns = db.session.query(Progress.id, Progress.achievement, Progress.user_id, Progress.created_at)
+
+    if request.args.get("format") == "ndjson":
+        return Response(stream_with_context(_stream_community_progress(columns)), mimetype="application/x-ndjson")
+
+    page_size = current_app.config.get("COMMUNITY_PAGE_SIZE", 50)
+    max_page_size = current_app.config.get("COMMUNITY_PAGE_SIZE_MAX", 500)
+    limit = max(1, min(request.args.get("limit", page_size, type=int), max_page_size))
+    cursor = request.args.get("cursor")
+
+    def build():
+        rows, next_cursor = keyset_page(columns, Progress, cursor=cursor, limit=limit)
+        if not rows and not cursor:
+            return {"message": "No community progress found"}
+        return {"progress": [
+            {"id": p.id, "achievement": p.achievement, "user_id": p.user_id, "created_at": p.created_at.isoformat()}
+            for p in rows
+        ], "next_cursor": next_cursor}
+
+    # Both maxima are single index lookups, a table-wide count would not be
+    latest_id, latest_at = db.session.query(db.func.max(Progress.id), db.func.max(Progress.created_at)).one()
+    try:
+        return conditional_json(collection_etag("community", latest_id, latest_at), latest_at, build)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _stream_community_progress(columns):
+    """Yields one JSON line per row from a server-side cursor, memory stays flat."""
+    rows = (
+        columns.order_by(Progress.created_at.desc(), Progress.id.desc())
+        .execution_options(stream_results=True)
+        .yield_per(1000)
+    )
+    for p in rows:
+        yield json.dumps({
+            "id": p.id, "achievement": p.achievement, "user_id": p.user_id, "created_at": p.created_at.isoformat()
+        }) + "\n"
+
+
+@progress_bp.route("/progress/community/stream", methods=["GET"])
+def stream_community_progress():
+    """
+    Server-sent events for newly committed progress and community stories.
+    Each event id is a resume cursor, reconnecting clients send it back as
+    `Last-Event-ID` (or `cursor`) and first receive whatever they missed.
+    Unless PROGRESS_FEED_ENABLED is set it answers 204, which tells
+    EventSource clients to stop reconnecting.
+    """
+    if not progress_feed.enabled:
+        return Response(status=204)
+
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor")
+    last_ids = progress_feed.latest_ids()
+    resume_from = decode_cursor(cursor)
+    # Subscribe before backfilling so nothing committed in between is lost, duplicates are skipped by id
+    subscriber = progress_feed.subscribe()
+    backlog = progress_feed.backfill(resume_from, limit=current_app.config.get("PROGRESS_FEED_BACKFILL", 500))
+    last_ids.update(resume_from)
+    keepalive = current_app.config.get("PROGRESS_FEED_KEEPALIVE", 15)
+
+    def events():
+        try:
+            yield f"retry: 3000\nid: {encode_cursor(last_ids)}\n\n"
+            for kind, payload in backlog:
+                yield from _feed_event(kind, payload)
+            while True:
+                try:
+                    item = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:  # Dropped for falling behind, the client resumes from its last id
+                    return
+                yield from _feed_event(*item)
+        finally:
+            progress_feed.unsubscribe(subscriber)
+
+    def _feed_event(kind, payload):
+        if payload["id"] <= last_ids.get(kind, 0):
+            return
+        last_ids[kind] = payload["id"]
+        yield f"id: {encode_cursor(last_ids)}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Keep reverse proxies from buffering the stream
+    })
 
 
 # Function to register all blueprints
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import random
+
+import aiohttp
+import requests
+from multidict import CIMultiDict
+
+from app.services.http_client import CircuitOpenError, HttpClient, http_client
+from app.services.upstream_quota import upstream_quota
+
+
+class AsyncResponse:
+    """The parts of `requests.Response` the services read, so parsing code is shared."""
+
+    def __init__(self, status_code, content, headers, url):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class AsyncHttpClient:
+    """
+    aiohttp counterpart of `HttpClient` for the async serving mode.
+
+    One pooled session per event loop lets a worker hold thousands of upstream
+    waits without a thread each. Timeouts, retries with jittered backoff, the
+    per-upstream circuit breakers and quotas match the sync client (the breakers
+    are shared with it), and transport errors surface as `requests` exceptions so callers
+    handle both clients the same way.
+    """
+
+    RETRY_STATUSES = HttpClient.RETRY_STATUSES
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"})
+
+    def __init__(self):
+        self.connect_timeout = 3.05
+        self.read_timeout = 10.0
+        self.max_retries = 2
+        self.backoff_factor = 0.3
+        self.max_connections = 1000
+        self.max_connections_per_host = 200
+        self._session = None
+        self._loop = None
+
+    def init_app(self, app):
+        self.connect_timeout = app.config.get("HTTP_CONNECT_TIMEOUT", self.connect_timeout)
+        self.read_timeout = app.config.get("HTTP_READ_TIMEOUT", self.read_timeout)
+        self.max_retries = app.config.get("HTTP_MAX_RETRIES", self.max_retries)
+        self.backoff_factor = app.config.get("HTTP_BACKOFF_FACTOR", self.backoff_factor)
+        self.max_connections = app.config.get("HTTP_ASYNC_MAX_CONNECTIONS", self.max_connections)
+        self.max_connections_per_host = app.config.get("HTTP_ASYNC_MAX_PER_HOST", self.max_connections_per_host)
+        app.extensions["async_http_client"] = self
+
+    def _get_session(self):
+        # Sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, limit_per_host=self.max_connections_per_host, ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), 60.0)
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_factor)
+
+    async def request(self, upstream, method, url, **kwargs):
+        """
+        Sends a request to the named upstream. Raises CircuitOpenError without
+        touching the network while that upstream's circuit is open, and
+        UpstreamThrottled when its quota can't take the call in time. A recent
+        error response to the same request is replayed instead of re-sent.
+        """
+        error_key = upstream_quota.request_key(upstream, method, url, kwargs)
+        cached_error = upstream_quota.cached_error(upstream, error_key)
+        if cached_error is not None:
+            status_code, content, headers, cached_url = cached_error
+            return AsyncResponse(status_code, content, CIMultiDict(headers), cached_url)
+
+        breaker = http_client.breaker(upstream)
+        if breaker.state == "open":
+            raise CircuitOpenError(f"{upstream} is temporarily unavailable (circuit open)")
+        await upstream_quota.acquire_async(upstream)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{upstream} is temporarily unavailable (circuit open)")
+
+        session = self._get_session()
+        attempts = self.max_retries + 1 if method.upper() in self.IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            try:
+                async with session.request(method, url, **kwargs) as raw:
+                    response = AsyncResponse(raw.status, await raw.read(), raw.headers, str(raw.url))
+            except asyncio.TimeoutError as e:
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                breaker.record_failure()
+                raise requests.Timeout(f"{upstream} timed out") from e
+            except aiohttp.ClientError as e:
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                breaker.record_failure()
+                raise requests.ConnectionError(str(e)) from e
+
+            if response.status_code in self.RETRY_STATUSES and attempt + 1 < attempts:
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            break
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if response.status_code >= 400:
+            upstream_quota.record(
+                upstream, error_key, response.status_code, response.content, response.headers, response.url
+            )
+        return response
+
+    async def get(self, upstream, url, **kwargs):
+        return await self.request(upstream, "GET", url, **kwargs)
+
+    async def post(self, upstream, url, **kwargs):
+        return await self.request(upstream, "POST", url, **kwargs)
+
+
+async_http_client = AsyncHttpClient()
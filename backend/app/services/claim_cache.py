@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ClaimResultCache:
+    """
+    In-process LRU of normalized-claim digest -> served result bytes.
+
+    Exact repeats of a claim are answered from here without touching the
+    database, the similarity index or any JSON encoding. Entries remember the claim
+    row they came from, so hits can be credited to it, and stop being served
+    at `expires_at` (epoch seconds) when the row's verdict goes stale.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get("CLAIM_RESULT_CACHE_SIZE", self.max_size)
+        app.extensions["claim_result_cache"] = self
+
+    def get(self, digest):
+        return self.get_with_id(digest)[0]
+
+    def get_with_id(self, digest):
+        """(result, claim id) for a live entry, else (None, None)."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None, None
+            result, claim_id, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[digest]
+                return None, None
+            self._entries.move_to_end(digest)
+            return result, claim_id
+
+    def put(self, digest, result, claim_id=None, expires_at=None):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (result, claim_id, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+claim_result_cache = ClaimResultCache()
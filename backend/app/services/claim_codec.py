@@ -0,0 +1,227 @@
+import json
+import logging
+import struct
+import threading
+import zlib
+
+from extensions import db
+from app.models import Claim, ClaimResultDictionary
+
+try:
+    import zstandard
+except ImportError:  # Optional, results are zlib-compressed without it
+    zstandard = None
+
+FORMAT_VERSION = 1
+CODEC_RAW, CODEC_ZLIB, CODEC_ZSTD, CODEC_ZSTD_DICT = 0, 1, 2, 3
+HEADER = struct.Struct(">BB")  # format version, codec
+DICT_ID = struct.Struct(">I")  # follows the header for CODEC_ZSTD_DICT
+
+# What the frontend and API clients read from a Fact Check API response, the rest is dropped
+CLAIM_FIELDS = ("text", "claimant", "claimDate")
+REVIEW_FIELDS = ("url", "title", "reviewDate", "textualRating", "languageCode")
+PUBLISHER_FIELDS = ("name", "site")
+
+
+class CorruptClaimResult(ValueError):
+    """Raised when a stored result can't be decoded."""
+
+
+def trim_result(result):
+    """The served subset of a Fact Check API response, always {"claims": [...]}."""
+    claims = []
+    for claim in (result or {}).get("claims") or []:
+        if not isinstance(claim, dict):
+            continue
+        trimmed = {key: claim[key] for key in CLAIM_FIELDS if key in claim}
+        reviews = []
+        for review in claim.get("claimReview") or []:
+            if not isinstance(review, dict):
+                continue
+            kept = {key: review[key] for key in REVIEW_FIELDS if key in review}
+            if isinstance(review.get("publisher"), dict):
+                kept["publisher"] = {key: review["publisher"][key] for key in PUBLISHER_FIELDS if key in review["publisher"]}
+            reviews.append(kept)
+        trimmed["claimReview"] = reviews
+        claims.append(trimmed)
+    return {"claims": claims}
+
+
+def compact(result):
+    """Trimmed result as compact UTF-8 JSON, the bytes served on a cache hit."""
+    return json.dumps(trim_result(result), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def pack(payload, codec, level=None, dictionary=None):
+    """
+    Stored form of `payload`: a (version, codec) header, the dictionary id for
+    CODEC_ZSTD_DICT, then the compressed bytes. `dictionary` is a
+    (dictionary id, compressor) pair and only used with CODEC_ZSTD_DICT.
+    """
+    if codec == CODEC_RAW:
+        body = payload
+    elif codec == CODEC_ZLIB:
+        body = zlib.compress(payload, 6 if level is None else level)
+    elif codec == CODEC_ZSTD:
+        body = zstandard.ZstdCompressor(level=3 if level is None else level).compress(payload)
+    elif codec == CODEC_ZSTD_DICT:
+        dict_id, compressor = dictionary
+        return HEADER.pack(FORMAT_VERSION, codec) + DICT_ID.pack(dict_id) + compressor.compress(payload)
+    else:
+        raise ValueError(f"Unknown claim result codec {codec}")
+    return HEADER.pack(FORMAT_VERSION, codec) + body
+
+
+def unpack(blob, decompressor_for=None):
+    """
+    Payload bytes of a stored result. `decompressor_for(dict_id)` supplies
+    a zstd decompressor for rows compressed with a trained dictionary.
+    """
+    blob = bytes(blob)
+    if len(blob) < HEADER.size:
+        raise CorruptClaimResult("Stored claim result is truncated")
+    version, codec = HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION:
+        raise CorruptClaimResult(f"Unsupported claim result format version {version}")
+    body = blob[HEADER.size:]
+    try:
+        if codec == CODEC_RAW:
+            return body
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(body)
+        if zstandard is None:
+            raise CorruptClaimResult("The 'zstandard' package is required to read this claim result")
+        if codec == CODEC_ZSTD:
+            return zstandard.ZstdDecompressor().decompress(body)
+        if codec == CODEC_ZSTD_DICT:
+            if decompressor_for is None:
+                raise CorruptClaimResult("Claim result needs its zstd dictionary to be read")
+            (dict_id,) = DICT_ID.unpack_from(body)
+            return decompressor_for(dict_id).decompress(body[DICT_ID.size:])
+    except (zlib.error, struct.error) as e:
+        raise CorruptClaimResult(f"Stored claim result is corrupt: {e}") from e
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise CorruptClaimResult(f"Stored claim result is corrupt: {e}") from e
+        raise
+    raise CorruptClaimResult(f"Unknown claim result codec {codec}")
+
+
+def response_body(payload):
+    """The /check_claim cache-hit body built around stored bytes, nothing is decoded or re-encoded."""
+    return b'{"cached_result":' + payload + b"}\n"
+
+
+class ClaimResultCodec:
+    """
+    Reads and writes `Claim.result_data`.
+
+    Results are trimmed to the served fields, encoded as compact JSON and
+    compressed with zstd (using the newest trained dictionary when there is
+    one) or zlib when zstandard isn't installed. Decoding yields the compact
+    JSON bytes, which cache hits splice straight into the response. Rows the
+    migration hasn't converted are still read from the legacy `result` text.
+    New dictionaries are picked up by each worker on restart.
+    """
+
+    CODECS = {"none": CODEC_RAW, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+    def __init__(self, codec="auto", level=None, use_dictionary=True, dictionary_size=64 * 1024, dictionary_samples=5000):
+        self.codec = codec
+        self.level = level
+        self.use_dictionary = use_dictionary
+        self.dictionary_size = dictionary_size
+        self.dictionary_samples = dictionary_samples
+        self._dictionaries = {}  # dictionary id -> zstandard.ZstdCompressionDict
+        self._current = None  # (dictionary id or None,) once looked up
+        self._local = threading.local()  # zstd (de)compressors aren't safe to share between threads
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.codec = app.config.get("CLAIM_RESULT_CODEC", self.codec)
+        self.level = app.config.get("CLAIM_RESULT_COMPRESSION_LEVEL", self.level)
+        self.use_dictionary = app.config.get("CLAIM_RESULT_DICTIONARY", self.use_dictionary)
+        if self.codec == "auto":
+            self.codec = "zstd" if zstandard is not None else "zlib"
+        if self.codec not in self.CODECS:
+            raise RuntimeError(f"❌ Unknown CLAIM_RESULT_CODEC '{self.codec}', use one of auto, {', '.join(self.CODECS)}")
+        if self.codec == "zstd" and zstandard is None:
+            raise RuntimeError("❌ The 'zstandard' package is required for CLAIM_RESULT_CODEC=zstd")
+        app.extensions["claim_codec"] = self
+
+        @app.cli.command("claim-result-dictionary")
+        def claim_result_dictionary():
+            """Train a zstd dictionary on recent claim results for new rows to use."""
+            dict_id = self.train_dictionary()
+            print(f"Claim result dictionary {dict_id} stored, restart workers to compress with it")
+
+    def _dictionary(self, dict_id):
+        with self._lock:
+            dictionary = self._dictionaries.get(dict_id)
+        if dictionary is None:
+            row = ClaimResultDictionary.query.get(dict_id)
+            if row is None:
+                raise CorruptClaimResult(f"Claim result dictionary {dict_id} is missing")
+            dictionary = zstandard.ZstdCompressionDict(row.data)
+            with self._lock:
+                self._dictionaries[dict_id] = dictionary
+        return dictionary
+
+    def _decompressor(self, dict_id):
+        decompressors = self._local.__dict__.setdefault("decompressors", {})
+        if dict_id not in decompressors:
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dictionary(dict_id))
+        return decompressors[dict_id]
+
+    def _compressor(self):
+        """(dictionary id, compressor) for the newest dictionary, or None to compress without one."""
+        if self._current is None:
+            dict_id = None
+            if self.use_dictionary:
+                dict_id = db.session.query(db.func.max(ClaimResultDictionary.id)).scalar()
+            self._current = (dict_id,)
+        dict_id = self._current[0]
+        if dict_id is None:
+            return None
+        compressors = self._local.__dict__.setdefault("compressors", {})
+        if dict_id not in compressors:
+            level = 3 if self.level is None else self.level
+            compressors[dict_id] = zstandard.ZstdCompressor(level=level, dict_data=self._dictionary(dict_id))
+        return dict_id, compressors[dict_id]
+
+    def encode(self, result):
+        """(payload, stored blob) for a fresh API result, the payload is what gets served."""
+        payload = compact(result)
+        codec = self.CODECS[self.codec]
+        dictionary = self._compressor() if codec == CODEC_ZSTD else None
+        if dictionary is not None:
+            return payload, pack(payload, CODEC_ZSTD_DICT, dictionary=dictionary)
+        return payload, pack(payload, codec, self.level)
+
+    def payload(self, claim):
+        """Compact JSON bytes of a stored claim's result, raises ValueError if it is corrupt."""
+        if claim.result_data is not None:
+            return unpack(claim.result_data, self._decompressor)
+        # Not converted yet, json.JSONDecodeError is a ValueError
+        return compact(json.loads(claim.result) if claim.result else {})
+
+    def train_dictionary(self):
+        """Trains a dictionary on the newest results, stores it and returns its id."""
+        if zstandard is None:
+            raise RuntimeError("❌ The 'zstandard' package is required to train a dictionary")
+        claims = Claim.query.order_by(Claim.id.desc()).limit(self.dictionary_samples)
+        samples = []
+        for claim in claims:
+            try:
+                samples.append(self.payload(claim))
+            except ValueError:
+                continue
+        dictionary = zstandard.train_dictionary(self.dictionary_size, samples)
+        row = ClaimResultDictionary(data=dictionary.as_bytes())
+        db.session.add(row)
+        db.session.commit()
+        logging.info(f"🗜️ Trained claim result dictionary {row.id} on {len(samples)} results")
+        return row.id
+
+
+claim_codec = ClaimResultCodec()
@@ -0,0 +1,477 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy import sparse
+
+from extensions import db
+from app.models import Claim
+from app.services.claim_snapshot import SnapshotError, current_snapshot, load_snapshot, write_snapshot
+from app.services.metrics import phase
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines, only one process there anyway
+    fcntl = None
+
+
+class ClaimIndex:
+    """
+    Long-lived TF-IDF similarity index over the `claims` table.
+
+    The vectorizer is fitted once at startup. Claims inserted afterwards are
+    transformed with the existing vocabulary and appended to a small tail
+    matrix, so a lookup never refits anything. Once the appended rows exceed
+    `refit_ratio` of the fitted corpus the whole index is refitted so the
+    vocabulary and IDF weights keep up with the table.
+
+    When `snapshot_dir` is set the fitted state is written to disk and every
+    worker memory-maps the same read-only snapshot at boot. A background
+    compaction step folds the tail into a new snapshot; only one process
+    performs it at a time and the others switch over on their next sync.
+
+    Evicted claims are masked out of lookups by `remove` and physically
+    dropped at the next fold, compaction or refit; they count towards the
+    refit threshold like appended rows since the IDF weights still include them.
+
+    Ids are allocated before commit, so a claim can become visible after a
+    higher id has already been indexed. `sync` keeps rescanning the ids above
+    a low-water mark, the newest id seen at least `settle_time` seconds ago,
+    and indexes whatever it has not seen yet.
+    """
+
+    TAIL_FOLD_SIZE = 1024  # Tail rows are merged into the base matrix past this size
+
+    def __init__(self, refit_ratio=0.25, sync_interval=5.0, snapshot_dir=None, compact_interval=300.0,
+                 settle_time=60.0):
+        self.refit_ratio = refit_ratio
+        self.sync_interval = sync_interval
+        self.snapshot_dir = snapshot_dir
+        self.compact_interval = compact_interval
+        self.settle_time = settle_time
+        self._lock = threading.RLock()
+        self._watermarks = deque()     # (monotonic time, max id) per sync, advances `_low_water`
+        self._compactor = None
+        self._app = None
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self.vectorizer = None
+        self._base = None              # CSR matrix, one L2-normalised row per claim
+        self._base_ids = np.empty(0, dtype=np.int64)
+        self._tail_rows = []           # Rows added since the last fold or snapshot
+        self._tail_ids = []
+        self._tail = None              # Cached vstack of `_tail_rows`
+        self._fitted_size = 0
+        self._appended = 0
+        self._removed = set()          # Evicted ids still present in the matrices
+        self._base_live = None         # Boolean row mask over `_base`, None while nothing is removed
+        self._evicted = 0
+        self._max_id = 0
+        self._low_water = 0            # Ids at or below this have settled, `sync` stops rescanning them
+        self._recent_ids = set()       # Indexed ids above `_low_water`
+        self._last_sync = 0.0
+        self._snapshot_path = None
+
+    def init_app(self, app):
+        self.refit_ratio = app.config.get("CLAIM_INDEX_REFIT_RATIO", self.refit_ratio)
+        self.sync_interval = app.config.get("CLAIM_INDEX_SYNC_INTERVAL", self.sync_interval)
+        self.snapshot_dir = app.config.get("CLAIM_INDEX_SNAPSHOT_DIR", self.snapshot_dir)
+        self.compact_interval = app.config.get("CLAIM_INDEX_COMPACT_INTERVAL", self.compact_interval)
+        self.settle_time = app.config.get("CLAIM_INDEX_SETTLE_TIME", self.settle_time)
+        app.extensions["claim_index"] = self
+        self._app = app
+
+        # Otherwise the index is built on the first lookup, `flask db` commands never pay for it
+        if app.config.get("PRELOAD_MODELS"):
+            with app.app_context():
+                self.load()
+
+        @app.cli.command("claim-index-snapshot")
+        def claim_index_snapshot():
+            """Refit the claim index and publish a fresh snapshot."""
+            self.rebuild()
+            print(f"Claim index snapshot written with {len(self)} claims")
+
+    def __len__(self):
+        return len(self._base_ids) + len(self._tail_ids)
+
+    def load(self):
+        """Maps the published snapshot (or fits from scratch) and catches up with newer claims."""
+        with self._lock:
+            if not self._load_current_snapshot():
+                self.rebuild()
+            self._loaded = True
+        # Fold in anything committed after the snapshot was taken
+        self.sync(force=True)
+
+    def _ensure_loaded(self):
+        self._start_compactor()
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    @staticmethod
+    def _load_claims(after_id=0):
+        """Streams (id, claim_text) pairs without materialising full Claim rows."""
+        return (
+            db.session.query(Claim.id, Claim.claim_text)
+            .filter(Claim.id > after_id)
+            .order_by(Claim.id)
+            .yield_per(10000)
+        )
+
+    def _install(self, vectorizer, matrix, ids, max_id, fitted_size, low_water, snapshot_path=None):
+        with self._lock:
+            self._reset()
+            if matrix is not None:
+                self.vectorizer = vectorizer
+                self._base = matrix
+                self._base_ids = ids
+                self._fitted_size = fitted_size
+                self._recent_ids = set(ids[ids > low_water].tolist())
+            self._max_id = max_id
+            self._low_water = low_water
+            self._last_sync = time.monotonic()
+            self._snapshot_path = snapshot_path
+
+    def rebuild(self):
+        """Fits a fresh vectorizer over every stored claim."""
+        from sklearn.feature_extraction.text import TfidfVectorizer  # Deferred, sklearn is slow to import
+
+        # Anything inserted before the settle window has committed or never will
+        settled_before = datetime.utcnow() - timedelta(seconds=self.settle_time)
+        settled = db.session.query(db.func.max(Claim.id)).filter(Claim.timestamp < settled_before).scalar() or 0
+
+        ids, texts = [], []
+        for claim_id, claim_text in self._load_claims():
+            ids.append(claim_id)
+            texts.append(claim_text)
+
+        vectorizer = TfidfVectorizer()
+        try:
+            with phase("vectorize"):
+                matrix = vectorizer.fit_transform(texts).tocsr() if texts else None
+        except ValueError:
+            # Every stored claim was empty after tokenisation
+            matrix = None
+
+        max_id = ids[-1] if ids else 0
+        low_water = min(max(self._low_water, settled), max_id)
+        ids = np.asarray(ids, dtype=np.int64)
+        path = None
+        if matrix is not None and self.snapshot_dir:
+            try:
+                path = write_snapshot(self.snapshot_dir, vectorizer, matrix, ids, max_id, low_water, len(ids))
+                self._load_snapshot(path)
+            except (OSError, SnapshotError) as e:
+                logging.warning(f"⚠️ Claim index snapshot unusable, keeping the index in memory: {e}")
+                path = None
+        if path is None:
+            self._install(vectorizer, matrix, ids, max_id, len(ids), low_water)
+
+        logging.info(f"📚 Claim index built with {len(ids)} claims")
+
+    def _load_snapshot(self, path):
+        vectorizer, matrix, ids, manifest = load_snapshot(path)
+        self._install(
+            vectorizer, matrix, ids, manifest["max_id"], manifest["fitted_size"],
+            low_water=manifest["low_water"], snapshot_path=path,
+        )
+
+    def _load_current_snapshot(self):
+        """Memory-maps the published snapshot, returns False if there is none to use."""
+        if not self.snapshot_dir:
+            return False
+        path = current_snapshot(self.snapshot_dir)
+        if path is None:
+            return False
+        try:
+            self._load_snapshot(path)
+        except SnapshotError as e:
+            logging.warning(f"⚠️ Ignoring claim index snapshot: {e}")
+            return False
+        logging.info(f"📚 Claim index mapped from snapshot {path} ({len(self)} claims)")
+        return True
+
+    def add(self, claim_id, claim_text):
+        """Appends a newly committed claim using the current vocabulary."""
+        self._ensure_loaded()
+        with self._lock:
+            if self._indexed(claim_id):
+                # Already picked up by `sync`
+                return
+            if self.vectorizer is None:
+                # Nothing fitted yet, the first claim seeds the index
+                self.rebuild()
+                return
+
+            with phase("vectorize"):
+                self._tail_rows.append(self.vectorizer.transform([claim_text]))
+            self._tail_ids.append(claim_id)
+            self._recent_ids.add(claim_id)
+            self._tail = None
+            self._appended += 1
+            self._max_id = max(self._max_id, claim_id)
+
+            if self.snapshot_dir:
+                # Folding would copy the shared mapping into this worker, compaction handles it
+                return
+            if self._refit_due():
+                self.rebuild()
+            elif len(self._tail_rows) >= self.TAIL_FOLD_SIZE:
+                self._fold_tail()
+
+    def _indexed(self, claim_id):
+        if claim_id > self._low_water:
+            return claim_id in self._recent_ids
+        # A settled id is only seen again if its commit outlasted `settle_time`, a scan is fine
+        return claim_id in self._tail_ids or bool(np.any(self._base_ids == claim_id))
+
+    def remove(self, claim_ids):
+        """Stops returning evicted claims, refitting once removals and appends drift too far."""
+        claim_ids = {int(claim_id) for claim_id in claim_ids}
+        if not claim_ids or not self._loaded:
+            return
+        with self._lock:
+            claim_ids -= self._removed
+            if not claim_ids:
+                return
+            self._removed |= claim_ids
+            self._evicted += len(claim_ids)
+            self._base_live = ~np.isin(self._base_ids, np.fromiter(self._removed, dtype=np.int64))
+            self._tail = None
+
+            if not self.snapshot_dir and self._refit_due():
+                self.rebuild()
+
+    def _refit_due(self):
+        drift = self._appended + self._evicted
+        return drift > max(self._fitted_size * self.refit_ratio, self.TAIL_FOLD_SIZE)
+
+    def _live_rows(self, matrix, ids):
+        """`matrix` and `ids` without the removed claims."""
+        if not self._removed:
+            return matrix, ids
+        live = ~np.isin(ids, np.fromiter(self._removed, dtype=np.int64))
+        return matrix[live], ids[live]
+
+    def _fold_tail(self):
+        matrix = sparse.vstack([self._base] + self._tail_rows, format="csr")
+        ids = np.concatenate([self._base_ids, np.asarray(self._tail_ids, dtype=np.int64)])
+        self._base, self._base_ids = self._live_rows(matrix, ids)
+        self._tail_rows, self._tail_ids, self._tail = [], [], None
+        self._removed, self._base_live = set(), None
+
+    def sync(self, force=False):
+        """
+        Picks up claims committed by other worker processes since the last sync,
+        switching to a newer published snapshot first if one exists. Only runs
+        every `sync_interval` seconds and is a primary-key range scan, the ids
+        above the low-water mark are rescanned for claims that committed late.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        if self.snapshot_dir:
+            path = current_snapshot(self.snapshot_dir)
+            if path and path != self._snapshot_path:
+                self._load_current_snapshot()
+
+        low_water, max_id = self._low_water, self._max_id
+        late_ids = [
+            claim_id
+            for (claim_id,) in db.session.query(Claim.id).filter(Claim.id > low_water, Claim.id <= max_id)
+            if not self._indexed(claim_id)
+        ]
+        rows = self._load_claims(after_id=max_id).all()
+        if late_ids:
+            rows += db.session.query(Claim.id, Claim.claim_text).filter(Claim.id.in_(late_ids)).all()
+        for claim_id, claim_text in rows:
+            self.add(claim_id, claim_text)
+        self._settle()
+
+    def _settle(self):
+        """Moves the low-water mark up to the newest id seen at least `settle_time` ago."""
+        now = time.monotonic()
+        with self._lock:
+            self._watermarks.append((now, self._max_id))
+            low_water = self._low_water
+            while self._watermarks and now - self._watermarks[0][0] >= self.settle_time:
+                low_water = max(low_water, self._watermarks.popleft()[1])
+            if low_water > self._low_water:
+                self._low_water = low_water
+                self._recent_ids = {claim_id for claim_id in self._recent_ids if claim_id > low_water}
+
+    def compact(self):
+        """
+        Folds claims added since the last snapshot into a new one, refitting
+        instead when the vocabulary has drifted too far. Returns False if
+        another process holds the compaction lock.
+        """
+        if not self.snapshot_dir:
+            return False
+        self._ensure_loaded()
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+        with open(os.path.join(self.snapshot_dir, "compact.lock"), "w") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+
+            self.sync(force=True)
+            with self._lock:
+                if self._refit_due() or self.vectorizer is None:
+                    self.rebuild()
+                    return True
+                if not self._tail_rows:
+                    return True
+                vectorizer, fitted_size = self.vectorizer, self._fitted_size
+                max_id, low_water = self._max_id, self._low_water
+                matrix, ids = self._live_rows(
+                    sparse.vstack([self._base] + self._tail_rows, format="csr"),
+                    np.concatenate([self._base_ids, np.asarray(self._tail_ids, dtype=np.int64)]),
+                )
+                appended, evicted = self._appended, self._evicted
+
+            path = write_snapshot(self.snapshot_dir, vectorizer, matrix, ids, max_id, low_water, fitted_size)
+            self._load_snapshot(path)
+            with self._lock:
+                # The vocabulary is unchanged, keep counting drift towards the next refit
+                self._appended, self._evicted = appended, evicted
+            logging.info(f"📚 Claim index compacted into {path} ({len(ids)} claims)")
+            return True
+
+    def _start_compactor(self):
+        # Started on first use so the thread lives in the worker, not a pre-fork master
+        # (a thread object inherited across fork reports it isn't alive)
+        if self._app is None or not (self.snapshot_dir and self.compact_interval):
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            app = self._app
+
+            def run():
+                while True:
+                    time.sleep(self.compact_interval)
+                    try:
+                        with app.app_context():
+                            self.compact()
+                            db.session.remove()
+                    except Exception as e:
+                        logging.error(f"🔴 Claim index compaction failed: {str(e)}", exc_info=True)
+
+            self._compactor = threading.Thread(target=run, name="claim-index-compactor", daemon=True)
+            self._compactor.start()
+
+    def _snapshot(self):
+        """Consistent (vectorizer, blocks) view, each block is (matrix, ids, live row mask or None)."""
+        with self._lock:
+            if self._tail is None and self._tail_rows:
+                self._tail = sparse.vstack(self._tail_rows, format="csr")
+            if self.vectorizer is None:
+                return None, []
+            blocks = [(self._base, self._base_ids, self._base_live)]
+            if self._tail is not None:
+                tail_ids = np.asarray(self._tail_ids, dtype=np.int64)
+                tail_live = None
+                if self._removed:
+                    tail_live = ~np.isin(tail_ids, np.fromiter(self._removed, dtype=np.int64))
+                blocks.append((self._tail, tail_ids, tail_live))
+            return self.vectorizer, blocks
+
+    def nearest(self, text, k=1):
+        """
+        Returns up to `k` (claim_id, cosine_similarity) pairs, best match first.
+        Rows are L2-normalised by the vectorizer so a sparse dot product is the cosine.
+        """
+        vectorizer, blocks = self._snapshot()
+        if vectorizer is None:
+            return []
+
+        with phase("vectorize"):
+            query_vec = vectorizer.transform([text])
+        if query_vec.nnz == 0:
+            return []
+
+        all_scores, all_ids = [], []
+        for matrix, ids, live in blocks:
+            scores = (matrix @ query_vec.T).toarray().ravel()
+            if live is not None:
+                scores[~live] = 0.0
+            all_scores.append(scores)
+            all_ids.append(ids)
+        scores = np.concatenate(all_scores)
+        ids = np.concatenate(all_ids)
+
+        k = min(k, scores.size)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def best_matches(self, texts):
+        """
+        Scores a whole batch of texts against the index in one sparse matrix
+        product. Returns a list of (claim_id, cosine_similarity) or None per text.
+        """
+        vectorizer, blocks = self._snapshot()
+        if vectorizer is None or not texts:
+            return [None] * len(texts)
+
+        with phase("vectorize"):
+            query_matrix = vectorizer.transform(texts)
+
+        best_scores = np.zeros(len(texts))
+        best_ids = np.full(len(texts), -1, dtype=np.int64)
+        for matrix, ids, live in blocks:
+            # (claims x queries), kept sparse so millions of rows never densify
+            scores = matrix @ query_matrix.T
+            if live is not None:
+                scores = sparse.diags(live.astype(np.float64)) @ scores  # Zeroes the removed claims' rows
+            scores = scores.tocsc()
+            block_rows = np.asarray(scores.argmax(axis=0)).ravel()
+            block_scores = scores.max(axis=0).toarray().ravel()
+            better = block_scores > best_scores
+            best_scores[better] = block_scores[better]
+            best_ids[better] = ids[block_rows[better]]
+
+        return [
+            (int(claim_id), float(score)) if claim_id >= 0 else None
+            for claim_id, score in zip(best_ids, best_scores)
+        ]
+
+    def lookup_many(self, texts, threshold):
+        """Batch form of `lookup`, one claim id or None per text."""
+        self._ensure_loaded()
+        self.sync()
+        return [
+            match[0] if match is not None and match[1] > threshold else None
+            for match in self.best_matches(texts)
+        ]
+
+    def lookup(self, text, threshold):
+        """Returns the id of the closest stored claim above `threshold`, or None."""
+        self._ensure_loaded()
+        self.sync()
+        matches = self.nearest(text, k=1)
+        if matches and matches[0][1] > threshold:
+            return matches[0][0]
+        return None
+
+
+claim_index = ClaimIndex()
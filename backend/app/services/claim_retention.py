@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func
+
+from extensions import db
+from app.models import Claim
+from app.services.claim_cache import claim_result_cache
+from app.services.claim_index import claim_index
+
+
+class ClaimRetention:
+    """
+    Expiry and size bounds for the `claims` table, which doubles as the fact-check cache.
+
+    Verdicts older than `ttl` are no longer served and a background sweeper
+    deletes them. Once the table holds more than `max_entries` rows the sweeper
+    also evicts the least recently ("lru") or least frequently ("lfu") hit
+    claims. Hits are counted in memory and written to `hit_count` and
+    `last_hit_at` in one batch per sweep, so serving a cached verdict never
+    costs a write. Evicted claims are dropped from the similarity index and the
+    in-process result cache. Counters in `stats` cover this worker only.
+    """
+
+    POLICIES = ("lru", "lfu")
+    DELETE_BATCH = 1000
+
+    def __init__(self, ttl=30 * 86400, max_entries=100000, policy="lru", sweep_interval=300.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.policy = policy
+        self.sweep_interval = sweep_interval
+        self._hits = {}  # claim id -> (hits since the last flush, time of the latest)
+        self._counters = dict.fromkeys(
+            ("memory_hits", "database_hits", "misses", "expired_skipped", "evicted_expired", "evicted_capacity", "sweeps"), 0
+        )
+        self._last_sweep = None
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._app = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get("CLAIM_CACHE_TTL", self.ttl)
+        self.max_entries = app.config.get("CLAIM_CACHE_MAX_ENTRIES", self.max_entries)
+        self.policy = app.config.get("CLAIM_CACHE_EVICTION", self.policy)
+        self.sweep_interval = app.config.get("CLAIM_CACHE_SWEEP_INTERVAL", self.sweep_interval)
+        if self.policy not in self.POLICIES:
+            raise RuntimeError(f"❌ CLAIM_CACHE_EVICTION must be one of {', '.join(self.POLICIES)}")
+        self._app = app
+        app.extensions["claim_retention"] = self
+
+        @app.cli.command("claim-cache-sweep")
+        def claim_cache_sweep():
+            """Expire and evict stored claims now."""
+            expired, evicted = self.sweep()
+            print(f"Claim cache swept: {expired} expired, {evicted} evicted over capacity")
+
+    def fresh_after(self):
+        """Oldest `timestamp` still served, None when verdicts never expire."""
+        if not self.ttl:
+            return None
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def fresh(self, query):
+        """Restricts a Claim query to verdicts that have not expired."""
+        cutoff = self.fresh_after()
+        return query if cutoff is None else query.filter(Claim.timestamp >= cutoff)
+
+    def is_fresh(self, claim):
+        cutoff = self.fresh_after()
+        if cutoff is None or claim.timestamp is None or claim.timestamp >= cutoff:
+            return True
+        with self._lock:
+            self._counters["expired_skipped"] += 1
+        return False
+
+    def expires_at(self, claim):
+        """Epoch seconds after which the in-process cache stops serving `claim`."""
+        if not self.ttl:
+            return None
+        stored_at = claim.timestamp or datetime.utcnow()
+        return time.time() + self.ttl - (datetime.utcnow() - stored_at).total_seconds()
+
+    def record_hit(self, claim_id, tier):
+        """Credits a served verdict to its claim, `tier` is "memory" or "database"."""
+        self._start_sweeper()
+        with self._lock:
+            self._counters[f"{tier}_hits"] += 1
+            if claim_id is not None:
+                count, _ = self._hits.get(claim_id, (0, None))
+                self._hits[claim_id] = (count + 1, datetime.utcnow())
+
+    def record_miss(self, count=1):
+        self._start_sweeper()
+        with self._lock:
+            self._counters["misses"] += count
+
+    def flush_hits(self):
+        """Adds the buffered hits to their rows in one executemany UPDATE."""
+        with self._lock:
+            hits, self._hits = self._hits, {}
+        if not hits:
+            return
+        table = Claim.__table__
+        try:
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("claim_id"))
+                .values(hit_count=table.c.hit_count + bindparam("hits"), last_hit_at=bindparam("hit_at")),
+                [{"claim_id": claim_id, "hits": count, "hit_at": hit_at} for claim_id, (count, hit_at) in hits.items()],
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _eviction_order(self):
+        last_used = func.coalesce(Claim.last_hit_at, Claim.timestamp)
+        if self.policy == "lfu":
+            return Claim.hit_count.asc(), last_used.asc(), Claim.id.asc()
+        return last_used.asc(), Claim.id.asc()
+
+    def _evict(self, query, limit=None):
+        """Deletes the rows `query` selects, a batch per transaction. Returns how many went."""
+        evicted = 0
+        while limit is None or evicted < limit:
+            batch = self.DELETE_BATCH if limit is None else min(self.DELETE_BATCH, limit - evicted)
+            rows = query.limit(batch).all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            try:
+                db.session.query(Claim).filter(Claim.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            claim_index.remove(ids)
+            for row in rows:
+                claim_result_cache.discard(row.claim_digest)
+            evicted += len(rows)
+        return evicted
+
+    def sweep(self):
+        """Writes buffered hits, deletes expired verdicts, then evicts down to `max_entries`."""
+        self.flush_hits()
+        candidates = db.session.query(Claim.id, Claim.claim_digest)
+
+        expired = 0
+        cutoff = self.fresh_after()
+        if cutoff is not None:
+            expired = self._evict(candidates.filter(Claim.timestamp < cutoff).order_by(Claim.id))
+
+        evicted = 0
+        if self.max_entries:
+            excess = db.session.query(func.count(Claim.id)).scalar() - self.max_entries
+            if excess > 0:
+                evicted = self._evict(candidates.order_by(*self._eviction_order()), limit=excess)
+
+        with self._lock:
+            self._counters["evicted_expired"] += expired
+            self._counters["evicted_capacity"] += evicted
+            self._counters["sweeps"] += 1
+            self._last_sweep = datetime.utcnow()
+        if expired or evicted:
+            logging.info(f"🧹 Claim cache sweep removed {expired} expired and {evicted} least-used claims")
+        return expired, evicted
+
+    def _start_sweeper(self):
+        # Started on first use so the thread lives in the worker, not a pre-fork master
+        if self._sweeper is not None or not self.sweep_interval or self._app is None:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            app = self._app
+
+            def run():
+                while True:
+                    time.sleep(self.sweep_interval)
+                    try:
+                        with app.app_context():
+                            self.sweep()
+                            db.session.remove()
+                    except Exception as e:
+                        logging.error(f"🔴 Claim cache sweep failed: {str(e)}", exc_info=True)
+
+            self._sweeper = threading.Thread(target=run, name="claim-cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stats(self):
+        """Table size and freshness plus this worker's hit, miss and eviction counters."""
+        with self._lock:
+            counters = dict(self._counters)
+            pending = len(self._hits)
+            last_sweep = self._last_sweep
+
+        hits = counters["memory_hits"] + counters["database_hits"]
+        lookups = hits + counters["misses"]
+        cutoff = self.fresh_after()
+        size = db.session.query(func.count(Claim.id)).scalar()
+        expired = db.session.query(func.count(Claim.id)).filter(Claim.timestamp < cutoff).scalar() if cutoff else 0
+        return {
+            "size": size,
+            "expired": expired,
+            "max_entries": self.max_entries or None,
+            "ttl_seconds": self.ttl or None,
+            "policy": self.policy,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            **counters,
+            "evictions": counters["evicted_expired"] + counters["evicted_capacity"],
+            "pending_hit_writes": pending,
+            "memory_cache_size": len(claim_result_cache),
+            "index_size": len(claim_index),
+            "last_sweep": last_sweep.isoformat() if last_sweep else None,
+        }
+
+
+claim_retention = ClaimRetention()
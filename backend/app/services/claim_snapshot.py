@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+
+# Bump whenever the layout below changes, older snapshots are then ignored and rebuilt
+FORMAT_VERSION = 2
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+VOCABULARY_FILE = "vocabulary.json"
+ARRAY_NAMES = ("data", "indices", "indptr", "ids", "idf")
+PRUNE_GRACE = 600  # Seconds a snapshot is kept regardless of `keep`, so concurrent writers don't prune each other
+
+
+class SnapshotError(Exception):
+    """Raised when a claim index snapshot is missing, stale or unreadable."""
+
+
+def current_snapshot(directory):
+    """Returns the path of the published snapshot in `directory`, or None."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(directory, name)
+    return path if name and os.path.isdir(path) else None
+
+
+def write_snapshot(directory, vectorizer, matrix, ids, max_id, low_water, fitted_size, keep=2):
+    """
+    Serialises the vocabulary, IDF weights and claim vectors into a new snapshot
+    directory and atomically points CURRENT at it. Readers that still have the
+    previous snapshot memory-mapped keep working, unlinked files stay valid.
+    Claims above `low_water` may still be missing and are rescanned by whoever loads it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = sparse.csr_matrix(matrix)
+
+    # int32 offsets keep the files small and let scipy map them without a copy
+    index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+    arrays = {
+        "data": matrix.data.astype(np.float32, copy=False),
+        "indices": matrix.indices.astype(index_dtype, copy=False),
+        "indptr": matrix.indptr.astype(index_dtype, copy=False),
+        "ids": np.asarray(ids, dtype=np.int64),
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+    }
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "rows": int(matrix.shape[0]),
+        "features": int(matrix.shape[1]),
+        "max_id": int(max_id),
+        "low_water": int(low_water),
+        "fitted_size": int(fitted_size),
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_path)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        with open(os.path.join(tmp_path, VOCABULARY_FILE), "w") as f:
+            json.dump(vectorizer.get_feature_names_out().tolist(), f)
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+
+        name = f"v{FORMAT_VERSION}-{max_id}-{uuid.uuid4().hex[:8]}"
+        os.rename(tmp_path, os.path.join(directory, name))
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    pointer_tmp = os.path.join(directory, f"{CURRENT_FILE}.{uuid.uuid4().hex}")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(directory, CURRENT_FILE))
+
+    _prune_snapshots(directory, name, keep)
+    return os.path.join(directory, name)
+
+
+def _prune_snapshots(directory, written_name, keep):
+    snapshots = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_dir() and entry.name.startswith("v")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    # Another process may have published a newer snapshot meanwhile, the one this caller
+    # just wrote is about to be loaded and young ones may be mid-load elsewhere
+    cutoff = time.time() - PRUNE_GRACE
+    for entry in snapshots[keep:]:
+        if entry.name != written_name and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def load_snapshot(path):
+    """
+    Memory-maps a snapshot read-only. Returns (vectorizer, matrix, ids, manifest);
+    the matrix and id arrays are backed by the page cache and shared across workers.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format {manifest.get('format_version')} in {path}")
+
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAY_NAMES}
+        with open(os.path.join(path, VOCABULARY_FILE)) as f:
+            terms = json.load(f)
+    except (OSError, ValueError, KeyError) as e:
+        raise SnapshotError(f"Could not read claim index snapshot {path}: {e}") from e
+
+    from sklearn.feature_extraction.text import TfidfVectorizer  # Deferred, sklearn is slow to import
+
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)})
+    vectorizer.idf_ = np.array(arrays["idf"])
+
+    matrix = sparse.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=(manifest["rows"], manifest["features"]),
+        copy=False,
+    )
+    return vectorizer, matrix, arrays["ids"], manifest
@@ -0,0 +1,74 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import current_app
+from app.services.http_client import http_client
+from app.services.upstream_quota import UpstreamThrottled
+
+
+class FactCheckError(Exception):
+    """Raised when the Google Fact Check API answers with a non-200 status."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FactCheckService:
+    def __init__(self, api_key=None, max_workers=None):
+        # If no settings are provided, fetch them from the app's config
+        self.api_key = api_key or current_app.config["FACT_CHECK_API_KEY"]
+        self.max_workers = max_workers or current_app.config.get("FACT_CHECK_MAX_WORKERS", 8)
+        self.base_url = current_app.config.get(
+            "FACT_CHECK_API_URL", "https://factchecktools.googleapis.com/v1alpha1/claims:search"
+        )
+
+    def search(self, query):
+        """
+        Queries the Google Fact Check API for a single claim.
+        Raises FactCheckError on an API error and requests.RequestException on transport errors.
+        """
+        logging.debug(f"🌍 Sending request to Google API for query: {query}")
+        response = http_client.get("factcheck", self.base_url, params={"query": query, "key": self.api_key})
+        return self._parse(response)
+
+    async def search_async(self, query):
+        """`search` on the async HTTP client, for the async serving mode."""
+        from app.services.async_http import async_http_client  # Deferred, sync workers never load aiohttp
+
+        logging.debug(f"🌍 Sending request to Google API for query: {query}")
+        response = await async_http_client.get("factcheck", self.base_url, params={"query": query, "key": self.api_key})
+        return self._parse(response)
+
+    @staticmethod
+    def _parse(response):
+        if response.status_code != 200:
+            logging.error(f"🔴 Google API Error {response.status_code}: {response.text}")
+            raise FactCheckError(response.status_code, f"Google API Error: {response.status_code}")
+
+        return response.json()
+
+    def search_many(self, queries):
+        """
+        Runs `search` for every query on a bounded thread pool so a batch takes
+        about as long as its slowest upstream call. Returns (result, error)
+        pairs in the same order as `queries`; exactly one side is None.
+        UpstreamThrottled is raised for the whole batch, it is answered with Retry-After.
+        """
+        if not queries:
+            return []
+
+        def run(query):
+            try:
+                return self.search(query), None
+            except FactCheckError as e:
+                return None, str(e)
+            except UpstreamThrottled:
+                raise
+            except (requests.RequestException, ValueError) as e:
+                logging.error(f"🔴 Request Exception: {str(e)}")
+                return None, f"Error fetching data: {str(e)}"
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries))) as executor:
+            return list(executor.map(run, queries))
@@ -0,0 +1,252 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from extensions import db
+from app.models import Goal, normalize_claim_text
+from app.services.metrics import phase
+from app.services.upstream_quota import background
+from app.services.wolfram_service import WolframService
+
+
+class GoalRecommender:
+    """
+    Recommends goals from the cluster a new goal falls into, without calling
+    out or scanning the goal table per request.
+
+    Goals are embedded with a stateless hashing vectorizer, so embeddings never
+    need refitting, and clustered with mini-batch k-means that is updated with
+    `partial_fit` as goals are added. Each cluster keeps a popularity count of
+    its goal texts. A periodic re-clustering refits from the whole table and
+    refreshes Wolfram's global recommendations, which top up small clusters.
+    """
+
+    MIN_GOALS = 3  # Same floor the Wolfram clustering needed
+    SYNC_WINDOW = 1000  # Ids below the newest one that `sync` rescans, for goals that committed out of order
+
+    def __init__(self, n_clusters=8, sync_interval=30.0, recluster_interval=3600.0, wolfram_sample=5000):
+        self.n_clusters = n_clusters
+        self.sync_interval = sync_interval
+        self.recluster_interval = recluster_interval
+        self.wolfram_sample = wolfram_sample
+        self._app = None
+        self._lock = threading.RLock()
+        self._reclusterer = None
+        self._executor = None
+        self._scheduled = set()  # Goal ids with a background computation in flight
+        self._loaded = False
+        self._vectorizer = None
+        self._reset()
+
+    def _reset(self):
+        self._kmeans = None
+        self._cluster_goals = []        # One Counter of goal text -> count per cluster
+        self._pending = []              # Goals seen before there were enough to cluster
+        self._wolfram_goals = []
+        self._goal_ids = set()          # Every goal id clustered so far
+        self._max_id = 0
+        self._last_sync = 0.0
+
+    def init_app(self, app):
+        self.n_clusters = app.config.get("GOAL_CLUSTERS", self.n_clusters)
+        self.sync_interval = app.config.get("GOAL_SYNC_INTERVAL", self.sync_interval)
+        self.recluster_interval = app.config.get("GOAL_RECLUSTER_INTERVAL", self.recluster_interval)
+        self.wolfram_sample = app.config.get("GOAL_WOLFRAM_SAMPLE", self.wolfram_sample)
+        self._app = app
+        app.extensions["goal_recommender"] = self
+
+        @app.cli.command("goal-recluster")
+        def goal_recluster():
+            """Refit goal clusters and refresh Wolfram recommendations."""
+            self.recluster()
+            print(f"Goal clusters rebuilt with {self.n_clusters} clusters")
+
+    @property
+    def vectorizer(self):
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer  # Deferred, sklearn is slow to import
+
+            self._vectorizer = HashingVectorizer(n_features=2 ** 18, alternate_sign=False, norm="l2")
+        return self._vectorizer
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.recluster(refresh_wolfram=False)
+                    self._loaded = True
+                    self._start_reclusterer()
+
+    def recluster(self, refresh_wolfram=True):
+        """Refits the clusters from every stored goal, optionally refreshing Wolfram's list."""
+        from sklearn.cluster import MiniBatchKMeans
+
+        rows = db.session.query(Goal.id, Goal.goal).order_by(Goal.id).all()
+        texts = [goal for _, goal in rows]
+        distinct = Counter(normalize_claim_text(t) for t in texts)
+
+        kmeans, cluster_goals = None, []
+        if len(distinct) >= self.MIN_GOALS:
+            n_clusters = min(self.n_clusters, len(distinct))
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=0, n_init=3, batch_size=1024)
+            labels = kmeans.fit_predict(self.vectorizer.transform(texts))
+            cluster_goals = [Counter() for _ in range(n_clusters)]
+            for text, label in zip(texts, labels):
+                cluster_goals[label][text] += 1
+
+        wolfram_goals = self._wolfram_goals
+        if refresh_wolfram and len(distinct) >= self.MIN_GOALS:
+            # Most common goals only, keeps the payload bounded as the user base grows
+            sample = [text for text, _ in Counter(texts).most_common(self.wolfram_sample)]
+            with background():
+                wolfram_goals = WolframService().recommend_goals(sample) or wolfram_goals
+
+        with self._lock:
+            self._reset()
+            self._kmeans, self._cluster_goals = kmeans, cluster_goals
+            self._pending = texts if kmeans is None else []
+            self._wolfram_goals = wolfram_goals
+            self._goal_ids = {goal_id for goal_id, _ in rows}
+            self._max_id = rows[-1][0] if rows else 0
+            self._last_sync = time.monotonic()
+
+        logging.info(f"🎯 Goal clusters rebuilt from {len(texts)} goals")
+
+    def _start_reclusterer(self):
+        # Started on first use so the thread lives in the worker, not a pre-fork master
+        if self._reclusterer is not None or not self.recluster_interval or self._app is None:
+            return
+        app = self._app
+
+        def run():
+            while True:
+                time.sleep(self.recluster_interval)
+                try:
+                    with app.app_context():
+                        self.recluster()
+                        db.session.remove()
+                except Exception as e:
+                    logging.error(f"🔴 Goal re-clustering failed: {str(e)}", exc_info=True)
+
+        self._reclusterer = threading.Thread(target=run, name="goal-reclusterer", daemon=True)
+        self._reclusterer.start()
+
+    def add(self, goal_id, goal_text):
+        """Assigns a newly committed goal to its nearest cluster and nudges that centroid."""
+        self._ensure_loaded()
+        with self._lock:
+            if goal_id in self._goal_ids:
+                return
+            self._goal_ids.add(goal_id)
+            self._max_id = max(self._max_id, goal_id)
+
+            if self._kmeans is None:
+                self._pending.append(goal_text)
+                if len({normalize_claim_text(t) for t in self._pending}) >= self.MIN_GOALS:
+                    self.recluster(refresh_wolfram=False)
+                return
+
+            with phase("vectorize"):
+                vector = self.vectorizer.transform([goal_text])
+            self._kmeans.partial_fit(vector)
+            label = int(self._kmeans.predict(vector)[0])
+            self._cluster_goals[label][goal_text] += 1
+
+    def sync(self, force=False):
+        """
+        Picks up goals created by other workers, a primary-key range scan every
+        `sync_interval`. The last `SYNC_WINDOW` ids are rescanned as well, ids are
+        allocated before commit so a lower one can show up after a higher one.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        recent = db.session.query(Goal.id).filter(Goal.id > self._max_id - self.SYNC_WINDOW)
+        missing = [goal_id for (goal_id,) in recent if goal_id not in self._goal_ids]
+        if not missing:
+            return
+        new_goals = db.session.query(Goal.id, Goal.goal).filter(Goal.id.in_(missing)).order_by(Goal.id).all()
+        for goal_id, goal_text in new_goals:
+            self.add(goal_id, goal_text)
+
+    def recommend(self, goal_text, exclude=(), k=5):
+        """Most popular goals in `goal_text`'s cluster, topped up from Wolfram's list."""
+        self._ensure_loaded()
+        self.sync()
+
+        skip = {normalize_claim_text(t) for t in exclude} | {normalize_claim_text(goal_text)}
+        recommendations = []
+
+        def take(candidates):
+            for candidate in candidates:
+                if len(recommendations) >= k:
+                    return
+                key = normalize_claim_text(candidate)
+                if key not in skip:
+                    skip.add(key)
+                    recommendations.append(candidate)
+
+        with self._lock:
+            kmeans, cluster_goals, wolfram_goals = self._kmeans, self._cluster_goals, list(self._wolfram_goals)
+            if kmeans is not None:
+                with phase("vectorize"):
+                    vector = self.vectorizer.transform([goal_text])
+                label = int(kmeans.predict(vector)[0])
+                take(text for text, _ in cluster_goals[label].most_common(k + len(skip)))
+
+        take(wolfram_goals)
+        return recommendations
+
+    def recommend_for_goal(self, goal):
+        """
+        Recommendations for a stored goal, excluding the owner's goals. Memoized
+        on the row, so each goal is only ever computed once.
+        """
+        if goal.recommendations is not None:
+            return json.loads(goal.recommendations)
+
+        own_goals = [g for (g,) in db.session.query(Goal.goal).filter(Goal.user_id == goal.user_id)]
+        recommendations = self.recommend(goal.goal, exclude=own_goals)
+        goal.recommendations = json.dumps(recommendations)
+        db.session.commit()
+        return recommendations
+
+    @property
+    def executor(self):
+        # Created on first use so no threads exist before a gunicorn fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="goal-recommend")
+        return self._executor
+
+    def schedule(self, goal_id):
+        """
+        Adds a goal to its cluster and computes its recommendations in the
+        background, once per goal per process.
+        """
+        with self._lock:
+            if goal_id in self._scheduled:
+                return
+            self._scheduled.add(goal_id)
+        self.executor.submit(self._compute, goal_id)
+
+    def _compute(self, goal_id):
+        try:
+            with self._app.app_context():
+                goal = Goal.query.get(goal_id)
+                if goal is not None:
+                    self.add(goal.id, goal.goal)  # A no-op for goals this worker already has
+                    self.recommend_for_goal(goal)
+                db.session.remove()
+        except Exception as e:
+            logging.error(f"🔴 Recommendations for goal {goal_id} failed: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._scheduled.discard(goal_id)
+
+
+goal_recommender = GoalRecommender()
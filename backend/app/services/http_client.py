@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from app.services.metrics import phase
+from app.services.upstream_quota import upstream_quota
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `failure_threshold` consecutive failures.
+    After `reset_timeout` seconds one trial call is let through (half-open);
+    success closes the circuit again, failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                if self._opened_at is None:
+                    logging.warning(f"⚠️ Circuit for {self.name} opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+
+def replay(status_code, content, headers, url):
+    """A `requests.Response` rebuilt from a negatively cached error response."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers)
+    response.url = url
+    return response
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP client for NewsAPI, Wolfram and the Fact Check API.
+
+    A single `requests.Session` keeps per-host keep-alive connection pools, so
+    repeated calls skip the TCP and TLS handshake. Every call gets connect and
+    read timeouts, idempotent requests are retried with jittered exponential
+    backoff, and each named upstream has its own circuit breaker and its
+    share of the deployment-wide quota (see `UpstreamQuota`).
+    """
+
+    # 429s aren't retried here: UpstreamQuota pauses the upstream for every worker instead
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    def __init__(self):
+        self.connect_timeout = 3.05
+        self.read_timeout = 10.0
+        self.failure_threshold = 5
+        self.reset_timeout = 30.0
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.session = self._build_session()
+
+    def init_app(self, app):
+        self.connect_timeout = app.config.get("HTTP_CONNECT_TIMEOUT", self.connect_timeout)
+        self.read_timeout = app.config.get("HTTP_READ_TIMEOUT", self.read_timeout)
+        self.failure_threshold = app.config.get("HTTP_CIRCUIT_FAILURE_THRESHOLD", self.failure_threshold)
+        self.reset_timeout = app.config.get("HTTP_CIRCUIT_RESET_TIMEOUT", self.reset_timeout)
+        self.session = self._build_session(
+            pool_connections=app.config.get("HTTP_POOL_CONNECTIONS", 10),
+            pool_maxsize=app.config.get("HTTP_POOL_MAXSIZE", 32),
+            max_retries=app.config.get("HTTP_MAX_RETRIES", 2),
+            backoff_factor=app.config.get("HTTP_BACKOFF_FACTOR", 0.3),
+        )
+        app.extensions["http_client"] = self
+
+    def _build_session(self, pool_connections=10, pool_maxsize=32, max_retries=2, backoff_factor=0.3):
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Hand the final response back so callers can report the status
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def breaker(self, upstream):
+        with self._lock:
+            if upstream not in self._breakers:
+                self._breakers[upstream] = CircuitBreaker(upstream, self.failure_threshold, self.reset_timeout)
+            return self._breakers[upstream]
+
+    def request(self, upstream, method, url, **kwargs):
+        """
+        Sends a request to the named upstream. Raises CircuitOpenError without
+        touching the network while that upstream's circuit is open, and
+        UpstreamThrottled when its quota can't take the call in time. A recent
+        error response to the same request is replayed instead of re-sent.
+        """
+        error_key = upstream_quota.request_key(upstream, method, url, kwargs)
+        cached_error = upstream_quota.cached_error(upstream, error_key)
+        if cached_error is not None:
+            return replay(*cached_error)
+
+        breaker = self.breaker(upstream)
+        # Checked before waiting for quota, so an open circuit doesn't cost a token or a wait
+        if breaker.state == "open":
+            raise CircuitOpenError(f"{upstream} is temporarily unavailable (circuit open)")
+        upstream_quota.acquire(upstream)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{upstream} is temporarily unavailable (circuit open)")
+
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        try:
+            with phase("upstream"):
+                response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if response.status_code >= 400:
+            upstream_quota.record(
+                upstream, error_key, response.status_code, response.content, response.headers, response.url
+            )
+        return response
+
+    def get(self, upstream, url, **kwargs):
+        return self.request(upstream, "GET", url, **kwargs)
+
+    def post(self, upstream, url, **kwargs):
+        return self.request(upstream, "POST", url, **kwargs)
+
+
+http_client = HttpClient()
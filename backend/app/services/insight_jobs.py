@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import func
+
+from extensions import db
+from app.models import Goal, InsightJob, Progress
+from app.services.upstream_quota import background
+from app.services.wolfram_service import WolframError, WolframService
+
+
+def progress_fingerprint(user_id):
+    """
+    Identifies the progress and goal rows an analysis would see. Both tables are
+    append-only, so (count, max id) per table changes exactly when the inputs do,
+    and two indexed aggregates are far cheaper than loading every row.
+    """
+    progress_count, progress_max = (
+        db.session.query(func.count(Progress.id), func.max(Progress.id)).filter(Progress.user_id == user_id).one()
+    )
+    goal_count, goal_max = (
+        db.session.query(func.count(Goal.id), func.max(Goal.id)).filter(Goal.user_id == user_id).one()
+    )
+    raw = f"progress:{progress_count}:{progress_max}|goals:{goal_count}:{goal_max}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class InsightJobQueue:
+    """
+    Runs Wolfram progress insights off the request thread.
+
+    Jobs are rows in `insight_job`, so any worker can answer a poll, and run on a
+    local thread pool in the worker that accepted them. A finished job is reused
+    for every later request with the same input fingerprint, and a request that
+    matches a job still in flight joins it instead of queueing another.
+    """
+
+    def __init__(self, max_workers=4, job_timeout=600):
+        self.max_workers = max_workers
+        self.job_timeout = job_timeout
+        self._app = None
+        self._executor = None
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("WOLFRAM_JOB_WORKERS", self.max_workers)
+        self.job_timeout = app.config.get("WOLFRAM_JOB_TIMEOUT", self.job_timeout)
+        self._app = app
+        app.extensions["insight_jobs"] = self
+
+    @property
+    def executor(self):
+        # Created on first use so no threads exist before a gunicorn fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="wolfram-job")
+        return self._executor
+
+    def find_reusable(self, user_id, fingerprint):
+        """Latest job for these exact inputs that is done or still plausibly running."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.job_timeout)
+        return (
+            InsightJob.query
+            .filter(InsightJob.user_id == user_id, InsightJob.fingerprint == fingerprint)
+            .filter(db.or_(
+                InsightJob.status == "done",
+                db.and_(InsightJob.status.in_(["queued", "running"]), InsightJob.created_at >= cutoff),
+            ))
+            .order_by(InsightJob.created_at.desc())
+            .first()
+        )
+
+    def cached_result(self, user_id, fingerprint):
+        job = self.find_reusable(user_id, fingerprint)
+        if job is not None and job.status == "done":
+            return json.loads(job.result)
+        return None
+
+    def submit(self, user_id):
+        """Returns the job answering this user's current inputs, queueing one if needed."""
+        fingerprint = progress_fingerprint(user_id)
+        job = self.find_reusable(user_id, fingerprint)
+        if job is not None:
+            return job
+
+        job = InsightJob(id=uuid.uuid4().hex, user_id=user_id, fingerprint=fingerprint, status="queued")
+        db.session.add(job)
+        db.session.commit()
+
+        self.executor.submit(self._run, job.id)
+        logging.info(f"🧮 Queued Wolfram insights job {job.id} for user {user_id}")
+        return job
+
+    def _run(self, job_id):
+        with self._app.app_context():
+            job = InsightJob.query.get(job_id)
+            if job is None:
+                return
+            try:
+                job.status = "running"
+                db.session.commit()
+
+                service = WolframService()
+                with background():  # Nobody is waiting on the response, interactive calls go first
+                    insights = service.progress_insights(*service.collect_progress_inputs(job.user_id))
+                job.status, job.result = "done", json.dumps(insights)
+            except (WolframError, requests.RequestException) as e:
+                job.status, job.error = "failed", str(e)[:500]
+            except Exception as e:
+                logging.error(f"🔴 Wolfram insights job {job_id} crashed: {str(e)}", exc_info=True)
+                db.session.rollback()
+                job.status, job.error = "failed", f"Unexpected error: {str(e)}"[:500]
+            finally:
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                db.session.remove()
+
+    @staticmethod
+    def serialize(job):
+        data = {
+            "job_id": job.id,
+            "status": job.status,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if job.status == "done":
+            data["result"] = json.loads(job.result)
+        elif job.status == "failed":
+            data["error"] = job.error
+        return data
+
+
+insight_jobs = InsightJobQueue()
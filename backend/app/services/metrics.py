@@ -0,0 +1,297 @@
+import bisect
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as StackCounter, defaultdict
+from contextlib import contextmanager
+
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Monotonic counter per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for label_values, count in sorted(series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}_total{{{labels}}} {count}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SamplingProfiler:
+    """
+    One background thread that samples the stacks of the request threads
+    registered with it, so profiling costs nothing when no request is sampled.
+    Stacks are kept in the folded format flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._samples = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._samples[thread_id] = StackCounter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._samples.pop(thread_id, StackCounter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._samples:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+
+
+def _fold(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Metrics:
+    """
+    Per-route request instrumentation.
+
+    Every request records its latency, the time spent in each phase (DB, vectorize,
+    upstream HTTP, serialize, with whatever is left counted as "app") and how many
+    SQL statements it ran. Phases nest, a phase's time excludes the phases inside it.
+    Upstream calls are counted by quota outcome wherever they are made.
+    Metrics are per process and served in Prometheus text format on `/metrics`.
+    Optionally a fraction of requests is stack-sampled and the ones slower than a
+    threshold are written out as folded flamegraph stacks.
+    """
+
+    def __init__(self):
+        self.requests = Histogram(
+            "flow_request_duration_seconds", "Request latency by route.", ("method", "route", "status"), LATENCY_BUCKETS
+        )
+        self.phases = Histogram(
+            "flow_request_phase_seconds", "Time spent per request phase.", ("route", "phase"), LATENCY_BUCKETS
+        )
+        self.queries = Histogram(
+            "flow_request_sql_queries", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS
+        )
+        self.upstream_calls = Counter(
+            "flow_upstream_calls",
+            "Upstream calls by quota outcome (sent, throttled, shed, cooldown, negative_cached).",
+            ("upstream", "priority", "outcome"),
+        )
+        self.upstream_waits = Histogram(
+            "flow_upstream_quota_wait_seconds", "Time calls waited for an upstream quota token.",
+            ("upstream", "priority"), LATENCY_BUCKETS,
+        )
+        self.profiler = SamplingProfiler()
+        self.profile_rate = 0.0
+        self.profile_threshold = 1.0
+        self.profile_dir = None
+
+    def init_app(self, app):
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+        if app.config.get("PROFILE_SLOW_REQUESTS", False):
+            self.profile_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.1)
+            self.profile_threshold = app.config.get("PROFILE_SLOW_THRESHOLD", 1.0)
+            self.profile_dir = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+            self.profiler.interval = app.config.get("PROFILE_INTERVAL", self.profiler.interval)
+        app.extensions["metrics"] = self
+
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule(app.config.get("METRICS_PATH", "/metrics"), "metrics", self.render)
+
+        # Serialisation is timed wherever jsonify runs, without touching each route
+        class TimedJSONEncoder(app.json_encoder):
+            def encode(self, o):
+                with phase("serialize"):
+                    return super().encode(o)
+
+        app.json_encoder = TimedJSONEncoder
+
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+
+    def _start_request(self):
+        g._metrics = {"start": time.perf_counter(), "phases": defaultdict(float), "stack": [], "queries": 0}
+        if self.profile_rate and random.random() < self.profile_rate:
+            g._metrics["profiled"] = threading.get_ident()
+            self.profiler.start(g._metrics["profiled"])
+
+    @staticmethod
+    def _record_status(response):
+        if "_metrics" in g:
+            g._metrics["status"] = response.status_code
+        return response
+
+    def _finish_request(self, exc=None):
+        state = g.pop("_metrics", None)
+        if state is None:
+            return
+        elapsed = time.perf_counter() - state["start"]
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        status = state.get("status", 500 if exc is not None else 200)
+
+        self.requests.observe(elapsed, request.method, route, status)
+        phases = state["phases"]
+        phases["app"] = max(0.0, elapsed - sum(phases.values()))
+        for name, seconds in phases.items():
+            self.phases.observe(seconds, route, name)
+        self.queries.observe(state["queries"], route)
+
+        if "profiled" in state:
+            samples = self.profiler.stop(state["profiled"])
+            if elapsed >= self.profile_threshold and samples:
+                self._dump_profile(route, elapsed, samples)
+
+    def _dump_profile(self, route, elapsed, samples):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{route.strip('/').replace('/', '_') or 'root'}-{int(elapsed * 1000)}ms.folded"
+            path = os.path.join(self.profile_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logging.warning(f"🐢 Slow request {route} took {elapsed:.3f}s, profile written to {path}")
+        except OSError as e:
+            logging.error(f"🔴 Could not write request profile: {str(e)}")
+
+    def render(self):
+        series = (self.requests, self.phases, self.queries, self.upstream_calls, self.upstream_waits)
+        body = "\n".join(s.render() for s in series) + "\n"
+        return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
+
+
+def _current_state():
+    if not has_app_context():
+        return None
+    return g.get("_metrics")
+
+
+def _enter(state, name):
+    state["stack"].append([name, time.perf_counter(), 0.0])  # name, start, time spent in nested phases
+
+
+def _exit(state):
+    name, start, nested = state["stack"].pop()
+    total = time.perf_counter() - start
+    state["phases"][name] += total - nested
+    if state["stack"]:
+        state["stack"][-1][2] += total
+
+
+@contextmanager
+def phase(name):
+    """Attributes the enclosed time to `name` on the current request, a no-op outside one."""
+    state = _current_state()
+    if state is None:
+        yield
+        return
+    _enter(state, name)
+    try:
+        yield
+    finally:
+        _exit(state)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _current_state()
+    if state is not None:
+        state["queries"] += 1
+        _enter(state, "db")
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _end_statement()
+
+
+def _handle_error(exception_context):
+    _end_statement()
+
+
+def _end_statement():
+    state = _current_state()
+    if state is not None and state["stack"] and state["stack"][-1][0] == "db":
+        _exit(state)
@@ -0,0 +1,51 @@
+import logging
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Lazily loads heavy NLP/ML resources on first use instead of at import time,
+    so `flask db` commands and workers that never touch them skip the cost.
+
+    `preload()` loads everything up front; call it in the gunicorn master
+    (preload_app) so forked workers share the pages copy-on-write.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                logging.info(f"📦 Loaded model '{name}' in {time.perf_counter() - started:.2f}s")
+            return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def preload(self, names=None):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+
+def _load_spacy():
+    import spacy
+
+    return spacy.load("en_core_web_sm")
+
+
+model_registry = ModelRegistry()
+model_registry.register("nlp", _load_spacy)
@@ -1,32 +1,61 @@
 import requests
 from flask import current_app
+from app.services.http_client import http_client
+from app.services.upstream_quota import UpstreamThrottled
 
 class NewsService:
     def __init__(self, api_key=None):
         # If no API key is provided, fetch from app's config
         self.api_key = api_key or current_app.config["NEWS_API_KEY"]
-        self.base_url = "https://newsapi.org/v2/everything"
+        self.base_url = current_app.config.get("NEWS_API_URL", "https://newsapi.org/v2/everything")
 
     def _fetch_news(self, query="innovation", language="en", page_size=5):
         """
         A private method that performs the actual API request to NewsAPI.
+        UpstreamThrottled is raised so the route can answer with Retry-After.
         """
-        url = f"{self.base_url}?q={query}&apiKey={self.api_key}&language={language}&pageSize={page_size}"
-        
+        params = {"q": query, "apiKey": self.api_key, "language": language, "pageSize": page_size}
+
         try:
-            response = requests.get(url)
+            response = http_client.get("newsapi", self.base_url, params=params)
             response.raise_for_status()  # Raise an error for bad status codes
             return response.json()
+        except UpstreamThrottled:
+            raise
         except requests.exceptions.RequestException as e:
             # Log and return the error
             current_app.logger.error(f"Error fetching news: {str(e)}")
             return {"error": str(e)}
 
+    async def _fetch_news_async(self, query="innovation", language="en", page_size=5):
+        """
+        `_fetch_news` on the async HTTP client, for the async serving mode.
+        """
+        from app.services.async_http import async_http_client  # Deferred, sync workers never load aiohttp
+
+        params = {"q": query, "apiKey": self.api_key, "language": language, "pageSize": page_size}
+
+        try:
+            response = await async_http_client.get("newsapi", self.base_url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except UpstreamThrottled:
+            raise
+        except requests.exceptions.RequestException as e:
+            current_app.logger.error(f"Error fetching news: {str(e)}")
+            return {"error": str(e)}
+
     def get_innovation_articles(self, query="innovation", language="en", page_size=5):
         """
         Public method to fetch innovation-related news articles.
         """
-        result = self._fetch_news(query, language, page_size)
+        return self._articles(self._fetch_news(query, language, page_size))
+
+    async def get_innovation_articles_async(self, query="innovation", language="en", page_size=5):
+        return self._articles(await self._fetch_news_async(query, language, page_size))
+
+    @staticmethod
+    def _articles(result):
         if "error" in result:
             return {"error": "Failed to fetch innovation news."}  # You can customize this error message
         return result.get("articles", [])
\ No newline at end of file
@@ -0,0 +1,123 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hashes are already queued, answered with 503 and Retry-After."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Too many password checks in progress, try again shortly")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's password KDF on a small process pool.
+
+    The KDF is deliberately slow and CPU bound, so a login storm run inline
+    occupies every request thread and core the worker has. Here only `workers`
+    hashes run at once per worker, and at most `max_pending` may be running or
+    queued; past that `PasswordHasherBusy` is raised right away instead of
+    letting logins pile up. With `workers` set to 0 hashing runs inline.
+
+    Hashes made with an older `method` or salt length still verify, and
+    `needs_rehash` tells the login route to upgrade them.
+    """
+
+    def __init__(self, workers=2, max_pending=16, queue_wait=0.0, timeout=10.0,
+                 method="pbkdf2:sha256", salt_length=16):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_wait = queue_wait
+        self.timeout = timeout
+        self.method = method
+        self.salt_length = salt_length
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.max_pending = app.config.get("PASSWORD_HASH_MAX_PENDING", self.max_pending)
+        self.queue_wait = app.config.get("PASSWORD_HASH_QUEUE_WAIT", self.queue_wait)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.salt_length = app.config.get("PASSWORD_SALT_LENGTH", self.salt_length)
+        self._slots = threading.BoundedSemaphore(max(self.max_pending, 1))
+        app.extensions["password_hasher"] = self
+
+    def _get_executor(self):
+        # Created on first use and per process, a pool inherited across a fork is unusable
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # forkserver children start clean instead of copying a worker's threads and locks.
+                # They still re-run the entry script, which must not build the app at import (see manage.py)
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(method)
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if self.queue_wait > 0:
+            reserved = self._slots.acquire(timeout=self.queue_wait)
+        else:
+            reserved = self._slots.acquire(blocking=False)
+        if not reserved:
+            raise PasswordHasherBusy()
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot stays taken until the child finishes, even if this request gives up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy()
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            logging.error("🔴 Password hashing pool died, hashing inline for this request")
+            return fn(*args)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def _method_with_cost(self):
+        # werkzeug writes the iteration count into the hash even when the method omits it
+        if self.method.startswith("pbkdf2:") and self.method.count(":") == 1:
+            return f"{self.method}:{DEFAULT_PBKDF2_ITERATIONS}"
+        return self.method
+
+    def needs_rehash(self, pwhash):
+        """True when `pwhash` was made with a different method, cost or salt length than configured."""
+        if pwhash.count("$") < 2:
+            return True
+        method, salt, _ = pwhash.split("$", 2)
+        return method != self._method_with_cost() or len(salt) != self.salt_length
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
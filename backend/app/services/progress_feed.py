@@ -0,0 +1,186 @@
+import json
+import logging
+import queue
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from app.models import CommunityProgress, Progress
+
+try:
+    import redis
+except ImportError:  # Optional, only needed for the "redis" backend
+    redis = None
+
+
+def serialize_progress(p):
+    return {"id": p.id, "achievement": p.achievement, "user_id": p.user_id, "created_at": p.created_at.isoformat()}
+
+
+def serialize_story(s):
+    return {"id": s.id, "progress_story": s.progress_story, "user_id": s.user_id, "created_at": s.created_at.isoformat()}
+
+
+# Event kind -> (model, serializer, cursor key)
+FEEDS = {
+    "progress": (Progress, serialize_progress, "p"),
+    "community_progress": (CommunityProgress, serialize_story, "c"),
+}
+
+
+def encode_cursor(last_ids):
+    return ",".join(f"{FEEDS[kind][2]}:{last_ids.get(kind, 0)}" for kind in FEEDS)
+
+
+def decode_cursor(cursor):
+    """Parses `p:<id>,c:<id>`, unknown or malformed parts are ignored."""
+    keys = {key: kind for kind, (_, _, key) in FEEDS.items()}
+    last_ids = {}
+    for part in (cursor or "").split(","):
+        key, _, value = part.partition(":")
+        if key in keys and value.isdigit():
+            last_ids[keys[key]] = int(value)
+    return last_ids
+
+
+class ProgressBroadcaster:
+    """
+    Fans newly committed Progress and CommunityProgress rows out to every
+    connected feed client in this process.
+
+    Rows are captured from ORM flushes and published once their transaction
+    commits. With the "redis" backend they go through a pub/sub channel instead,
+    and one listener thread per worker republishes them locally, so clients see
+    rows committed by any worker. Nothing is captured unless the feed is
+    enabled (PROGRESS_FEED_ENABLED).
+    """
+
+    CHANNEL = "progress_feed"
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener = None
+        self.enabled = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROGRESS_FEED_ENABLED", False)
+        self.queue_size = app.config.get("PROGRESS_FEED_QUEUE_SIZE", self.queue_size)
+        backend = app.config.get("PROGRESS_FEED_BACKEND", "memory")
+        if backend == "redis":
+            if redis is None:
+                raise RuntimeError("❌ The 'redis' package is required for the redis progress feed backend")
+            self._redis = redis.Redis.from_url(app.config["PROGRESS_FEED_REDIS_URL"])
+        elif backend != "memory":
+            raise RuntimeError(f"❌ Unknown PROGRESS_FEED_BACKEND: {backend}")
+        app.extensions["progress_feed"] = self
+
+        if self.enabled and not event.contains(Session, "after_flush", _capture_rows):
+            event.listen(Session, "after_flush", _capture_rows)
+            event.listen(Session, "after_commit", _publish_rows)
+            event.listen(Session, "after_rollback", _discard_rows)
+
+    def subscribe(self):
+        # Listener starts with the first client so no thread exists before a gunicorn fork
+        self._start_listener()
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, events):
+        """Publishes (kind, payload) pairs, across workers when a pub/sub backend is set."""
+        if not events:
+            return
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.CHANNEL, json.dumps(events))
+                return
+            except redis.RedisError as e:
+                logging.error(f"🔴 Progress feed publish failed, delivering locally only: {str(e)}")
+        self._deliver(events)
+
+    def _deliver(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for item in events:
+                try:
+                    subscriber.put_nowait(item)
+                except queue.Full:
+                    # Slow client: end its stream, it replays what it missed from its cursor on reconnect
+                    self.unsubscribe(subscriber)
+                    # Publishers that listed it before the unsubscribe may still refill the freed slot,
+                    # keep dropping events until the end-of-stream marker fits
+                    while True:
+                        try:
+                            subscriber.get_nowait()
+                        except queue.Empty:
+                            pass
+                        try:
+                            subscriber.put_nowait(None)
+                            break
+                        except queue.Full:
+                            continue
+                    break
+
+    def _start_listener(self):
+        if self._redis is None or self._listener is not None:
+            return
+
+        def listen():
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.CHANNEL)
+            for message in pubsub.listen():
+                try:
+                    self._deliver([tuple(item) for item in json.loads(message["data"])])
+                except (ValueError, TypeError) as e:
+                    logging.error(f"🔴 Bad progress feed message: {str(e)}")
+
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=listen, name="progress-feed-listener", daemon=True)
+                self._listener.start()
+
+    @staticmethod
+    def backfill(last_ids, limit=500):
+        """Rows committed after the client's cursor, oldest first, per feed."""
+        events = []
+        for kind, (model, serialize, _) in FEEDS.items():
+            if kind not in last_ids:
+                continue
+            rows = model.query.filter(model.id > last_ids[kind]).order_by(model.id).limit(limit).all()
+            events.extend((kind, serialize(row)) for row in rows)
+        return events
+
+    @staticmethod
+    def latest_ids():
+        return {kind: db.session.query(db.func.max(model.id)).scalar() or 0 for kind, (model, _, _) in FEEDS.items()}
+
+
+progress_feed = ProgressBroadcaster()
+
+
+def _capture_rows(session, flush_context):
+    # Serialised here, after commit the instances are expired and can't be read without a query
+    captured = session.info.setdefault("progress_feed", [])
+    for obj in session.new:
+        for kind, (model, serialize, _) in FEEDS.items():
+            if isinstance(obj, model):
+                captured.append((kind, serialize(obj)))
+
+
+def _publish_rows(session):
+    progress_feed.publish(session.info.pop("progress_feed", []))
+
+
+def _discard_rows(session):
+    session.info.pop("progress_feed", None)
@@ -0,0 +1,157 @@
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from app.models import Progress, ProgressStats
+
+# Fixed reference keeps t small (days) so the sums stay well conditioned in float64
+STATS_EPOCH = datetime(2020, 1, 1)
+MIN_ENTRIES = 3
+
+
+def init_app(app):
+    @app.cli.command("progress-stats-rebuild")
+    def progress_stats_rebuild():
+        """Recompute the forecast sums for every user with progress."""
+        user_ids = [u for (u,) in db.session.query(Progress.user_id).distinct()]
+        for user_id in user_ids:
+            rebuild_stats(user_id)
+        db.session.commit()
+        print(f"Rebuilt progress stats for {len(user_ids)} users")
+
+
+def _days(created_at):
+    return (created_at - STATS_EPOCH).total_seconds() / 86400.0
+
+
+def record_progress(user_id, created_ats):
+    """
+    Folds newly added progress timestamps (in insertion order) into the user's
+    running sums. Call after the Progress rows are added, in the same transaction.
+    The update is a single UPDATE whose SET clauses read the pre-update values,
+    so concurrent inserts for the same user can't lose each other's increments.
+    """
+    t = np.array([_days(c) for c in created_ats])
+    if t.size == 0:
+        return
+    k = t.size
+    ranks = np.arange(1, k + 1)
+
+    updated = ProgressStats.query.filter_by(user_id=user_id).update({
+        ProgressStats.sum_t: ProgressStats.sum_t + float(t.sum()),
+        ProgressStats.sum_tt: ProgressStats.sum_tt + float((t * t).sum()),
+        # New entries get y = count + 1 .. count + k
+        ProgressStats.sum_y: ProgressStats.sum_y + ProgressStats.count * k + float(ranks.sum()),
+        ProgressStats.sum_ty: ProgressStats.sum_ty + ProgressStats.count * float(t.sum()) + float((ranks * t).sum()),
+        ProgressStats.count: ProgressStats.count + k,
+    }, synchronize_session=False)
+
+    if not updated:
+        # First progress for this user (or stats never backfilled), build them from the rows
+        rebuild_stats(user_id)
+
+
+def _sums(user_id):
+    dates = [
+        c for (c,) in db.session.query(Progress.created_at)
+        .filter(Progress.user_id == user_id)
+        .order_by(Progress.created_at, Progress.id)
+    ]
+    t = np.array([_days(c) for c in dates])
+    y = np.arange(1, t.size + 1, dtype=float)
+    return dict(
+        count=int(t.size), sum_t=float(t.sum()), sum_tt=float((t * t).sum()),
+        sum_y=float(y.sum()), sum_ty=float((t * y).sum()),
+    )
+
+
+def rebuild_stats(user_id):
+    """
+    Recomputes a user's sums from their Progress rows, flushing pending inserts first.
+    An existing stats row is locked before the rows are read, so an increment
+    committed meanwhile can't be overwritten with a stale total.
+    """
+    db.session.flush()
+    stats = ProgressStats.query.filter_by(user_id=user_id).with_for_update().populate_existing().one_or_none()
+    if stats is None:
+        try:
+            with db.session.begin_nested():
+                stats = ProgressStats(user_id=user_id, **_sums(user_id))
+                db.session.add(stats)
+            return stats
+        except IntegrityError:
+            # A concurrent request created the row first from the rows it could see, which
+            # need not include ours. Its transaction has committed, recount under the row lock
+            stats = ProgressStats.query.filter_by(user_id=user_id).with_for_update().populate_existing().one()
+
+    for key, value in _sums(user_id).items():
+        setattr(stats, key, value)
+    return stats
+
+
+def forecast_next_milestone(count, sum_t, sum_tt, sum_y, sum_ty):
+    """
+    Closed-form least squares of y (entry index) on t (days), solved for the
+    time at which y reaches count + 1. Works on scalars or NumPy arrays and
+    returns NaN where there is too little data or no upward trend.
+    """
+    count = np.asarray(count, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sxx = sum_tt - sum_t * sum_t / count
+        sxy = sum_ty - sum_t * sum_y / count
+        slope = sxy / sxx
+        intercept = (sum_y - slope * sum_t) / count
+        next_t = (count + 1 - intercept) / slope
+
+    valid = (count >= MIN_ENTRIES) & (sxx > 1e-9) & (slope > 0) & np.isfinite(next_t)
+    return np.where(valid, next_t, np.nan)
+
+
+def _message(next_t):
+    if np.isnan(next_t):
+        return "Not enough data for predictions"
+    when = STATS_EPOCH + timedelta(days=float(next_t))
+    return f"At your current pace, you'll complete your next milestone by {when:%Y-%m-%d %H:%M:%S}."
+
+
+def predict_many(user_ids):
+    """
+    Forecasts for many users in one query and one vectorised NumPy pass.
+    Returns {user_id: {"next_milestone": iso string or None, "message": str}}.
+    """
+    user_ids = [int(u) for u in user_ids]
+    rows = ProgressStats.query.filter(ProgressStats.user_id.in_(user_ids)).all() if user_ids else []
+
+    # Users whose stats predate this table get them built once
+    missing = set(user_ids) - {r.user_id for r in rows}
+    if missing:
+        with_progress = {
+            u for (u,) in db.session.query(Progress.user_id).filter(Progress.user_id.in_(missing)).distinct()
+        }
+        for user_id in with_progress:
+            rows.append(rebuild_stats(user_id))
+        if with_progress:
+            db.session.commit()
+            logging.info(f"📈 Backfilled progress stats for {len(with_progress)} users")
+
+    forecasts = {u: {"next_milestone": None, "message": _message(np.nan)} for u in user_ids}
+    if not rows:
+        return forecasts
+
+    columns = np.array([(r.count, r.sum_t, r.sum_tt, r.sum_y, r.sum_ty) for r in rows], dtype=float)
+    next_ts = forecast_next_milestone(*columns.T)
+
+    for row, next_t in zip(rows, next_ts):
+        forecasts[row.user_id] = {
+            "next_milestone": None if np.isnan(next_t) else (STATS_EPOCH + timedelta(days=float(next_t))).isoformat(),
+            "message": _message(next_t),
+        }
+    return forecasts
+
+
+def predict_goal_completion(user_id):
+    """O(1) forecast message for a single user."""
+    return predict_many([user_id])[int(user_id)]["message"]
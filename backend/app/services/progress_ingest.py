@@ -0,0 +1,143 @@
+import json
+import logging
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import func
+
+from extensions import db
+from app.models import Progress
+from app.services.progress_feed import progress_feed, serialize_progress
+from app.services.progress_forecast import rebuild_stats, record_progress
+
+ACHIEVEMENT_MAX_LENGTH = 500  # Progress.achievement is a String(500)
+
+
+def parse_ndjson(lines):
+    """Yields one row per non-blank line, unparseable lines become errors for that row."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {str(e)}")
+
+
+def validate_row(row, user_id, now):
+    """Returns (achievement, created_at) or raises ValueError with a message for the client."""
+    if isinstance(row, ValueError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Row must be a JSON object")
+
+    achievement = row.get("achievement")
+    if not isinstance(achievement, str) or not achievement.strip():
+        raise ValueError("Achievement is required")
+    if len(achievement) > ACHIEVEMENT_MAX_LENGTH:
+        raise ValueError(f"Achievement is longer than {ACHIEVEMENT_MAX_LENGTH} characters")
+    if "user_id" in row and str(row["user_id"]) != str(user_id):
+        raise ValueError("Rows can only be added for the logged-in user")
+
+    created_at = row.get("created_at")
+    if created_at is None:
+        return achievement, now
+    if not isinstance(created_at, str):
+        raise ValueError("created_at must be an ISO 8601 string")
+    try:
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("created_at must be an ISO 8601 string")
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)  # Stored as naive UTC
+    if created_at > now:
+        raise ValueError("created_at is in the future")
+    return achievement, created_at
+
+
+def _insert_batch(batch, with_rows):
+    """
+    Inserts `batch` with one executemany. With `with_rows` the stored rows are
+    returned (id, achievement, user_id, created_at) for the live feed, else None.
+    """
+    table = Progress.__table__
+    if not with_rows:
+        db.session.execute(table.insert(), batch)
+        return None
+    if getattr(db.session.get_bind(Progress.__mapper__).dialect, "insert_executemany_returning", False):
+        returning = table.insert().returning(table.c.id, table.c.achievement, table.c.user_id, table.c.created_at)
+        return db.session.execute(returning, batch).all()
+
+    db.session.execute(table.insert(), batch)
+    # SQLite holds the write lock from the insert until commit, so the batch got the ids just below the new maximum
+    first_id = db.session.query(func.max(Progress.id)).scalar() - len(batch) + 1
+    return [SimpleNamespace(id=first_id + i, **row) for i, row in enumerate(batch)]
+
+
+def ingest_progress(user_id, rows, batch_size=5000, max_rows=1000000, max_errors=1000):
+    """
+    Validates and inserts progress rows for one user. Each batch of valid rows is
+    one executemany INSERT in its own transaction, so a large upload costs one
+    commit per batch and a failure only loses the batch it happened in. Returns
+    counts plus the index and message of each rejected row.
+    """
+    now = datetime.utcnow()
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    last_created_at = db.session.query(func.max(Progress.created_at)).filter(Progress.user_id == user_id).scalar()
+    stats_stale = False
+
+    def reject(index, message):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": index, "error": message})
+        else:
+            report["errors_truncated"] = True
+
+    def flush(batch, indices):
+        nonlocal last_created_at, stats_stale
+        if not batch:
+            return
+        try:
+            stored = _insert_batch(batch, with_rows=progress_feed.enabled)
+
+            created_ats = sorted(row["created_at"] for row in batch)
+            if last_created_at is None or created_ats[0] >= last_created_at:
+                record_progress(user_id, created_ats)
+                last_created_at = created_ats[-1]
+            else:
+                stats_stale = True  # Backfilled history shifts every later index, rebuilt once at the end
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"🔴 Bulk progress batch failed: {str(e)}", exc_info=True)
+            for index in indices:
+                reject(index, "Batch could not be stored")
+            return
+
+        report["inserted"] += len(batch)
+        if stored:
+            # Core inserts skip the ORM flush hooks, so the live feed is told here
+            progress_feed.publish([("progress", serialize_progress(p)) for p in sorted(stored, key=lambda p: p.id)])
+
+    batch, indices = [], []
+    for index, row in enumerate(rows):
+        if index >= max_rows:
+            reject(index, f"Too many rows, the limit is {max_rows} per request")
+            break
+        try:
+            achievement, created_at = validate_row(row, user_id, now)
+        except ValueError as e:
+            reject(index, str(e))
+            continue
+        batch.append({"user_id": user_id, "achievement": achievement, "created_at": created_at})
+        indices.append(index)
+        if len(batch) >= batch_size:
+            flush(batch, indices)
+            batch, indices = [], []
+    flush(batch, indices)
+
+    if stats_stale:
+        rebuild_stats(user_id)
+        db.session.commit()
+    return report
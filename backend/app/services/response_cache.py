@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flask import current_app
+
+from app.services.upstream_quota import background
+
+try:
+    import redis
+except ImportError:  # Optional, only needed for the "redis" backend
+    redis = None
+
+
+class MemoryBackend:
+    """Per-process store, entries are kept as Python objects."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, entry, expire):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def try_lock(self, key, expire):
+        # Refreshes are already single-flight within the process
+        return True
+
+    def unlock(self, key):
+        pass
+
+
+class RedisBackend:
+    """
+    Shared store for every worker, works with Redis or any server speaking its
+    protocol. Entries are JSON encoded and expire once they are too stale to serve.
+    While the server is unreachable every call degrades to an uncached, unlocked fetch.
+    """
+
+    def __init__(self, url, prefix):
+        if redis is None:
+            raise RuntimeError("❌ The 'redis' package is required for the redis cache backend")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(f"{self.prefix}:{key}")
+        except redis.RedisError as e:
+            logging.error(f"🔴 Response cache read failed, fetching uncached: {str(e)}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, entry, expire):
+        try:
+            self.client.set(f"{self.prefix}:{key}", json.dumps(entry), ex=max(int(expire), 1))
+        except redis.RedisError as e:
+            logging.error(f"🔴 Response cache write failed, value not cached: {str(e)}")
+
+    def try_lock(self, key, expire):
+        # Keeps other workers from refreshing the same key at the same time
+        try:
+            return bool(self.client.set(f"{self.prefix}:lock:{key}", "1", nx=True, ex=max(int(expire), 1)))
+        except redis.RedisError as e:
+            logging.error(f"🔴 Response cache lock failed, refreshing unlocked: {str(e)}")
+            return True
+
+    def unlock(self, key):
+        try:
+            self.client.delete(f"{self.prefix}:lock:{key}")
+        except redis.RedisError as e:
+            logging.error(f"🔴 Response cache unlock failed, the lock expires on its own: {str(e)}")
+
+
+class ResponseCache:
+    """
+    TTL cache for upstream responses with stale-while-revalidate.
+
+    Fresh entries (younger than `ttl`) are served directly. Stale entries
+    (up to `stale_ttl` past that) are still served while a single background
+    refresh runs. Concurrent misses for the same key share one upstream call.
+    Settings are read from `<config_prefix>_*` keys in the app config.
+    """
+
+    def __init__(self, config_prefix, ttl=300, stale_ttl=3600):
+        self.config_prefix = config_prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = MemoryBackend()
+        self._inflight = {}
+        self._async_inflight = {}  # Event-loop futures for the async serving mode
+        self._async_refreshes = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"{config_prefix.lower()}-refresh")
+
+    def init_app(self, app):
+        prefix = self.config_prefix
+        self.ttl = app.config.get(f"{prefix}_TTL", self.ttl)
+        self.stale_ttl = app.config.get(f"{prefix}_STALE_TTL", self.stale_ttl)
+
+        backend = app.config.get(f"{prefix}_BACKEND", "memory")
+        if backend == "redis":
+            self.backend = RedisBackend(app.config[f"{prefix}_REDIS_URL"], prefix.lower())
+        elif backend == "memory":
+            self.backend = MemoryBackend(app.config.get(f"{prefix}_MAX_ENTRIES", 1024))
+        else:
+            raise RuntimeError(f"❌ Unknown {prefix}_BACKEND: {backend}")
+        app.extensions[prefix.lower()] = self
+
+    @staticmethod
+    def make_key(*parts):
+        return json.dumps(parts, separators=(",", ":"))
+
+    def get_or_fetch(self, key, fetch, cacheable=lambda value: True):
+        """
+        Returns the cached value for `key`, calling `fetch()` on a miss.
+        Values rejected by `cacheable` (upstream errors) are returned but not stored.
+        """
+        entry = self.backend.get(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < self.ttl:
+                return entry["value"]
+            if age < self.ttl + self.stale_ttl:
+                self._refresh_in_background(key, fetch, cacheable)
+                return entry["value"]
+
+        return self._fetch_once(key, fetch, cacheable)
+
+    def _store(self, key, value, cacheable):
+        if cacheable(value):
+            entry = {"value": value, "fetched_at": time.time()}
+            self.backend.set(key, entry, expire=self.ttl + self.stale_ttl)
+
+    def _fetch_once(self, key, fetch, cacheable):
+        """Single-flight fetch: the first caller runs `fetch`, concurrent callers wait for its result."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            value = future.result()
+            # A failed background refresh resolves to None, fetch directly instead
+            return value if value is not None else fetch()
+
+        try:
+            value = fetch()
+            self._store(key, value, cacheable)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def get_or_fetch_async(self, key, fetch, cacheable=lambda value: True):
+        """
+        `get_or_fetch` for the async serving mode, `fetch` is a coroutine function.
+        Single-flight and background refreshes are per event loop.
+        """
+        entry = self.backend.get(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < self.ttl:
+                return entry["value"]
+            if age < self.ttl + self.stale_ttl:
+                self._refresh_async(key, fetch, cacheable)
+                return entry["value"]
+
+        future = self._async_inflight.get(key)
+        if future is not None:
+            value = await asyncio.shield(future)
+            # The leader failed, fetch directly instead
+            return value if value is not None else await fetch()
+
+        future = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+        value = None
+        try:
+            value = await fetch()
+            self._store(key, value, cacheable)
+            return value
+        finally:
+            self._async_inflight.pop(key, None)
+            future.set_result(value)
+
+    def _refresh_async(self, key, fetch, cacheable):
+        if key in self._async_inflight or not self.backend.try_lock(key, expire=self.ttl):
+            return
+        future = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+
+        async def refresh():
+            value = None
+            try:
+                with background():  # Someone is already being served the stale entry
+                    value = await fetch()
+                self._store(key, value, cacheable)
+            except Exception as e:
+                logging.error(f"🔴 Background refresh failed for {key}: {str(e)}")
+            finally:
+                self.backend.unlock(key)
+                self._async_inflight.pop(key, None)
+                future.set_result(value)
+
+        # Keep a reference, the loop only holds tasks weakly
+        task = asyncio.ensure_future(refresh())
+        self._async_refreshes.add(task)
+        task.add_done_callback(self._async_refreshes.discard)
+
+    def _refresh_in_background(self, key, fetch, cacheable):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self._inflight[key] = Future()
+        if not self.backend.try_lock(key, expire=self.ttl):
+            self._finish(key, None)
+            return
+
+        app = current_app._get_current_object()
+
+        def refresh():
+            value = None
+            try:
+                with app.app_context(), background():
+                    value = fetch()
+                    self._store(key, value, cacheable)
+            except Exception as e:
+                logging.error(f"🔴 Background refresh failed for {key}: {str(e)}")
+            finally:
+                self.backend.unlock(key)
+                self._finish(key, value)
+
+        self._refresher.submit(refresh)
+
+    def _finish(self, key, value):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_result(value)
+
+
+news_cache = ResponseCache("NEWS_CACHE")
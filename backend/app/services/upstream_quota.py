@@ -0,0 +1,332 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import requests
+
+from app.services.metrics import metrics, phase
+
+try:
+    import fcntl
+except ImportError:  # POSIX only, the "local" backend needs it
+    fcntl = None
+
+try:
+    import redis
+except ImportError:  # Optional, only needed for the "redis" backend
+    redis = None
+
+INTERACTIVE, BACKGROUND = "interactive", "background"
+BUCKET = struct.Struct("<ddd")  # tokens, refilled at, blocked until (epoch seconds, shared between processes)
+
+# Error responses worth replaying, timeouts and 429s aren't about the request itself
+NEGATIVE_CACHE_EXCLUDED = frozenset({408, 429})
+
+_priority = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+class UpstreamThrottled(requests.RequestException):
+    """Raised instead of calling an upstream whose quota can't take the call soon enough."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def background():
+    """Marks upstream calls made inside (this thread or task) as background work."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_quota(spec):
+    """(tokens per second, burst) from "requests/seconds" or "requests/seconds:burst"."""
+    try:
+        limit, _, rest = spec.partition("/")
+        period, _, burst = rest.partition(":")
+        limit, period = float(limit), float(period)
+        burst = float(burst) if burst else limit
+        if limit <= 0 or period <= 0 or burst < 1:
+            raise ValueError
+    except ValueError:
+        raise RuntimeError(f"❌ Invalid upstream quota '{spec}', use requests/seconds[:burst], e.g. 100/86400")
+    return limit / period, burst
+
+
+def _refill(state, now, rate, burst):
+    if state is None:
+        return burst, now, 0.0
+    tokens, refilled_at, blocked_until = state
+    # refilled_at is in the future while a 429 pause lasts, nothing accrues until it ends
+    return min(burst, tokens + max(0.0, now - refilled_at) * rate), max(now, refilled_at), blocked_until
+
+
+class MemoryBackend:
+    """Per-process buckets, every worker gets the whole quota. For a single worker or development."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, name, step):
+        with self._lock:
+            state, result = step(self._states.get(name))
+            self._states[name] = state
+            return result
+
+
+class LocalBackend:
+    """
+    Buckets shared by every worker on the host. Each upstream's bucket is a
+    small memory-mapped file under `directory`, changed under an exclusive
+    flock so concurrent workers take tokens one at a time.
+    """
+
+    def __init__(self, directory):
+        if fcntl is None:
+            raise RuntimeError("❌ The local upstream quota backend needs fcntl, use memory or redis on this platform")
+        self.directory = directory
+        self._maps = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _map(self, name):
+        # flock locks belong to the open file, a descriptor inherited across fork would share them
+        if self._pid != os.getpid():
+            self._maps, self._pid = {}, os.getpid()
+        if name not in self._maps:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(os.path.join(self.directory, f"{name}.bucket"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size < BUCKET.size:
+                    os.ftruncate(fd, BUCKET.size)  # Zero-filled, read back as a fresh bucket
+                self._maps[name] = (fd, mmap.mmap(fd, BUCKET.size))
+            except OSError:
+                os.close(fd)
+                raise
+        return self._maps[name]
+
+    def update(self, name, step):
+        with self._lock:
+            fd, view = self._map(name)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                state = BUCKET.unpack_from(view)
+                state, result = step(state if state[1] > 0 else None)
+                BUCKET.pack_into(view, 0, *state)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RedisBackend:
+    """
+    Buckets shared by workers on every host, in Redis or any server speaking
+    its protocol. Each change is an optimistic WATCH/MULTI transaction.
+    """
+
+    def __init__(self, url, prefix="upstream_quota"):
+        if redis is None:
+            raise RuntimeError("❌ The 'redis' package is required for the redis upstream quota backend")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def update(self, name, step):
+        key = f"{self.prefix}:{name}"
+
+        def apply(pipe):
+            raw = pipe.get(key)
+            state, result = step(BUCKET.unpack(raw) if raw else None)
+            pipe.multi()
+            pipe.set(key, BUCKET.pack(*state))
+            return result
+
+        return self.client.transaction(apply, key, value_from_callable=True)
+
+
+class UpstreamQuota:
+    """
+    Token buckets per upstream API key, shared across workers so the
+    deployment as a whole stays within NewsAPI's, Wolfram's and the Fact
+    Check API's quotas instead of every worker bursting past them at once.
+
+    A bucket holds up to `burst` tokens and refills at the configured rate,
+    each call takes one. Interactive calls may empty it, background calls
+    (cache refreshes, queued insight jobs, goal re-clustering) leave a
+    `reserve` share for them. A call waits up to its priority's max wait for
+    a token and is shed with UpstreamThrottled past that. A 429 pauses the
+    upstream for every worker until its Retry-After, and other error
+    responses are replayed from a short per-process cache instead of re-sent.
+    """
+
+    def __init__(self):
+        self.quotas = {}  # upstream -> (tokens per second, burst)
+        self.reserve = 0.2
+        self.max_wait = {INTERACTIVE: 2.0, BACKGROUND: 30.0}
+        self.cooldown = 60.0
+        self.error_ttl = 30.0
+        self.error_cache_size = 1024
+        self.backend = MemoryBackend()
+        self._errors = OrderedDict()  # request key -> (status, content, headers, url, expires at)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.quotas = {name: parse_quota(spec) for name, spec in app.config.get("UPSTREAM_QUOTAS", {}).items() if spec}
+        self.reserve = min(max(app.config.get("UPSTREAM_QUOTA_BACKGROUND_RESERVE", self.reserve), 0.0), 0.9)
+        self.max_wait = {
+            INTERACTIVE: app.config.get("UPSTREAM_QUOTA_MAX_WAIT", self.max_wait[INTERACTIVE]),
+            BACKGROUND: app.config.get("UPSTREAM_QUOTA_BACKGROUND_MAX_WAIT", self.max_wait[BACKGROUND]),
+        }
+        self.cooldown = app.config.get("UPSTREAM_QUOTA_COOLDOWN", self.cooldown)
+        self.error_ttl = app.config.get("UPSTREAM_ERROR_CACHE_TTL", self.error_ttl)
+        self.error_cache_size = app.config.get("UPSTREAM_ERROR_CACHE_SIZE", self.error_cache_size)
+
+        backend = app.config.get("UPSTREAM_QUOTA_BACKEND", "auto")
+        if backend == "auto":
+            backend = "local" if fcntl is not None else "memory"
+        if backend == "local":
+            self.backend = LocalBackend(app.config.get("UPSTREAM_QUOTA_DIR") or os.path.join(app.instance_path, "upstream_quota"))
+        elif backend == "redis":
+            self.backend = RedisBackend(app.config["UPSTREAM_QUOTA_REDIS_URL"])
+        elif backend == "memory":
+            self.backend = MemoryBackend()
+        else:
+            raise RuntimeError(f"❌ Unknown UPSTREAM_QUOTA_BACKEND: {backend}")
+        app.extensions["upstream_quota"] = self
+
+    def _take(self, upstream, priority):
+        """(seconds until a token could be taken, 0.0 once one is, and whether the upstream is paused)."""
+        rate, burst = self.quotas[upstream]
+        floor = min(burst * self.reserve, burst - 1) if priority == BACKGROUND else 0.0
+
+        def step(state):
+            now = time.time()
+            tokens, refilled_at, blocked_until = _refill(state, now, rate, burst)
+            if blocked_until > now:
+                first_token = max(0.0, floor + 1 - tokens) / rate
+                return (tokens, refilled_at, blocked_until), (blocked_until - now + first_token, True)
+            if tokens >= floor + 1:
+                return (tokens - 1, refilled_at, blocked_until), (0.0, False)
+            return (tokens, refilled_at, blocked_until), ((floor + 1 - tokens) / rate, False)
+
+        try:
+            return self.backend.update(upstream, step)
+        except Exception as e:
+            # Losing the shared store shouldn't take the upstream down with it
+            logging.warning(f"⚠️ Upstream quota store failed, letting the {upstream} call through: {str(e)}")
+            return 0.0, False
+
+    def _poll(self, upstream, priority, started, slept):
+        """Seconds to sleep before trying again, 0.0 once the call may go ahead. Raises UpstreamThrottled to shed it."""
+        wait, paused = self._take(upstream, priority)
+        waited = time.monotonic() - started
+        if wait <= 0:
+            metrics.upstream_calls.inc(upstream, priority, "throttled" if slept else "sent")
+            metrics.upstream_waits.observe(waited if slept else 0.0, upstream, priority)
+            return 0.0
+        if waited + wait > self.max_wait[priority]:
+            metrics.upstream_calls.inc(upstream, priority, "cooldown" if paused else "shed")
+            reason = "paused after a 429" if paused else "over its request quota"
+            raise UpstreamThrottled(f"{upstream} is {reason}, retry later", retry_after=max(1, math.ceil(wait)))
+        return wait
+
+    def acquire(self, upstream):
+        """Blocks until `upstream` has quota for this call, raises UpstreamThrottled if that's too far off."""
+        if upstream not in self.quotas:
+            return
+        priority, started = _priority.get(), time.monotonic()
+        with phase("quota"):
+            slept = False
+            while True:
+                wait = self._poll(upstream, priority, started, slept)
+                if not wait:
+                    return
+                time.sleep(wait)
+                slept = True
+
+    async def acquire_async(self, upstream):
+        """`acquire` for the async serving mode, waits without blocking the event loop."""
+        if upstream not in self.quotas:
+            return
+        priority, started = _priority.get(), time.monotonic()
+        slept = False
+        while True:
+            wait = self._poll(upstream, priority, started, slept)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+            slept = True
+
+    def pause(self, upstream, retry_after=None):
+        """Stops every worker calling `upstream` for `retry_after` seconds (the cooldown by default)."""
+        if upstream not in self.quotas:
+            return
+        rate, burst = self.quotas[upstream]
+        seconds = float(retry_after) if retry_after and retry_after.isdigit() else self.cooldown
+
+        def step(state):
+            now = time.time()
+            blocked_until = max(_refill(state, now, rate, burst)[2], now + seconds)
+            # Drained and refilling only from the end of the pause, so the workers waiting it out don't all fire at once
+            return (0.0, blocked_until, blocked_until), None
+
+        try:
+            self.backend.update(upstream, step)
+        except Exception as e:
+            logging.warning(f"⚠️ Upstream quota store failed, {upstream} is not paused: {str(e)}")
+            return
+        logging.warning(f"⏳ {upstream} answered 429, pausing calls to it for {seconds:.0f}s")
+
+    @staticmethod
+    def request_key(upstream, method, url, kwargs):
+        """Negative cache key for a request, None for bodies that can't be keyed (form data, files)."""
+        if "data" in kwargs or "files" in kwargs:
+            return None
+        raw = json.dumps(
+            [upstream, method.upper(), url, kwargs.get("params"), kwargs.get("json")], sort_keys=True, default=str
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def cached_error(self, upstream, key):
+        """(status, content, headers, url) of a recent error response to the same request, else None."""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._errors.get(key)
+            if entry is None:
+                return None
+            if entry[-1] <= time.monotonic():
+                del self._errors[key]
+                return None
+        metrics.upstream_calls.inc(upstream, _priority.get(), "negative_cached")
+        return entry[:-1]
+
+    def record(self, upstream, key, status, content, headers, url):
+        """Pauses the upstream on a 429 and remembers other error responses for `error_ttl` seconds."""
+        if status == 429:
+            self.pause(upstream, headers.get("Retry-After"))
+            return
+        if status < 400 or status in NEGATIVE_CACHE_EXCLUDED or key is None or self.error_ttl <= 0:
+            return
+        with self._lock:
+            self._errors[key] = (status, content, dict(headers), url, time.monotonic() + self.error_ttl)
+            self._errors.move_to_end(key)
+            while len(self._errors) > self.error_cache_size:
+                self._errors.popitem(last=False)
+
+
+upstream_quota = UpstreamQuota()
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db, jwt
+from app.models import User
+
+# What routes read from the logged-in user, immutable so workers' threads can share it
+CachedUser = namedtuple("CachedUser", ["id", "username"])
+
+
+class UserCache:
+    """
+    Resolves JWT identities to users for `flask_jwt_extended.current_user`.
+
+    Every `@jwt_required()` route gets its user from the loader once per
+    request, and the loader answers from a short-TTL in-process cache, so a
+    request for a known user costs no query just to confirm it exists. Commits
+    that change or delete a User drop its entry in this worker at once; other
+    workers see the change when their entry expires after `ttl` seconds.
+    """
+
+    def __init__(self, ttl=30.0, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # user id -> (CachedUser, expires at)
+        self._generation = 0  # Bumped by invalidations, so a racing load isn't cached
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get("USER_CACHE_TTL", self.ttl)
+        self.max_size = app.config.get("USER_CACHE_SIZE", self.max_size)
+        app.extensions["user_cache"] = self
+        identity_claim = app.config.get("JWT_IDENTITY_CLAIM", "sub")
+
+        @jwt.user_lookup_loader
+        def load_user(jwt_header, jwt_data):
+            return self.get(jwt_data[identity_claim])
+
+        @jwt.user_lookup_error_loader
+        def user_not_found(jwt_header, jwt_data):
+            return jsonify({"error": "User not found"}), 404
+
+        if not event.contains(Session, "after_flush", _capture_users):
+            event.listen(Session, "after_flush", _capture_users)
+            event.listen(Session, "after_commit", _invalidate_users)
+            event.listen(Session, "after_rollback", _discard_users)
+
+    def get(self, user_id):
+        """The CachedUser for `user_id` (int or JWT string), None if there is no such user."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+            generation = self._generation
+
+        row = db.session.query(User.id, User.username).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.username)
+
+        if self.ttl > 0 and self.max_size > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (user, now + self.ttl)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def _capture_users(session, flush_context):
+    changed = session.info.setdefault("user_cache", set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            changed.add(instance.id)
+
+
+def _invalidate_users(session):
+    changed = session.info.pop("user_cache", None)
+    if changed:
+        user_cache.invalidate(changed)
+
+
+def _discard_users(session):
+    session.info.pop("user_cache", None)
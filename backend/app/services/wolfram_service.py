@@ -0,0 +1,96 @@
+import logging
+
+from flask import current_app
+
+from app.models import Goal, Progress
+from app.services.http_client import http_client
+
+
+class WolframError(Exception):
+    """Raised when the Wolfram API fails or answers with something we can't use."""
+
+    def __init__(self, status_code, message, raw_response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.raw_response = raw_response
+
+
+class WolframService:
+    def __init__(self, api_url=None, appid=None):
+        # If no settings are provided, fetch them from the app's config
+        self.api_url = api_url or current_app.config.get("WOLFRAM_API_URL", "").strip()
+        self.appid = appid or current_app.config.get("WOLFRAM_APPID", "").strip()
+
+    @staticmethod
+    def collect_progress_inputs(user_id):
+        """Returns (timestamps, achievements, goal_texts) for the user's progress analysis."""
+        progress = Progress.query.filter_by(user_id=user_id).all()
+        timestamps = [p.created_at.isoformat() for p in progress]  # Ensure timestamps are formatted
+        achievements = [p.achievement for p in progress]
+        goal_texts = [g.goal for g in Goal.query.filter_by(user_id=user_id).all()]
+        return timestamps, achievements, goal_texts
+
+    def recommend_goals(self, goals):
+        """
+        Asks Wolfram's clustering endpoint for recommended goals across `goals`.
+        Returns an empty list on any failure, recommendations are best-effort.
+        """
+        try:
+            response = http_client.post("wolfram", self.api_url, json={"goals": goals})
+            wolfram_result = response.json()
+            logging.debug(f"🔍 AI Goal Recommendations Response: {wolfram_result}")
+            return wolfram_result.get("recommended_goals", [])
+        except Exception as e:
+            logging.error(f"🔴 AI Recommendation Error: {str(e)}")
+            return []
+
+    def progress_insights(self, timestamps, achievements, goal_texts):
+        """
+        Sends progress data to Wolfram for analysis and returns the fields we serve.
+        Raises WolframError on API errors and requests.RequestException on transport errors.
+        """
+        params = self._insights_params(timestamps, achievements, goal_texts)
+        logging.info(f"🚀 Sending request to Wolfram API: {self.api_url}")
+        return self._parse_insights(http_client.get("wolfram", self.api_url, params=params))
+
+    async def progress_insights_async(self, timestamps, achievements, goal_texts):
+        """`progress_insights` on the async HTTP client, for the async serving mode."""
+        from app.services.async_http import async_http_client  # Deferred, sync workers never load aiohttp
+
+        params = self._insights_params(timestamps, achievements, goal_texts)
+        logging.info(f"🚀 Sending request to Wolfram API: {self.api_url}")
+        return self._parse_insights(await async_http_client.get("wolfram", self.api_url, params=params))
+
+    def _insights_params(self, timestamps, achievements, goal_texts):
+        if not self.appid:
+            raise WolframError(500, "Wolfram API AppID is missing")
+
+        # ✅ Convert user data into a query-friendly format
+        query_text = f"Analyze progress: timestamps={timestamps}, achievements={achievements}, goals={goal_texts}"
+        return {"appid": self.appid, "input": query_text, "output": "json"}
+
+    @staticmethod
+    def _parse_insights(response):
+        logging.info(f"🌍 Wolfram API Response Status: {response.status_code}")
+
+        if response.status_code != 200:
+            logging.error(f"❌ Wolfram API Error {response.status_code}: {response.text}")
+            raise WolframError(response.status_code, f"Wolfram API Error: {response.status_code}")
+
+        # ✅ Ensure the response is JSON
+        try:
+            wolfram_result = response.json()
+        except ValueError:  # requests' JSONDecodeError and json's both subclass it
+            logging.error(f"❌ Wolfram API Response was not JSON. Raw response: {response.text}")
+            raise WolframError(500, "Invalid response from Wolfram API", raw_response=response.text)
+
+        # ✅ Extract relevant results
+        return {
+            "message": "Wolfram Analysis Complete",
+            "next_milestone": wolfram_result.get("NextMilestoneDate", "N/A"),
+            "innovation_score": wolfram_result.get("InnovationScore", "N/A"),
+            "recommended_goals": wolfram_result.get("RecommendedGoals", []),
+            "progress_graph": wolfram_result.get("ProgressGraph", ""),
+            "future_insights": wolfram_result.get("FutureInsights", []),
+            "suggestions": wolfram_result.get("Suggestions", []),
+        }
@@ -0,0 +1,30 @@
+"""
+Async serving mode: the same app on an aiohttp event loop, with native async
+handlers for the upstream-bound routes and every other route passed through
+to Flask.
+
+    python async_server.py
+    GUNICORN_WORKER_CLASS=aiohttp.GunicornWebWorker gunicorn -c gunicorn.conf.py "async_server:create_application()"
+"""
+import os
+
+
+def create_application():
+    """
+    The aiohttp application wrapping the Flask app, gunicorn calls this factory.
+
+    Nothing is imported at module level: the password hashing pool's children
+    (forkserver/spawn) re-run the entry script, see manage.py.
+    """
+    from app import app
+    from app.async_app import create_async_app
+
+    return create_async_app(app)
+
+
+if __name__ == "__main__":
+    from aiohttp import web
+
+    web.run_app(
+        create_application(), host=os.getenv("ASYNC_HOST", "127.0.0.1"), port=int(os.getenv("ASYNC_PORT", "5001"))
+    )
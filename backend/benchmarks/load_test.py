@@ -0,0 +1,286 @@
+"""
+Drives every blueprint's endpoints with concurrent load and reports throughput
+and p50/p95/p99 latency per endpoint.
+
+The schema is seeded from `app/models.py` at the requested scale (same seeder as
+query_plans.py), the app is served by a threaded WSGI server in a separate
+process, and NewsAPI, Wolfram and the Fact Check API are replaced by a local
+fake server that answers after an injected latency.
+
+    python benchmarks/load_test.py --users 10000 --progress-per-user 100 --concurrency 32
+    python benchmarks/load_test.py --only check_claim --requests 2000 --history benchmarks/load_history.jsonl
+    python benchmarks/load_test.py --database-url postgresql://localhost/flow_bench --upstream-latency 0.2
+
+Run from the `backend` directory. The target database is dropped and re-seeded.
+With --history, one JSON line per endpoint is appended so runs can be compared
+across commits.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from query_plans import configure_environment, seed
+
+BENCH_USERNAME = "user1"
+BENCH_PASSWORD = "benchmark"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--progress-per-user", type=int, default=20)
+    parser.add_argument("--goals-per-user", type=int, default=3)
+    parser.add_argument("--stories-per-user", type=int, default=2)
+    parser.add_argument("--claims", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="Mean fake upstream latency (s)")
+    parser.add_argument("--upstream-jitter", type=float, default=0.02, help="Std deviation of that latency (s)")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="Fraction of upstream 503s")
+    parser.add_argument("--only", action="append", help="Only endpoints whose name contains this (repeatable)")
+    parser.add_argument("--history", help="Append results as JSON lines to this file")
+    return parser.parse_args()
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """Answers like NewsAPI (/news), the Fact Check API (/factcheck) and Wolfram (/wolfram)."""
+
+    latency = 0.05
+    jitter = 0.02
+    error_rate = 0.0
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._answer()
+
+    def _answer(self):
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if random.random() < self.error_rate:
+            return self._send(503, {"error": "injected failure"})
+
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/factcheck":
+            body = {"claims": [{
+                "text": params.get("query", ""),
+                "claimReview": [{"publisher": {"name": "Bench"}, "textualRating": "False", "url": "http://bench.local"}],
+            }]}
+        elif url.path == "/news":
+            page_size = int(params.get("pageSize", 5))
+            body = {"status": "ok", "totalResults": page_size, "articles": [
+                {"title": f"Innovation {n}", "url": f"http://bench.local/{n}", "publishedAt": datetime.utcnow().isoformat()}
+                for n in range(page_size)
+            ]}
+        elif url.path == "/wolfram" and self.command == "POST":
+            body = {"recommended_goals": [f"Recommended goal {n}" for n in range(5)]}
+        elif url.path == "/wolfram":
+            body = {"NextMilestoneDate": "2030-01-01", "InnovationScore": 7, "RecommendedGoals": [],
+                    "ProgressGraph": "", "FutureInsights": [], "Suggestions": []}
+        else:
+            return self._send(404, {"error": "unknown path"})
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_upstreams(args):
+    FakeUpstreamHandler.latency = args.upstream_latency
+    FakeUpstreamHandler.jitter = args.upstream_jitter
+    FakeUpstreamHandler.error_rate = args.upstream_error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-upstreams", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def serve_app(env, port_queue):
+    """Child process: build the app from the benchmark environment and serve it."""
+    os.environ.update(env)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import logging
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    logging.getLogger().setLevel(logging.WARNING)  # routes.py turns DEBUG on, which would dominate timings
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def scenarios(args):
+    """(name, method, path builder, json builder, authenticated) per endpoint, grouped by blueprint."""
+    users = args.users
+
+    def claim(rng):
+        return f"claim number {rng.randrange(args.claims)}"
+
+    def novel_claim(rng):
+        return f"benchmark claim {rng.getrandbits(64)}"
+
+    return [
+        # fact_checker
+        ("fact_checker GET /check_claim (stored claim)", "GET", lambda r: f"/check_claim?query={claim(r)}", None, False),
+        ("fact_checker POST /check_claim (new claim)", "POST", lambda r: "/check_claim",
+         lambda r: {"claim": novel_claim(r)}, False),
+        ("fact_checker POST /check_claims (batch of 10)", "POST", lambda r: "/check_claims",
+         lambda r: {"claims": [claim(r) for _ in range(5)] + [novel_claim(r) for _ in range(5)]}, False),
+        ("fact_checker GET /innovation_news", "GET", lambda r: "/innovation_news", None, False),
+        ("fact_checker GET /coming_soon", "GET", lambda r: "/coming_soon", None, False),
+        # auth
+        ("auth POST /login", "POST", lambda r: "/login",
+         lambda r: {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}, False),
+        ("auth GET /protected", "GET", lambda r: "/protected", None, True),
+        # progress
+        ("progress POST /progress", "POST", lambda r: "/progress",
+         lambda r: {"achievement": f"Benchmark achievement {r.getrandbits(32)}"}, True),
+        ("progress POST /progress/bulk (1000 rows)", "POST", lambda r: "/progress/bulk",
+         lambda r: [{"achievement": f"Imported achievement {r.getrandbits(32)}"} for _ in range(1000)], True),
+        ("progress GET /progress/user/<id>", "GET", lambda r: f"/progress/user/{r.randrange(1, users + 1)}", None, True),
+        ("progress POST /progress/forecasts (100 users)", "POST", lambda r: "/progress/forecasts",
+         lambda r: {"user_ids": [r.randrange(1, users + 1) for _ in range(100)]}, True),
+        ("progress POST /goal", "POST", lambda r: "/goal",
+         lambda r: {"goal": f"Benchmark goal {r.randrange(50)}", "target_date": "2030-01-01"}, True),
+        ("progress GET /goals", "GET", lambda r: "/goals", None, True),
+        ("progress GET /progress/community", "GET", lambda r: "/progress/community", None, False),
+        # wolfram
+        ("wolfram GET /wolfram/progress_insights", "GET", lambda r: "/wolfram/progress_insights", None, True),
+        ("wolfram POST /wolfram/progress_insights/jobs", "POST", lambda r: "/wolfram/progress_insights/jobs", None, True),
+    ]
+
+
+def drive(base_url, scenario, token, args):
+    """Sends `args.requests` requests from `args.concurrency` threads, returns latencies and status counts."""
+    name, method, path, body, authenticated = scenario
+    headers = {"Authorization": f"Bearer {token}"} if authenticated else {}
+    local = threading.local()
+
+    def one(i):
+        rng = random.Random(args.seed * 1000003 + i)
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path(rng), json=body(rng) if body else None,
+                                       headers=headers, timeout=60)
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "endpoint": name,
+        "requests": len(results),
+        "throughput_rps": len(results) / wall,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "statuses": statuses,
+    }
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    upstream_url = start_fake_upstreams(args)
+
+    os.environ.update({
+        "FACT_CHECK_API_URL": f"{upstream_url}/factcheck",
+        "NEWS_API_URL": f"{upstream_url}/news",
+        "WOLFRAM_API_URL": f"{upstream_url}/wolfram",
+    })
+    os.environ.setdefault("CLAIM_CACHE_TTL", str(400 * 86400))  # Seeded verdicts are spread over the past year
+    for upstream in ("NEWSAPI", "WOLFRAM", "FACTCHECK"):
+        os.environ.setdefault(f"UPSTREAM_QUOTA_{upstream}", "")  # The fake upstreams have no quota to protect
+    configure_environment(database_url)
+
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app
+    from app import models
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        print(f"Seeding {database_url}")
+        seed(db, models, args)
+        models.User.query.filter_by(username=BENCH_USERNAME).update(
+            {"password": generate_password_hash(BENCH_PASSWORD)}
+        )
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(target=serve_app, args=(dict(os.environ), port_queue), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port_queue.get(timeout=300)}"
+
+    try:
+        token = requests.post(f"{base_url}/login", json={"username": BENCH_USERNAME, "password": BENCH_PASSWORD},
+                              timeout=60).json()["access_token"]
+        commit = os.popen("git rev-parse --short HEAD 2>/dev/null").read().strip() or None
+
+        print(f"\n{'endpoint':<48} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+        for scenario in scenarios(args):
+            if args.only and not any(part in scenario[0] for part in args.only):
+                continue
+            result = drive(base_url, scenario, token, args)
+            print(f"{result['endpoint']:<48} {result['throughput_rps']:8.1f} {result['p50_ms']:9.2f} "
+                  f"{result['p95_ms']:9.2f} {result['p99_ms']:9.2f}  {result['statuses']}")
+            if args.history:
+                result.update(commit=commit, recorded_at=datetime.utcnow().isoformat(), database=database_url.split(":")[0],
+                              users=args.users, claims=args.claims, concurrency=args.concurrency,
+                              upstream_latency=args.upstream_latency)
+                with open(args.history, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result) + "\n")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
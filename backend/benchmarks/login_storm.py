@@ -0,0 +1,215 @@
+"""
+Measures /login throughput under a login storm and how much it slows the
+other blueprints.
+
+The app is seeded and served like load_test.py. Non-auth endpoints are first
+timed on their own, then again while `--login-concurrency` threads log in as
+fast as they can; the report shows logins/sec (and how many were shed with
+503) plus each endpoint's p50/p95 before and during the storm.
+
+    python benchmarks/login_storm.py --login-concurrency 64 --duration 20
+    python benchmarks/login_storm.py --hash-workers 0    # Hash inline, for comparison
+    python benchmarks/login_storm.py --hash-workers 4 --max-pending 32 --history benchmarks/login_history.jsonl
+
+Run from the `backend` directory. The target database is dropped and re-seeded.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from load_test import BENCH_PASSWORD, percentile, serve_app, start_fake_upstreams
+from query_plans import configure_environment, seed
+
+PROBES = [
+    ("fact_checker GET /check_claim (stored claim)", lambda r, args: f"/check_claim?query=claim number {r.randrange(args.claims)}"),
+    ("fact_checker GET /coming_soon", lambda r, args: "/coming_soon"),
+    ("progress GET /progress/community", lambda r, args: "/progress/community"),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--progress-per-user", type=int, default=20)
+    parser.add_argument("--goals-per-user", type=int, default=3)
+    parser.add_argument("--stories-per-user", type=int, default=2)
+    parser.add_argument("--claims", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hash-workers", type=int, help="PASSWORD_HASH_WORKERS for the server, 0 hashes inline")
+    parser.add_argument("--max-pending", type=int, help="PASSWORD_HASH_MAX_PENDING for the server")
+    parser.add_argument("--login-concurrency", type=int, default=32, help="Threads logging in during the storm")
+    parser.add_argument("--probe-concurrency", type=int, default=4, help="Threads timing the other endpoints")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--history", help="Append results as JSON lines to this file")
+    # start_fake_upstreams reads these
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--upstream-jitter", type=float, default=0.02)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def run_for(duration, concurrency, one):
+    """Calls `one(rng, session)` from `concurrency` threads until `duration` elapses, returns every result."""
+    deadline = time.monotonic() + duration
+    results, lock = [], threading.Lock()
+
+    def loop(n):
+        rng = random.Random(n)
+        session = requests.Session()
+        mine = []
+        while time.monotonic() < deadline:
+            mine.append(one(rng, session))
+        with lock:
+            results.extend(mine)
+
+    threads = [threading.Thread(target=loop, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def timed(session, method, url, **kwargs):
+    started = time.perf_counter()
+    try:
+        status = session.request(method, url, timeout=60, **kwargs).status_code
+    except requests.RequestException:
+        status = "error"
+    return (time.perf_counter() - started) * 1000, status
+
+
+def probe(base_url, args):
+    """p50/p95 of the non-auth endpoints over one phase."""
+    def one(rng, session):
+        name, path = rng.choice(PROBES)
+        return (name,) + timed(session, "GET", base_url + path(rng, args))
+
+    by_name = {}
+    for name, elapsed, _ in run_for(args.duration, args.probe_concurrency, one):
+        by_name.setdefault(name, []).append(elapsed)
+    return {
+        name: {"p50_ms": statistics.median(sorted(v)), "p95_ms": percentile(sorted(v), 0.95), "requests": len(v)}
+        for name, v in by_name.items()
+    }
+
+
+def storm(base_url, args, stop):
+    """Logs in as random users until `stop` is set, returns (status counts, latencies, seconds)."""
+    statuses, latencies = {}, []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def loop(n):
+        rng = random.Random(args.seed * 7919 + n)
+        session = requests.Session()
+        while not stop.is_set():
+            body = {"username": f"user{rng.randrange(1, args.users + 1)}", "password": BENCH_PASSWORD}
+            elapsed, status = timed(session, "POST", f"{base_url}/login", json=body)
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(args.login_concurrency)]
+    for thread in threads:
+        thread.start()
+    stop.wait()
+    for thread in threads:
+        thread.join()
+    return statuses, sorted(latencies), time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    upstream_url = start_fake_upstreams(args)
+
+    os.environ.update({
+        "FACT_CHECK_API_URL": f"{upstream_url}/factcheck",
+        "NEWS_API_URL": f"{upstream_url}/news",
+        "WOLFRAM_API_URL": f"{upstream_url}/wolfram",
+    })
+    os.environ.setdefault("CLAIM_CACHE_TTL", str(400 * 86400))  # Seeded verdicts are spread over the past year
+    for upstream in ("NEWSAPI", "WOLFRAM", "FACTCHECK"):
+        os.environ.setdefault(f"UPSTREAM_QUOTA_{upstream}", "")  # The fake upstreams have no quota to protect
+    if args.hash_workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+    if args.max_pending is not None:
+        os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.max_pending)
+    configure_environment(database_url)
+
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app
+    from app import models
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        print(f"Seeding {database_url}")
+        seed(db, models, args)
+        # One hash for everyone, made with the configured settings so logins never trigger a rehash
+        models.User.query.update({"password": generate_password_hash(
+            BENCH_PASSWORD, app.config["PASSWORD_HASH_METHOD"], app.config["PASSWORD_SALT_LENGTH"]
+        )})
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+        hash_workers = app.config["PASSWORD_HASH_WORKERS"]
+
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(target=serve_app, args=(dict(os.environ), port_queue), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port_queue.get(timeout=300)}"
+
+    try:
+        print(f"Timing the other endpoints for {args.duration:.0f}s without logins")
+        baseline = probe(base_url, args)
+
+        print(f"Timing them again during a {args.login_concurrency}-thread login storm")
+        stop = threading.Event()
+        outcome = {}
+        storm_thread = threading.Thread(target=lambda: outcome.update(result=storm(base_url, args, stop)))
+        storm_thread.start()
+        during = probe(base_url, args)
+        stop.set()
+        storm_thread.join()
+        statuses, latencies, wall = outcome["result"]
+
+        logins = statuses.get("200", 0)
+        print(f"\nhash workers {hash_workers}: {logins / wall:.1f} logins/s, {statuses.get('503', 0)} shed with 503, "
+              f"login p50 {statistics.median(latencies):.1f} ms, p95 {percentile(latencies, 0.95):.1f} ms  {statuses}")
+        print(f"\n{'endpoint':<48} {'p50 ms':>9} {'storm':>9} {'p95 ms':>9} {'storm':>9} {'p95 x':>7}")
+        for name, before in baseline.items():
+            after = during.get(name)
+            if after is None:
+                continue
+            print(f"{name:<48} {before['p50_ms']:9.2f} {after['p50_ms']:9.2f} {before['p95_ms']:9.2f} "
+                  f"{after['p95_ms']:9.2f} {after['p95_ms'] / before['p95_ms']:7.2f}")
+
+        if args.history:
+            commit = os.popen("git rev-parse --short HEAD 2>/dev/null").read().strip() or None
+            with open(args.history, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "commit": commit, "recorded_at": datetime.utcnow().isoformat(),
+                    "database": database_url.split(":")[0], "hash_workers": hash_workers,
+                    "login_concurrency": args.login_concurrency, "logins_per_second": logins / wall,
+                    "login_statuses": statuses, "baseline": baseline, "during_storm": during,
+                }) + "\n")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Seeds a throwaway database at realistic volumes and reports the query plan and
+latency of every query the routes issue, first without and then with the
+indexes declared in `app/models.py`.
+
+    python benchmarks/query_plans.py --users 2000 --progress-per-user 50
+    python benchmarks/query_plans.py --database-url postgresql://localhost/flow_bench
+
+Run from the `backend` directory. The target database is dropped and re-seeded.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--progress-per-user", type=int, default=50)
+    parser.add_argument("--goals-per-user", type=int, default=5)
+    parser.add_argument("--stories-per-user", type=int, default=5)
+    parser.add_argument("--claims", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def configure_environment(database_url):
+    # The app refuses to start without these, the benchmark never calls upstreams
+    for key in ("FACT_CHECK_API_KEY", "NEWS_API_KEY", "WOLFRAM_API_URL", "WOLFRAM_APPID"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["CLAIM_INDEX_SNAPSHOT_DIR"] = ""
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def chunked(rows, size=10000):
+    """Batches any iterable, so rows can be generated lazily at tens of millions."""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def seed(db, models, args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    start = now - timedelta(days=365)
+
+    def when():
+        return start + timedelta(seconds=rng.randrange(365 * 86400))
+
+    db.drop_all()
+    db.create_all()
+    engine = db.engine
+
+    users = ({"id": i, "username": f"user{i}", "password": "x"} for i in range(1, args.users + 1))
+    progress = (
+        {"achievement": f"Achievement {n} of user {u}", "user_id": u, "created_at": when()}
+        for u in range(1, args.users + 1) for n in range(args.progress_per_user)
+    )
+    goals = (
+        {"goal": f"Goal {n} of user {u}", "target_date": now + timedelta(days=30), "user_id": u, "created_at": when()}
+        for u in range(1, args.users + 1) for n in range(args.goals_per_user)
+    )
+    stories = (
+        {"progress_story": f"Story {n} of user {u}", "user_id": u, "created_at": when()}
+        for u in range(1, args.users + 1) for n in range(args.stories_per_user)
+    )
+    from app.services.claim_codec import CODEC_ZLIB, compact, pack
+
+    stored_result = pack(compact({"claims": [{"text": "claim", "claimReview": [
+        {"publisher": {"name": "Bench"}, "textualRating": "False", "url": "http://bench.local"}
+    ]}]}), CODEC_ZLIB)
+    claims = (
+        {"claim_text": f"claim number {n}", "claim_digest": models.claim_digest(f"claim number {n}"),
+         "result_data": stored_result, "timestamp": when()}
+        for n in range(args.claims)
+    )
+
+    for model, rows in ((models.User, users), (models.Progress, progress), (models.Goal, goals),
+                        (models.CommunityProgress, stories), (models.Claim, claims)):
+        started, count = time.perf_counter(), 0
+        with engine.begin() as conn:
+            for batch in chunked(rows):
+                conn.execute(model.__table__.insert(), batch)
+                count += len(batch)
+        print(f"  seeded {count:>9,} {model.__tablename__:<20} in {time.perf_counter() - started:6.2f}s")
+
+
+def route_queries(db, models, args):
+    """The statements issued by routes.py, keyed by a short description."""
+    Progress, Goal, Claim, User = models.Progress, models.Goal, models.Claim, models.User
+    user_id = args.users // 2
+    middle = datetime.utcnow() - timedelta(days=180)
+
+    community = db.session.query(Progress.id, Progress.achievement, Progress.user_id, Progress.created_at)
+    return {
+        "login: user by username": User.query.filter_by(username=f"user{user_id}"),
+        "get_progress: progress by user": Progress.query.filter_by(user_id=user_id),
+        "get_progress: progress by user, newest first": Progress.query.filter_by(user_id=user_id)
+            .order_by(Progress.created_at.desc()),
+        "get_goals: goals by user": Goal.query.filter_by(user_id=user_id),
+        "get_goals: goals by user, newest first": Goal.query.filter_by(user_id=user_id)
+            .order_by(Goal.created_at.desc()),
+        "community: first page": community.order_by(Progress.created_at.desc(), Progress.id.desc()).limit(51),
+        "community: page after cursor": community.filter(Progress.created_at < middle)
+            .order_by(Progress.created_at.desc(), Progress.id.desc()).limit(51),
+        "community stories by user": models.CommunityProgress.query.filter_by(user_id=user_id)
+            .order_by(models.CommunityProgress.created_at.desc()),
+        "check_claim: claim by digest": Claim.query.filter_by(claim_digest=models.claim_digest("claim number 7")),
+        "claim index: claims after id": db.session.query(Claim.id, Claim.claim_text)
+            .filter(Claim.id > args.claims - 100).order_by(Claim.id),
+        "claims older than a cutoff": Claim.query.filter(Claim.timestamp < middle).order_by(Claim.timestamp).limit(1000),
+        "recommendations: all goals": db.session.query(Goal.goal),
+    }
+
+
+def explain(db, statement):
+    from sqlalchemy import text
+
+    compiled = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    with db.engine.connect() as conn:
+        rows = conn.execute(text(prefix + compiled)).fetchall()
+    return " | ".join(str(row[-1]) for row in rows)
+
+
+def time_query(query, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query.all()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def run(db, models, args, label):
+    print(f"\n== {label} ==")
+    results = {}
+    for name, query in route_queries(db, models, args).items():
+        plan = explain(db, query.statement)
+        p50, p95 = time_query(query, args.repeat)
+        results[name] = p50
+        print(f"{name:<48} p50 {p50:8.3f} ms  p95 {p95:8.3f} ms\n    plan: {plan}")
+    return results
+
+
+def benchmark_indexes(db):
+    """Indexes whose effect we measure, everything declared beyond primary keys and unique constraints."""
+    indexes = []
+    for table in db.metadata.sorted_tables:
+        indexes.extend(index for index in table.indexes if not index.unique)
+    return indexes
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    configure_environment(database_url)
+
+    from app import create_app
+    from app import models
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        print(f"Seeding {database_url}")
+        seed(db, models, args)
+
+        indexes = benchmark_indexes(db)
+        for index in indexes:
+            index.drop(bind=db.engine)
+        before = run(db, models, args, "without secondary indexes")
+
+        for index in indexes:
+            index.create(bind=db.engine)
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+        after = run(db, models, args, "with secondary indexes")
+
+        print("\n== speed-up (p50) ==")
+        for name in before:
+            print(f"{name:<48} {before[name] / max(after[name], 1e-9):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
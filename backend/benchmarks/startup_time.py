@@ -0,0 +1,85 @@
+"""
+Measures worker startup cost: wall time and peak RSS of importing each heavy
+dependency and of creating the app, with lazy loading and with PRELOAD_MODELS.
+Every measurement runs in a fresh interpreter so nothing is already cached.
+
+    python benchmarks/startup_time.py --runs 5 --history benchmarks/startup_history.jsonl
+
+Run from the `backend` directory. With --history, one JSON line per run is
+appended so import cost can be tracked across commits.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statement run in the child interpreter for each measured step
+TARGETS = {
+    "numpy": "import numpy",
+    "scipy.sparse": "import scipy.sparse",
+    "pandas": "import pandas",
+    "sklearn (tfidf)": "import sklearn.feature_extraction.text",
+    "spacy": "import spacy",
+    "spacy + en_core_web_sm": "import spacy; spacy.load('en_core_web_sm')",
+    "create_app (lazy)": "import app",
+    "create_app (PRELOAD_MODELS=1)": "import app",
+}
+
+CHILD = """
+import resource, sys, time
+started = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(f"{elapsed} {rss_kb}")
+"""
+
+
+def measure(statement, env):
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, statement],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    elapsed, rss_kb = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed), int(rss_kb) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--history", help="Append results as JSON lines to this file")
+    args = parser.parse_args()
+
+    base_env = dict(os.environ)
+    # The app refuses to start without these, nothing here calls upstreams
+    for key in ("FACT_CHECK_API_KEY", "NEWS_API_KEY", "WOLFRAM_API_URL", "WOLFRAM_APPID"):
+        base_env.setdefault(key, "benchmark")
+
+    results = {}
+    print(f"{'target':<32} {'median s':>9} {'max RSS MB':>11}")
+    for name, statement in TARGETS.items():
+        env = dict(base_env, PRELOAD_MODELS="1" if "PRELOAD" in name else "0")
+        samples = [measure(statement, env) for _ in range(args.runs)]
+        samples = [s for s in samples if s is not None]
+        if not samples:
+            print(f"{name:<32} {'failed':>9}")
+            continue
+        seconds = statistics.median(s[0] for s in samples)
+        rss = max(s[1] for s in samples)
+        results[name] = {"seconds": round(seconds, 4), "max_rss_mb": round(rss, 1)}
+        print(f"{name:<32} {seconds:9.3f} {rss:11.1f}")
+
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps({"recorded_at": datetime.utcnow().isoformat(), "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,92 @@
-from flask_sqlalchemy import SQLAlchemy
+import functools
+import sqlite3
+
+from flask import g, has_app_context
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
 from flask_jwt_extended import JWTManager
+from sqlalchemy import event, orm
+from sqlalchemy.pool import QueuePool
+
+READ_REPLICA_BIND = "replica"
+SQLITE_SYNCHRONOUS_LEVELS = frozenset({"OFF", "NORMAL", "FULL", "EXTRA"})
+
+
+class RoutingSession(SignallingSession):
+    """Sends queries from views marked `read_replica` to the replica bind, flushes always go to the primary."""
+
+    def __init__(self, db, **options):
+        self._db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_app_context() and g.get("_db_read_replica"):
+            if READ_REPLICA_BIND in (self.app.config.get("SQLALCHEMY_BINDS") or {}):
+                return self._db.get_engine(self.app, bind=READ_REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+
+class ConfiguredSQLAlchemy(SQLAlchemy):
+    """
+    Engine options from the DB_* and SQLITE_* settings: a bounded, pre-pinged,
+    recycled pool for server databases, and for SQLite a connection pool (instead
+    of a new connection per checkout) with WAL journaling, a busy timeout and the
+    configured synchronous level.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        config = app.config
+        is_sqlite = sa_url.drivername.startswith("sqlite")
+        in_memory = is_sqlite and sa_url.database in (None, "", ":memory:")
+
+        if is_sqlite and not in_memory:
+            # SQLAlchemy 1.4 gives file databases a NullPool (a new SQLite connection per checkout),
+            # which rejects the size arguments, so the QueuePool is asked for explicitly
+            options.setdefault("poolclass", QueuePool)
+            options.setdefault("pool_size", config.get("DB_POOL_SIZE", 10))
+            options.setdefault("max_overflow", config.get("DB_MAX_OVERFLOW", 20))
+            connect_args = options.setdefault("connect_args", {})
+            connect_args.setdefault("timeout", config.get("SQLITE_BUSY_TIMEOUT", 30))
+            connect_args.setdefault("check_same_thread", False)  # Pooled connections move between threads
+        elif not is_sqlite:
+            options.setdefault("pool_size", config.get("DB_POOL_SIZE", 10))
+            options.setdefault("max_overflow", config.get("DB_MAX_OVERFLOW", 20))
+            options.setdefault("pool_timeout", config.get("DB_POOL_TIMEOUT", 30))
+            options.setdefault("pool_recycle", config.get("DB_POOL_RECYCLE", 1800))
+            options.setdefault("pool_pre_ping", config.get("DB_POOL_PRE_PING", True))
+
+        synchronous = config.get("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.sqlite_synchronous = synchronous if synchronous in SQLITE_SYNCHRONOUS_LEVELS else "NORMAL"
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if sa_url.drivername.startswith("sqlite"):
+            event.listen(engine, "connect", functools.partial(_sqlite_pragmas, synchronous=self.sqlite_synchronous))
+        return engine
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record, synchronous):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer instead of failing with "database is locked"
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={synchronous}")
+    cursor.close()
+
+
+def read_replica(view):
+    """Runs the view's queries on the read replica when DATABASE_READ_REPLICA_URL is set."""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        g._db_read_replica = True
+        return view(*args, **kwargs)
+
+    return wrapped
+
 
-db = SQLAlchemy()
-jwt = JWTManager()
\ No newline at end of file
+db = ConfiguredSQLAlchemy()
+jwt = JWTManager()
@@ -0,0 +1,37 @@
+import os
+
+# gunicorn -c gunicorn.conf.py "app:app"
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5001")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+# "aiohttp.GunicornWebWorker" with "async_server:create_application()" for the async serving mode
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", "1"))  # More than 1 makes a sync worker a gthread worker
+
+# ✅ Import the app (and its NLP/ML models) once in the master, workers share the pages copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+if preload_app:
+    os.environ.setdefault("PRELOAD_MODELS", "1")
+
+# ✅ Each open progress feed holds its worker's request thread until the client leaves
+if os.getenv("PROGRESS_FEED_ENABLED", "0").strip() == "1":
+    if worker_class == "sync" and threads <= 1:
+        raise RuntimeError(
+            "❌ PROGRESS_FEED_ENABLED needs threaded or async workers (GUNICORN_THREADS or the aiohttp worker), "
+            "a sync worker is blocked by every open stream"
+        )
+    if workers > 1 and os.getenv("PROGRESS_FEED_BACKEND", "memory").strip() != "redis":
+        raise RuntimeError(
+            "❌ PROGRESS_FEED_ENABLED with several workers needs PROGRESS_FEED_BACKEND=redis, "
+            "otherwise streams only see rows committed by their own worker"
+        )
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the forked workers
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        db.get_engine(app).dispose()
+        if app.config.get("SQLALCHEMY_BINDS"):
+            db.get_engine(app, bind="replica").dispose()
@@ -1,12 +1,24 @@
-from app import create_app
-from extensions import db
-from flask_migrate import Migrate
+import os
 
-# ✅ Create Flask App
-app = create_app()
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "migrations")
+
+
+def create_app():
+    """
+    The app with Flask-Migrate set up, `FLASK_APP=manage.py flask db ...` finds this factory.
+
+    Nothing is imported at module level: the password hashing pool's children
+    (forkserver/spawn) re-run the entry script, and importing `app` there would
+    build a whole app per child.
+    """
+    from flask_migrate import Migrate
+    from app import app
+    from extensions import db
+
+    # ✅ Set up Flask-Migrate
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    return app
 
-# ✅ Set up Flask-Migrate
-migrate = Migrate(app, db)
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5001) 
+    create_app().run(debug=True, port=5001)
@@ -20,6 +20,18 @@ const CommunityProgress = () => {
       })
       .then(data => setProgress(data.progress)) 
       .catch(error => console.error('Error fetching community progress:', error));
+
+    // Live updates only when the backend serves the feed (PROGRESS_FEED_ENABLED), each open
+    // stream holds a backend request thread. EventSource resumes from the last event id.
+    if (process.env.REACT_APP_PROGRESS_FEED !== '1') {
+      return undefined;
+    }
+    const feed = new EventSource('http://localhost:5001/progress/community/stream');
+    feed.addEventListener('progress', event => {
+      const entry = JSON.parse(event.data);
+      setProgress(current => [entry, ...(current || [])]);
+    });
+    return () => feed.close();
   }, []);
 
   return (